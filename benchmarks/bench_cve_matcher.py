@@ -0,0 +1,84 @@
+"""
+Benchmark the indexed CVE matcher against the original nested loop.
+
+Generates synthetic software inventories and CVE lists and reports how
+matching time scales. The nested loop is only run up to --naive-limit
+software x CVE comparisons; larger sizes are indexed-only.
+
+Usage:
+    python -m benchmarks.bench_cve_matcher
+    python -m benchmarks.bench_cve_matcher --sizes 1000x10000 10000x100000
+"""
+import argparse
+import random
+import string
+import time
+
+from services.cve_matcher import CveMatcher
+
+DEFAULT_SIZES = ["1000x10000", "2500x25000", "5000x50000", "10000x100000"]
+
+
+def _word(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9))).capitalize()
+
+
+def make_dataset(n_software, n_cves, seed=0):
+    """Build software entries and CVEs sharing a vocabulary of product names."""
+    rng = random.Random(seed)
+    products = [f"{_word(rng)} {_word(rng)}" for _ in range(max(n_cves // 5, 1))]
+    software_list = [
+        {
+            "DisplayName": f"{rng.choice(products)} {rng.randint(1, 20)}.{rng.randint(0, 9)}"
+            if rng.random() < 0.3 else f"{_word(rng)} {_word(rng)} {_word(rng)}",
+            "DisplayVersion": f"{rng.randint(1, 20)}.{rng.randint(0, 9)}",
+        }
+        for _ in range(n_software)
+    ]
+    cve_list = [
+        {"id": f"CVE-2024-{i:05d}", "product": rng.choice(products)}
+        for i in range(n_cves)
+    ]
+    return software_list, cve_list
+
+
+def naive_match(software_list, cve_list):
+    return [
+        {"software": software, "cve": cve}
+        for software in software_list
+        for cve in cve_list
+        if software.get("DisplayName") and cve.get("product") in software["DisplayName"]
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="SOFTWARExCVES pairs")
+    parser.add_argument("--naive-limit", type=float, default=5e7,
+                        help="Skip the nested loop above this many comparisons")
+    args = parser.parse_args()
+
+    print(f"{'software':>9} {'cves':>8} {'build s':>9} {'match s':>9} {'pairs':>8} {'nested s':>10}")
+    for size in args.sizes:
+        n_software, n_cves = (int(n) for n in size.lower().split("x"))
+        software_list, cve_list = make_dataset(n_software, n_cves)
+
+        start = time.perf_counter()
+        matcher = CveMatcher(cve_list)
+        built = time.perf_counter()
+        result = matcher.match(software_list)
+        matched = time.perf_counter()
+
+        naive = "skipped"
+        if n_software * n_cves <= args.naive_limit:
+            start_naive = time.perf_counter()
+            expected = naive_match(software_list, cve_list)
+            naive = f"{time.perf_counter() - start_naive:.3f}"
+            assert result == expected, "indexed matcher disagrees with nested loop"
+
+        print(f"{n_software:>9} {n_cves:>8} {built - start:>9.3f} {matched - built:>9.3f} "
+              f"{len(result):>8} {naive:>10}")
+
+
+if __name__ == "__main__":
+    main()
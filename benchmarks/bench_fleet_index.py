@@ -0,0 +1,89 @@
+"""
+Benchmark the fleet index: full ingest, incremental re-ingest and queries.
+
+Writes a synthetic fleet (each host gets a shared base image plus a few
+host-specific packages, with some version drift) to a temporary data
+directory, ingests it, touches a fraction of the reports and ingests again,
+then times product/version lookups. Peak traced memory of the ingest is
+reported to show it does not grow with the number of hosts.
+
+Usage:
+    python -m benchmarks.bench_fleet_index
+    python -m benchmarks.bench_fleet_index --hosts 10000 --entries 300 --changed 0.05
+"""
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.bench_report_formats import synthetic_inventory
+from services.fleet_index import FleetIndex
+from utils.report_formats import write_report
+
+
+def write_fleet(data_dir, hosts, entries, seed=0):
+    rng = random.Random(seed)
+    base = synthetic_inventory(entries, seed=seed)
+    for i in range(hosts):
+        software_list = [dict(entry, DisplayVersion=f"{entry['DisplayVersion']}.{rng.randint(0, 1)}") for entry in base]
+        software_list += synthetic_inventory(5, seed=seed + i + 1)
+        write_host(data_dir, f"host-{i:05d}", software_list)
+    return base
+
+
+def write_host(data_dir, hostname, software_list):
+    reports_dir = Path(data_dir) / hostname / "reports"
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    write_report(software_list, reports_dir / "software.json")
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hosts", type=int, default=1000, help="Hosts in the synthetic fleet")
+    parser.add_argument("--entries", type=int, default=200, help="Shared entries per host")
+    parser.add_argument("--changed", type=float, default=0.05, help="Fraction of reports changed before re-ingesting")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / "data"
+        base, write_s = timed(lambda: write_fleet(data_dir, args.hosts, args.entries))
+        print(f"Fleet: {args.hosts} hosts x ~{args.entries + 5} entries written in {write_s:.1f}s\n")
+
+        index = FleetIndex(Path(tmp) / "fleet_index.sqlite")
+        try:
+            tracemalloc.start()
+            stats, ingest_s = timed(lambda: index.ingest(data_dir))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"full ingest     {ingest_s:>8.2f}s  {stats}  peak {peak / 2 ** 20:.1f} MiB")
+
+            rng = random.Random(1)
+            for i in rng.sample(range(args.hosts), int(args.hosts * args.changed)):
+                write_host(data_dir, f"host-{i:05d}", synthetic_inventory(args.entries, seed=i))
+            stats, ingest_s = timed(lambda: index.ingest(data_dir))
+            print(f"re-ingest       {ingest_s:>8.2f}s  {stats}")
+
+            stats, ingest_s = timed(lambda: index.ingest(data_dir))
+            print(f"no-op ingest    {ingest_s:>8.2f}s  {stats}")
+
+            product = base[0]["DisplayName"]
+            version = f"{base[0]['DisplayVersion']}.1"
+            hosts, query_s = timed(lambda: index.hosts_with(product, version=version))
+            print(f"hosts_with      {query_s * 1000:>8.2f}ms {len(hosts)} hosts have {product} {version}")
+            versions, query_s = timed(lambda: index.versions(product))
+            print(f"versions        {query_s * 1000:>8.2f}ms {len(versions)} versions of {product}")
+            print(f"\nIndex: {index.counts()}, {index.path.stat().st_size / 2 ** 20:.1f} MiB")
+        finally:
+            index.close()
+
+
+if __name__ == "__main__":
+    main()
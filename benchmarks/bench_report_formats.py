@@ -0,0 +1,82 @@
+"""
+Benchmark inventory report formats: write time, read time and bytes.
+
+Uses a synthetic software list shaped like a Windows registry inventory
+(or a real report with --input) and compares every format against the
+indent=4 JSON written by save_software_list_to_file.
+
+Usage:
+    python -m benchmarks.bench_report_formats
+    python -m benchmarks.bench_report_formats --entries 5000 --repeat 10
+    python -m benchmarks.bench_report_formats --input data/HOST/reports/software.json
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from utils.report_formats import FORMATS, extension_for, read_report, write_report
+
+PUBLISHERS = [
+    "Microsoft Corporation", "Adobe Inc.", "Google LLC", "Mozilla", "Oracle Corporation",
+    "Intel Corporation", "NVIDIA Corporation", "Python Software Foundation", "The Git Development Community",
+    "JetBrains s.r.o.", "Zoom Video Communications, Inc.", "VideoLAN", "7-Zip", "Dell Inc.", "HP Inc.",
+]
+
+
+def synthetic_inventory(entries, seed=0):
+    rng = random.Random(seed)
+    software_list = []
+    for i in range(entries):
+        publisher = rng.choice(PUBLISHERS)
+        name = f"{publisher.split()[0]} Component {i}"
+        software_list.append({
+            "DisplayName": name,
+            "DisplayVersion": f"{rng.randint(1, 30)}.{rng.randint(0, 9)}.{rng.randint(0, 9999)}",
+            "Publisher": publisher,
+            "InstallDate": f"20{rng.randint(18, 25)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}",
+            "InstallLocation": rng.choice(["", f"C:\\Program Files\\{publisher.split()[0]}\\{name}"]),
+            "UninstallString": f"MsiExec.exe /X{{{rng.getrandbits(128):032X}}}",
+        })
+    return software_list
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=2000, help="Synthetic inventory size")
+    parser.add_argument("--input", help="Benchmark an existing report instead (any format)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per format (best time is reported)")
+    args = parser.parse_args()
+
+    software_list = read_report(args.input) if args.input else synthetic_inventory(args.entries)
+    print(f"Inventory: {len(software_list)} entries\n")
+    print(f"{'format':<10} {'write ms':>9} {'read ms':>9} {'bytes':>10} {'size':>7}")
+
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in FORMATS:
+            path = Path(tmp) / f"software{extension_for(fmt)}"
+            try:
+                write_ms = best_of(args.repeat, lambda: write_report(software_list, path, fmt)) * 1000
+            except RuntimeError as e:
+                print(f"{fmt:<10} skipped: {e}")
+                continue
+            read_ms = best_of(args.repeat, lambda: read_report(path, fmt)) * 1000
+            assert read_report(path, fmt) == software_list, f"{fmt} did not round-trip"
+            size = path.stat().st_size
+            baseline = baseline or size
+            print(f"{fmt:<10} {write_ms:>9.1f} {read_ms:>9.1f} {size:>10,} {size / baseline:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
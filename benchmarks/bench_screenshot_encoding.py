@@ -0,0 +1,98 @@
+"""
+Benchmark screenshot encoding profiles: encode time and bytes per frame.
+
+Uses a live capture of the first monitor when a display is available,
+otherwise a synthetic desktop-like 4K frame.
+
+Usage:
+    python -m benchmarks.bench_screenshot_encoding
+    python -m benchmarks.bench_screenshot_encoding --profiles lossless fast webp --repeat 5
+    python -m benchmarks.bench_screenshot_encoding --synthetic --width 1920 --height 1080
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import mss
+from mss.screenshot import ScreenShot
+
+from services.screenshot_service import PROFILES, encode_frame
+
+
+def synthetic_frame(width, height, seed=0):
+    """Desktop-like BGRA frame: flat windows, gradients and text-like noise."""
+    rng = random.Random(seed)
+    data = bytearray(width * height * 4)
+    row = bytearray(width * 4)
+    for x in range(width):
+        row[x * 4:x * 4 + 4] = bytes((x * 255 // width, 90, 160, 255))
+    for y in range(height):
+        data[y * width * 4:(y + 1) * width * 4] = row
+
+    for _ in range(12):
+        w, h = rng.randint(width // 8, width // 2), rng.randint(height // 8, height // 2)
+        left, top = rng.randint(0, width - w), rng.randint(0, height - h)
+        window = bytes((240, 240, 240, 255)) * w
+        for y in range(top, top + h):
+            data[(y * width + left) * 4:(y * width + left + w) * 4] = window
+        # Text lines
+        for y in range(top + 20, top + h - 10, 18):
+            for _ in range(w // 12):
+                x = left + rng.randint(5, w - 10)
+                for dy in range(8):
+                    offset = ((y + dy) * width + x) * 4
+                    data[offset:offset + 16] = bytes((30, 30, 30, 255)) * 4
+    return ScreenShot(data, {"left": 0, "top": 0, "width": width, "height": height})
+
+
+def capture_frame():
+    with mss.mss() as sct:
+        return sct.grab(sct.monitors[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--repeat", type=int, default=3, help="Encodes per profile (best time is reported)")
+    parser.add_argument("--synthetic", action="store_true", help="Never try a live capture")
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    args = parser.parse_args()
+
+    frame = None
+    if not args.synthetic:
+        try:
+            frame = capture_frame()
+            source = "live capture"
+        except Exception as e:
+            print(f"Live capture unavailable ({e}), using a synthetic frame")
+    if frame is None:
+        frame = synthetic_frame(args.width, args.height)
+        source = "synthetic"
+
+    width, height = frame.size
+    raw_bytes = width * height * 3
+    print(f"Frame: {width}x{height} ({source}), raw RGB {raw_bytes / 1e6:.1f} MB\n")
+    print(f"{'profile':<16} {'encode ms':>10} {'bytes':>12} {'ratio':>7}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.profiles:
+            profile = PROFILES[name]
+            path = Path(tmp) / f"{name}.{profile.extension}"
+            try:
+                best = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    encode_frame(frame, path, profile)
+                    best = min(best, time.perf_counter() - start)
+            except RuntimeError as e:
+                print(f"{name:<16} skipped: {e}")
+                continue
+            size = path.stat().st_size
+            print(f"{name:<16} {best * 1000:>10.1f} {size:>12} {raw_bytes / size:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark startup: how long importing an entry point takes, and what it imports.
+
+Runs ``python -X importtime -c "import <module>"`` in fresh interpreters
+from the repository root, reports the best self-inclusive import time and
+the slowest modules pulled in. Modules passed with --forbid (by default the
+heavy optional ones main.py loads lazily) must not be imported at all; the
+benchmark exits with status 1 if one is, or if --max-ms is exceeded, so it
+can guard against startup regressions in CI.
+
+Usage:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --module services.cve_service --forbid --top 15
+    python -m benchmarks.bench_startup --max-ms 50
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_FORBIDDEN = ["mss", "requests", "smtplib", "email.mime", "sqlite3", "asyncio", "dotenv"]
+
+
+def import_profile(module):
+    """
+    Import ``module`` in a fresh interpreter with -X importtime.
+
+    Returns:
+        {module name: (self microseconds, cumulative microseconds)}
+    """
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        traceback = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise SystemExit(f"import {module} failed:\n" + "\n".join(traceback))
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="Module to import")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters (best time is reported)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list")
+    parser.add_argument("--forbid", nargs="*", default=DEFAULT_FORBIDDEN,
+                        help="Modules that must not be imported (none with a bare --forbid)")
+    parser.add_argument("--max-ms", type=float, help="Fail if importing the module takes longer")
+    args = parser.parse_args()
+
+    runs = [import_profile(args.module) for _ in range(args.repeat)]
+    best = min(runs, key=lambda profile: profile[args.module][1])
+    total_ms = best[args.module][1] / 1000
+    print(f"import {args.module}: {total_ms:.1f} ms (best of {args.repeat}), {len(best)} modules\n")
+
+    print(f"{'module':<45} {'self ms':>9} {'cumul ms':>9}")
+    slowest = sorted(best.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"{name:<45} {self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}")
+
+    failed = False
+    imported = [name for name in args.forbid if name in best]
+    if imported:
+        print(f"\nFAIL: imported at startup: {', '.join(imported)}")
+        failed = True
+    if args.max_ms is not None and total_ms > args.max_ms:
+        print(f"\nFAIL: {total_ms:.1f} ms exceeds --max-ms {args.max_ms:.1f}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,134 @@
 import os
-from dotenv import load_dotenv
 
 env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
-load_dotenv(dotenv_path=env_path)
+# python-dotenv is only imported when there is a .env file to read
+if os.path.exists(env_path):
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=env_path)
 
 # Mail server configurations
 SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.example.com')
 SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
 SMTP_USER = os.getenv('SMTP_USER', 'user@example.com')
 SMTP_PASSWORD = os.getenv('SMTP_PASSWORD', 'password')
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', 10))
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', 'true').lower() in ('1', 'true', 'yes')
+# Messages sent over one SMTP session before it is renewed (0 = no limit)
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', 100))
+# Total attachment bytes per email; base64 adds a third, so 18 MB fits a 25 MB provider limit
+EMAIL_ATTACHMENT_BUDGET = int(os.getenv('EMAIL_ATTACHMENT_BUDGET', 18 * 1024 * 1024))
+# Tried in order while attachments exceed the budget: downscale (images, requires Pillow), zip.
+# Attachments that still do not fit are listed by path in the body instead
+EMAIL_OVERSIZE_STRATEGIES = os.getenv('EMAIL_OVERSIZE_STRATEGIES', 'downscale,zip')
+EMAIL_DOWNSCALE_MAX_DIMENSION = int(os.getenv('EMAIL_DOWNSCALE_MAX_DIMENSION', 1920))
+# Messages with more attachment bytes than this are built in a temporary file and streamed to the server
+EMAIL_STREAM_THRESHOLD = int(os.getenv('EMAIL_STREAM_THRESHOLD', 1024 * 1024))
 
 # Screenshot directory (default to relative path for cross-platform compatibility)
 SCREENSHOT_DIR = os.getenv('SCREENSHOT_DIR', 'data/screenshots')
+# Threads used to encode monitor captures (0 = one per monitor, up to CPU count)
+SCREENSHOT_ENCODE_WORKERS = int(os.getenv('SCREENSHOT_ENCODE_WORKERS', 0))
+# Screenshot encoding profile (anything but plain PNG requires Pillow)
+SCREENSHOT_FORMAT = os.getenv('SCREENSHOT_FORMAT', 'png').lower()
+SCREENSHOT_PNG_LEVEL = int(os.getenv('SCREENSHOT_PNG_LEVEL', 6))
+SCREENSHOT_QUALITY = int(os.getenv('SCREENSHOT_QUALITY', 85))
+SCREENSHOT_GRAYSCALE = os.getenv('SCREENSHOT_GRAYSCALE', 'false').lower() in ('1', 'true', 'yes')
+SCREENSHOT_MAX_DIMENSION = int(os.getenv('SCREENSHOT_MAX_DIMENSION', 0))
+# Skip monitors whose frame is unchanged since the previous capture
+SCREENSHOT_SKIP_UNCHANGED = os.getenv('SCREENSHOT_SKIP_UNCHANGED', 'false').lower() in ('1', 'true', 'yes')
+SCREENSHOT_CHANGE_THRESHOLD = float(os.getenv('SCREENSHOT_CHANGE_THRESHOLD', 0.002))
 
 # Data directory for storing reports and logs
 DATA_DIR = os.getenv('DATA_DIR', 'data')
 
+# Email outbox: queued messages are spooled here and delivered in the background
+OUTBOX_DIR = os.getenv('OUTBOX_DIR', os.path.join(DATA_DIR, 'outbox'))
+# Parallel SMTP sessions used to drain the outbox
+OUTBOX_CONCURRENCY = int(os.getenv('OUTBOX_CONCURRENCY', 2))
+# Attempts before a message is moved to the dead-letter directory
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 8))
+# Retry delay in seconds, doubled after each failed attempt up to the maximum
+OUTBOX_RETRY_BACKOFF = float(os.getenv('OUTBOX_RETRY_BACKOFF', 30))
+OUTBOX_RETRY_BACKOFF_MAX = float(os.getenv('OUTBOX_RETRY_BACKOFF_MAX', 3600))
+# Longest the daemon's outbox worker sleeps between delivery passes
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', 30))
+
+# Alert digests: alerts (e.g. CVE matches) are collected and emailed as one summary per window
+# Comma-separated recipients; empty disables alert emails
+ALERT_RECIPIENTS = [addr.strip() for addr in os.getenv('ALERT_RECIPIENTS', '').split(',') if addr.strip()]
+# Seconds an alert waits for others to join its digest
+ALERT_DIGEST_WINDOW = float(os.getenv('ALERT_DIGEST_WINDOW', 900))
+# Seconds an alert that was sent is not reported again (by its key, e.g. CVE id + host)
+ALERT_DEDUPE_TTL = float(os.getenv('ALERT_DEDUPE_TTL', 24 * 3600))
+# Digests per recipient per hour (0 = unlimited)
+ALERT_RATE_LIMIT = int(os.getenv('ALERT_RATE_LIMIT', 4))
+ALERT_DIGEST_STATE = os.getenv('ALERT_DIGEST_STATE', os.path.join(DATA_DIR, 'cache', 'alert_digest.json'))
+
 # CVE API configurations
 CVE_API_BASE_URL = os.getenv('CVE_API_BASE_URL', 'https://cve.circl.lu/api')
 CVE_REQUEST_TIMEOUT = int(os.getenv('CVE_REQUEST_TIMEOUT', 10))
-CVE_MAX_RESULTS = int(os.getenv('CVE_MAX_RESULTS', 50))
\ No newline at end of file
+CVE_MAX_RESULTS = int(os.getenv('CVE_MAX_RESULTS', 50))
+# Concurrent fetches for batch lookups (1 = sequential)
+CVE_MAX_WORKERS = int(os.getenv('CVE_MAX_WORKERS', 4))
+# Overall time budget for a batch lookup in seconds (0 = no deadline)
+CVE_BATCH_DEADLINE = float(os.getenv('CVE_BATCH_DEADLINE', 0))
+# Keep-alive connection pool and retry policy for the CVE API session
+CVE_POOL_SIZE = int(os.getenv('CVE_POOL_SIZE', 10))
+CVE_MAX_RETRIES = int(os.getenv('CVE_MAX_RETRIES', 3))
+CVE_RETRY_BACKOFF = float(os.getenv('CVE_RETRY_BACKOFF', 0.5))
+
+# Persistent CVE response cache
+CVE_CACHE_ENABLED = os.getenv('CVE_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+CVE_CACHE_PATH = os.getenv('CVE_CACHE_PATH', os.path.join(DATA_DIR, 'cache', 'cve_cache.sqlite'))
+CVE_CACHE_TTL = int(os.getenv('CVE_CACHE_TTL', 7 * 24 * 3600))
+CVE_CACHE_NEGATIVE_TTL = int(os.getenv('CVE_CACHE_NEGATIVE_TTL', 24 * 3600))
+CVE_CACHE_SEARCH_TTL = int(os.getenv('CVE_CACHE_SEARCH_TTL', 24 * 3600))
+CVE_CACHE_MAX_ENTRIES = int(os.getenv('CVE_CACHE_MAX_ENTRIES', 100000))
+
+# Offline CVE store built from imported feeds; when set, lookups never use HTTP
+CVE_OFFLINE_DB = os.getenv('CVE_OFFLINE_DB', '')
+
+# Reuse the previous inventory for sources whose change signal (registry key last-write
+# time, dpkg/rpm database mtime) is unchanged
+INVENTORY_CACHE_ENABLED = os.getenv('INVENTORY_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+INVENTORY_CACHE_PATH = os.getenv('INVENTORY_CACHE_PATH', os.path.join(DATA_DIR, 'cache', 'inventory_cache.json'))
+
+# Fleet-wide software index built from every host's latest report under DATA_DIR
+# (python -m services.fleet_index ingest)
+FLEET_INDEX_PATH = os.getenv('FLEET_INDEX_PATH', os.path.join(DATA_DIR, 'fleet', 'fleet_index.sqlite'))
+
+# Inventory report format: json (indented), jsonl.gz, columnar or msgpack (requires msgpack)
+REPORT_FORMAT = os.getenv('REPORT_FORMAT', 'json').lower()
+
+# Incremental inventory history (per-day deltas plus periodic full snapshots) instead of
+# rewriting software_<date>.json every run
+INVENTORY_STORE_ENABLED = os.getenv('INVENTORY_STORE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+# Days between compacted full snapshots
+INVENTORY_SNAPSHOT_INTERVAL = int(os.getenv('INVENTORY_SNAPSHOT_INTERVAL', 30))
+
+# Per-job timeouts in seconds for a one-shot run (python main.py)
+SCREENSHOT_JOB_TIMEOUT = float(os.getenv('SCREENSHOT_JOB_TIMEOUT', 120))
+INVENTORY_JOB_TIMEOUT = float(os.getenv('INVENTORY_JOB_TIMEOUT', 300))
+CVE_SCAN_JOB_TIMEOUT = float(os.getenv('CVE_SCAN_JOB_TIMEOUT', 600))
+OUTBOX_JOB_TIMEOUT = float(os.getenv('OUTBOX_JOB_TIMEOUT', 120))
+
+# Daemon mode (python main.py --daemon): seconds between runs of each job, 0 disables it
+DAEMON_SCREENSHOT_INTERVAL = float(os.getenv('DAEMON_SCREENSHOT_INTERVAL', 300))
+DAEMON_INVENTORY_INTERVAL = float(os.getenv('DAEMON_INVENTORY_INTERVAL', 3600))
+DAEMON_CVE_SCAN_INTERVAL = float(os.getenv('DAEMON_CVE_SCAN_INTERVAL', 86400))
+# Random delay added to each run, as a fraction of the job's interval
+DAEMON_JITTER = float(os.getenv('DAEMON_JITTER', 0.05))
+# Software checked by the CVE scan job: "Display Name=vendor/product" entries, comma-separated
+CVE_SCAN_WATCHLIST = os.getenv('CVE_SCAN_WATCHLIST', '')
+
+# Logging (python main.py): records are written by a background thread, so logging never waits on disk
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FILE = os.getenv('LOG_FILE', os.path.join('logs', 'system_monitor.log'))
+# text (one line per record) or json (JSON Lines, one object per record)
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+# size (at LOG_MAX_BYTES), time (at LOG_ROTATE_WHEN) or none
+LOG_ROTATION = os.getenv('LOG_ROTATION', 'size').lower()
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', 'midnight')
+# Rotated log files kept
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
@@ -1,25 +1,55 @@
-from services import installed_software_service
-from services.email_service import send_email
-import services.screenshot_service as screenshot_service
+import argparse
 import logging
-import services.installed_software_service as installed_software_service
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/system_monitor.log'),
-        logging.StreamHandler()
-    ]
-)
+import threading
+from utils.lazy_import import lazy_import
+
+# Services (and mss, requests, smtplib behind them) are imported when a job first needs
+# them, so short cron runs only pay for what they use
+mss = lazy_import("mss")
+settings = lazy_import("config.settings")
+alert_digest_service = lazy_import("services.alert_digest_service")
+cve_service = lazy_import("services.cve_service")
+installed_software_service = lazy_import("services.installed_software_service")
+orchestrator_service = lazy_import("services.orchestrator_service")
+outbox_service = lazy_import("services.outbox_service")
+scheduler_service = lazy_import("services.scheduler_service")
+screenshot_service = lazy_import("services.screenshot_service")
+
 logger = logging.getLogger(__name__)
 
 
+def configure_logging():
+    from utils.logging_utils import setup_logging
+    setup_logging(
+        level=settings.LOG_LEVEL,
+        log_file=settings.LOG_FILE,
+        fmt=settings.LOG_FORMAT,
+        rotation=settings.LOG_ROTATION,
+        max_bytes=settings.LOG_MAX_BYTES,
+        backup_count=settings.LOG_BACKUP_COUNT,
+        when=settings.LOG_ROTATE_WHEN,
+    )
+
+
 def main():
     logger.info("System Monitor Started")
-    # Take screenshots
-    screenshots = screenshot_service.take_screenshot()
+    jobs = MonitorJobs(load_watchlist(), keep_mss=False)
+    # Screenshot and inventory are independent, so they run concurrently; queued emails
+    # are delivered alongside them
+    OrchestratedJob = orchestrator_service.OrchestratedJob
+    run_plan = [
+        OrchestratedJob("screenshot", jobs.screenshot, settings.SCREENSHOT_JOB_TIMEOUT),
+        OrchestratedJob("inventory", jobs.inventory, settings.INVENTORY_JOB_TIMEOUT),
+        OrchestratedJob("outbox", jobs.outbox, settings.OUTBOX_JOB_TIMEOUT),
+    ]
+    if jobs.watchlist:
+        run_plan.append(
+            OrchestratedJob("cve_scan", jobs.cve_scan, settings.CVE_SCAN_JOB_TIMEOUT, depends_on=("inventory",))
+        )
+    result = orchestrator_service.run_jobs(run_plan)
+
+    screenshot_job = result.jobs["screenshot"]
+    screenshots = screenshot_job.result["paths"] if screenshot_job.ok else []
     # if screenshots:
     #     logger.info(f"Screenshot taken successfully: {len(screenshots)} monitor(s) captured")
     #     print(f"✓ Screenshot taken successfully: {len(screenshots)} monitor(s) captured")
@@ -51,21 +81,167 @@ def main():
     #     logger.error("Failed to take screenshot")
     #     print("✗ Failed to take screenshot")
 
-    # software_list = installed_software_service.list_installed_software()
-    # installed_software_service.save_software_list_to_file(software_list)
-    # logger.info(f"Installed software list saved with {len(software_list)} entries")
-    # print(f"✓ Installed software list saved with {len(software_list)} entries")
-
-    software_list = installed_software_service.list_installed_software()
-    saved_file = installed_software_service.save_software_list_to_file(software_list)
+    inventory_job = result.jobs["inventory"]
+    saved_file = inventory_job.result["saved_file"] if inventory_job.ok else None
     if saved_file:
-        logger.info(f"Installed software list saved to {saved_file}")
+        logger.info("Installed software list saved to %s", saved_file)
         print(f"✓ Installed software list saved to {saved_file}")
     else:
         logger.error("Failed to save installed software list")
         print("✗ Failed to save installed software list")
 
+    cve_scan_job = result.jobs.get("cve_scan")
+    if cve_scan_job is not None:
+        if cve_scan_job.ok:
+            print(f"✓ CVE scan found {cve_scan_job.result['matches']} match(es)")
+        else:
+            print(f"✗ CVE scan failed: {cve_scan_job.error}")
+
+    outbox_job = result.jobs["outbox"]
+    if outbox_job.ok and (outbox_job.result["sent"] or outbox_job.result["pending"]):
+        print(f"✓ Outbox sent {outbox_job.result['sent']} email(s), {outbox_job.result['pending']} still queued")
+    elif not outbox_job.ok:
+        print(f"✗ Outbox delivery failed: {outbox_job.error}")
+
+    # Alerts raised by this run are only emailed once their digest window has passed, so
+    # runs started by cron within one window share a digest
+    try:
+        digest = jobs.alert_digest()
+        if digest["sent"]:
+            outbox_service.get_outbox().process_due()
+            print(f"✓ Alert digest with {digest['alerts']} alert(s) sent to {digest['sent']} recipient(s)")
+    except Exception as e:
+        logger.exception("Failed to send alert digest")
+        print(f"✗ Alert digest failed: {e}")
+
+    timings = ", ".join(f"{name} {job.duration:.2f}s" for name, job in result.jobs.items())
+    print(f"Finished in {result.duration:.2f}s ({timings})")
+    return result
+
+
+def load_watchlist():
+    # Without a watchlist there is no CVE scan, so the CVE client (and requests) is never imported
+    spec = settings.CVE_SCAN_WATCHLIST
+    return cve_service.parse_watchlist(spec) if spec.strip() else []
+
+
+class MonitorJobs:
+    """
+    Monitoring jobs shared by one-shot and daemon runs. Each returns a small
+    summary dict. In daemon mode, state that is expensive to rebuild (the mss
+    handle, the latest software inventory) is kept across ticks.
+    """
+
+    def __init__(self, watchlist, keep_mss=True, digest=None):
+        self.watchlist = watchlist
+        self.digest = digest if digest is not None else alert_digest_service.get_alert_digest()
+        self.keep_mss = keep_mss
+        self.software_list = None
+        self._lock = threading.Lock()
+        self._sct = None
+
+    def screenshot(self):
+        if not self.keep_mss:
+            screenshots, stats = screenshot_service.take_screenshot(with_stats=True)
+            return dict(stats, paths=screenshots)
+
+        # Only ever used from the screenshot job's own thread
+        if self._sct is None:
+            self._sct = mss.mss()
+        screenshots, stats = screenshot_service.take_screenshot(with_stats=True, sct=self._sct)
+        if not stats["monitors"]:
+            # Reopen next tick, e.g. after the display layout changed
+            self.close()
+        logger.info("Screenshot job saved %d of %d monitor(s)", len(screenshots), stats['monitors'])
+        return dict(stats, paths=screenshots)
+
+    def inventory(self):
+        software_list = installed_software_service.list_installed_software()
+        if settings.INVENTORY_STORE_ENABLED:
+            summary = installed_software_service.record_software_inventory(software_list)
+        else:
+            summary = {"saved_file": installed_software_service.save_software_list_to_file(software_list)}
+        with self._lock:
+            self.software_list = software_list
+        logger.info("Inventory job found %d entries", len(software_list))
+        return dict(summary, entries=len(software_list))
+
+    def cve_scan(self):
+        with self._lock:
+            software_list = self.software_list
+        if software_list is None:
+            software_list = installed_software_service.list_installed_software()
+        cve_list = cve_service.fetch_watchlist_cves(self.watchlist)
+        matches = installed_software_service.check_blacklisted_software(software_list, cve_list)
+        saved_file = installed_software_service.save_cve_matches_to_file(matches)
+        logger.info("CVE scan job matched %d CVE(s) against %d entries", len(matches), len(software_list))
+        alerts = self.digest.add_cve_matches(matches) if self.digest is not None else 0
+        return {"matches": len(matches), "saved_file": saved_file, "alerts": alerts}
+
+    def outbox(self):
+        return outbox_service.get_outbox().process_due()
+
+    def alert_digest(self):
+        if self.digest is None:
+            return {"alerts": 0, "sent": 0, "rate_limited": 0}
+        return self.digest.flush()
+
+    def close(self):
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+
+def build_scheduler(jobs):
+    """
+    Schedule every job with a positive interval (the CVE scan also needs a
+    watchlist). Alert digests are only flushed when alert recipients are
+    configured.
+    """
+    scheduler = scheduler_service.Scheduler()
+    schedule = [
+        ("screenshot", jobs.screenshot, settings.DAEMON_SCREENSHOT_INTERVAL),
+        ("inventory", jobs.inventory, settings.DAEMON_INVENTORY_INTERVAL),
+        ("cve_scan", jobs.cve_scan, settings.DAEMON_CVE_SCAN_INTERVAL if jobs.watchlist else 0),
+        # Checked every minute so a digest goes out soon after its window has passed
+        ("alert_digest", jobs.alert_digest, min(settings.ALERT_DIGEST_WINDOW, 60) if jobs.digest is not None else 0),
+    ]
+    for name, func, interval in schedule:
+        if interval > 0:
+            scheduler.add_job(name, func, interval, jitter=interval * settings.DAEMON_JITTER)
+    return scheduler
+
+
+def run_daemon():
+    logger.info("System Monitor daemon started")
+    jobs = MonitorJobs(load_watchlist())
+    scheduler = build_scheduler(jobs)
+    outbox = outbox_service.get_outbox()
+    # Queued emails are delivered as soon as they are queued, independently of the jobs
+    outbox.start()
+    try:
+        # Returns on SIGTERM/SIGINT once running jobs have finished
+        scheduler.run_forever()
+    finally:
+        outbox.stop(timeout=30)
+        jobs.close()
+    logger.info("System Monitor daemon stopped")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="System Monitor")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running and repeat the jobs at the DAEMON_* intervals instead of running once"
+    )
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    configure_logging()
+    if args.daemon:
+        run_daemon()
+    else:
+        main()
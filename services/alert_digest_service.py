@@ -0,0 +1,386 @@
+import json
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from html import escape
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from config.settings import (
+    ALERT_RECIPIENTS,
+    ALERT_DIGEST_WINDOW,
+    ALERT_DEDUPE_TTL,
+    ALERT_RATE_LIMIT,
+    ALERT_DIGEST_STATE,
+)
+from utils.file_utils import atomic_write
+from utils.paths_utils import ensure_dir
+from utils.system_utils import get_hostname
+
+logger = logging.getLogger(__name__)
+
+SEVERITIES = ("critical", "high", "medium", "low", "info")
+
+# Window over which ALERT_RATE_LIMIT digests per recipient are allowed
+RATE_LIMIT_PERIOD = 3600
+
+_digest = None
+_digest_lock = threading.Lock()
+
+
+@dataclass
+class Alert:
+    """
+    One event for the digest.
+
+    Attributes:
+        key: Deduplication key, e.g. "cve:CVE-2024-3094:host-a"
+        title: One-line summary
+        detail: Optional longer text
+        severity: One of SEVERITIES
+        category: Grouping in the rendered digest (e.g. "cve", "screenshot")
+        host: Host the event happened on
+        first_seen, last_seen: Timestamps of the first and latest occurrence
+        count: Occurrences coalesced into this alert
+        recipients: Recipients that have not been sent this alert yet
+    """
+    key: str
+    title: str
+    detail: str = ""
+    severity: str = "info"
+    category: str = "general"
+    host: str = ""
+    first_seen: float = 0.0
+    last_seen: float = 0.0
+    count: int = 1
+    recipients: List[str] = field(default_factory=list)
+
+
+def cvss_severity(score) -> str:
+    """Map a CVSS base score to a severity (info when unknown)."""
+    try:
+        score = float(score)
+    except (TypeError, ValueError):
+        return "info"
+    if score >= 9.0:
+        return "critical"
+    if score >= 7.0:
+        return "high"
+    if score >= 4.0:
+        return "medium"
+    return "low"
+
+
+def _normalize_severity(severity: str) -> str:
+    normalized = str(severity).strip().lower()
+    if normalized not in SEVERITIES:
+        raise ValueError(f"Unknown alert severity {severity!r}, expected one of: {', '.join(SEVERITIES)}")
+    return normalized
+
+
+def _default_deliver(messages: List[Dict]) -> None:
+    # Imported here so the digest does not pull in SMTP code until something is sent
+    from services.outbox_service import get_outbox
+    outbox = get_outbox()
+    for message in messages:
+        outbox.enqueue(message)
+
+
+class AlertDigest:
+    """
+    Coalesces alerts into one summary email per window.
+
+    Alerts with the same key are merged while pending (their count grows)
+    and suppressed for ``dedupe_ttl`` seconds after being sent, so a CVE
+    found by every scan is reported once a day rather than every run. When
+    the oldest pending alert is ``window`` seconds old, flush() renders all
+    pending alerts into one text and HTML digest per recipient. A recipient
+    who already got ``rate_limit`` digests in the last hour is skipped and
+    receives the alerts in its next digest.
+
+    Pending alerts, recently sent keys and the send log are kept in
+    ``state_path`` (when given), so one-shot runs deduplicate across runs.
+
+    Example:
+        >>> digest = AlertDigest(["ops@example.com"], state_path="data/cache/alert_digest.json")
+        >>> digest.add("cve:CVE-2024-3094:host-a", "xz-utils 5.6.0: CVE-2024-3094", severity="critical")
+        >>> digest.flush()
+    """
+
+    def __init__(
+        self,
+        recipients: Sequence[str],
+        window: float = ALERT_DIGEST_WINDOW,
+        dedupe_ttl: float = ALERT_DEDUPE_TTL,
+        rate_limit: int = ALERT_RATE_LIMIT,
+        state_path=None,
+        deliver: Callable[[List[Dict]], None] = _default_deliver
+    ):
+        self.recipients = list(recipients)
+        self.window = window
+        self.dedupe_ttl = dedupe_ttl
+        self.rate_limit = rate_limit
+        self.state_path = Path(state_path) if state_path else None
+        self.deliver = deliver
+        self.host = get_hostname()
+        self.suppressed = 0
+        self._pending: Dict[str, Alert] = {}
+        self._sent_keys: Dict[str, float] = {}
+        self._sends: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        if self.state_path is not None:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self._pending = {alert["key"]: Alert(**alert) for alert in state.get("pending", [])}
+            self._sent_keys = state.get("sent_keys", {})
+            self._sends = state.get("sends", {})
+            self._retarget_locked()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Ignoring unreadable alert digest state %s: %s", self.state_path, e)
+
+    def _retarget_locked(self) -> None:
+        """
+        Drop recipients that are no longer configured from pending alerts.
+        Alerts left without a recipient go to the current recipients, or are
+        dropped if there are none. Call with the lock held.
+        """
+        current = set(self.recipients)
+        for key, alert in list(self._pending.items()):
+            recipients = [recipient for recipient in alert.recipients if recipient in current]
+            if not recipients:
+                if not self.recipients:
+                    logger.warning("Dropping pending alert %s: no alert recipients configured", key)
+                    del self._pending[key]
+                    continue
+                logger.info("Pending alert %s was owed to recipients no longer configured, sending it to %s",
+                            key, ", ".join(self.recipients))
+                recipients = list(self.recipients)
+            alert.recipients = recipients
+
+    def _save(self, now: float) -> None:
+        """Persist state, dropping expired dedupe keys and send log entries. Call with the lock held."""
+        self._sent_keys = {key: sent for key, sent in self._sent_keys.items() if now - sent < self.dedupe_ttl}
+        self._sends = {recipient: [sent for sent in sends if now - sent < RATE_LIMIT_PERIOD]
+                       for recipient, sends in self._sends.items()}
+        self._sends = {recipient: sends for recipient, sends in self._sends.items() if sends}
+        if self.state_path is None:
+            return
+        try:
+            ensure_dir(self.state_path.parent)
+            state = {
+                "pending": [asdict(alert) for alert in self._pending.values()],
+                "sent_keys": self._sent_keys,
+                "sends": self._sends,
+            }
+            atomic_write(self.state_path, json.dumps(state).encode("utf-8"), fsync=False)
+        except Exception as e:
+            logger.warning("Failed to save alert digest state to %s: %s", self.state_path, e)
+
+    def add(self, key: str, title: str, detail: str = "", severity: str = "info",
+            category: str = "general", host: Optional[str] = None, now: Optional[float] = None) -> bool:
+        """
+        Record an alert for the next digest.
+
+        Raises:
+            ValueError: If ``severity`` is not one of SEVERITIES (case-insensitive)
+
+        Returns:
+            False if the key was already sent within the dedupe TTL (the
+            alert is dropped), True otherwise (new or merged into a pending alert)
+        """
+        severity = _normalize_severity(severity)
+        now = time.time() if now is None else now
+        with self._lock:
+            added = self._add_locked(key, title, detail, severity, category, host or self.host, now)
+            if added:
+                self._save(now)
+        return added
+
+    def _add_locked(self, key: str, title: str, detail: str, severity: str, category: str,
+                    host: str, now: float) -> bool:
+        """add() without saving. Call with the lock held."""
+        sent = self._sent_keys.get(key)
+        if sent is not None and now - sent < self.dedupe_ttl:
+            self.suppressed += 1
+            return False
+        alert = self._pending.get(key)
+        if alert is not None:
+            alert.count += 1
+            alert.last_seen = now
+            # Keep the most severe report of the event
+            if SEVERITIES.index(severity) < SEVERITIES.index(alert.severity):
+                alert.severity, alert.title, alert.detail = severity, title, detail
+        else:
+            self._pending[key] = Alert(key, title, detail, severity, category, host,
+                                       now, now, recipients=list(self.recipients))
+        return True
+
+    def add_cve_matches(self, matches: List[Dict], host: Optional[str] = None, now: Optional[float] = None) -> int:
+        """
+        Add one alert per (CVE, host) from check_blacklisted_software results.
+
+        The whole batch is added under one lock and the state saved once.
+
+        Returns:
+            Number of alerts that were not suppressed as already sent
+        """
+        host = host or self.host
+        now = time.time() if now is None else now
+        added = 0
+        with self._lock:
+            for match in matches:
+                cve, software = match["cve"], match["software"]
+                name = software.get("DisplayName", "")
+                version = software.get("DisplayVersion", "")
+                added += self._add_locked(
+                    key=f"cve:{cve.get('id')}:{host}",
+                    title=f"{name} {version}: {cve.get('id')}".strip(),
+                    detail=cve.get("summary") or "",
+                    severity=cvss_severity(cve.get("cvss")),
+                    category="cve",
+                    host=host,
+                    now=now,
+                )
+            if added:
+                self._save(now)
+        return added
+
+    def pending(self) -> List[Alert]:
+        with self._lock:
+            return list(self._pending.values())
+
+    def due(self, now: Optional[float] = None) -> bool:
+        """Whether the oldest pending alert has waited a full window."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return any(now - alert.first_seen >= self.window for alert in self._pending.values())
+
+    def flush(self, now: Optional[float] = None, force: bool = False) -> Dict[str, int]:
+        """
+        Send the digest if it is due (or ``force``).
+
+        Each recipient under the rate limit gets one digest of the pending
+        alerts it has not received yet. Alerts owed to a rate-limited
+        recipient stay pending for it alone. Recipients that are no longer
+        configured are dropped from pending alerts first.
+
+        Returns:
+            Counters: alerts (sent to at least one recipient), sent (digests), rate_limited (recipients held back)
+
+        Raises:
+            Whatever ``deliver`` raises; digests delivered before the failure are recorded as sent
+        """
+        now = time.time() if now is None else now
+        stats = {"alerts": 0, "sent": 0, "rate_limited": 0}
+        if not (force or self.due(now)):
+            return stats
+
+        with self._lock:
+            # ALERT_RECIPIENTS may have changed since the alerts were added
+            self._retarget_locked()
+            alerts = sorted(self._pending.values(),
+                            key=lambda alert: (SEVERITIES.index(alert.severity), alert.category, alert.title))
+            messages = []
+            delivered = set()
+            for recipient in self.recipients:
+                owed = [alert for alert in alerts if recipient in alert.recipients]
+                if not owed:
+                    continue
+                recent = [sent for sent in self._sends.get(recipient, []) if now - sent < RATE_LIMIT_PERIOD]
+                if self.rate_limit and len(recent) >= self.rate_limit:
+                    stats["rate_limited"] += 1
+                    continue
+                subject, text, html = render_digest(owed, self.host)
+                messages.append(({"to_address": recipient, "subject": subject, "body": text, "html_body": html},
+                                 owed))
+
+            if stats["rate_limited"]:
+                logger.warning("Alert digest held back for %d recipient(s) over %d digests per hour",
+                               stats["rate_limited"], self.rate_limit)
+            if not messages:
+                return stats
+
+            # One message at a time, recording each delivery, so a failure part-way
+            # does not send the digests that did go through again on the next flush
+            try:
+                for message, owed in messages:
+                    self.deliver([message])
+                    recipient = message["to_address"]
+                    self._sends.setdefault(recipient, []).append(now)
+                    for alert in owed:
+                        alert.recipients.remove(recipient)
+                    delivered.update(alert.key for alert in owed)
+                    stats["sent"] += 1
+            finally:
+                for alert in alerts:
+                    if not alert.recipients:
+                        self._sent_keys[alert.key] = now
+                        del self._pending[alert.key]
+                self._save(now)
+
+        stats["alerts"] = len(delivered)
+        logger.info("Queued %d alert digest(s) covering %d alert(s)", stats["sent"], len(delivered))
+        return stats
+
+
+def render_digest(alerts: List[Alert], host: str):
+    """
+    Render alerts as one summary.
+
+    Returns:
+        (subject, plain text body, HTML body)
+    """
+    counts = {severity: sum(1 for alert in alerts if alert.severity == severity) for severity in SEVERITIES}
+    summary = ", ".join(f"{count} {severity}" for severity, count in counts.items() if count)
+    subject = f"System Monitor digest for {host}: {len(alerts)} alert(s) ({summary})"
+
+    lines = [subject, ""]
+    rows = []
+    for alert in alerts:
+        seen = datetime.fromtimestamp(alert.last_seen).strftime("%Y-%m-%d %H:%M")
+        repeat = f" (x{alert.count})" if alert.count > 1 else ""
+        lines.append(f"[{alert.severity.upper()}] {alert.host}: {alert.title}{repeat} - last seen {seen}")
+        if alert.detail:
+            lines.append(f"    {alert.detail}")
+        rows.append(
+            f"<tr><td>{escape(alert.severity)}</td><td>{escape(alert.category)}</td><td>{escape(alert.host)}</td>"
+            f"<td><strong>{escape(alert.title)}</strong><br>{escape(alert.detail)}</td>"
+            f"<td>{alert.count}</td><td>{seen}</td></tr>"
+        )
+
+    html = f"""<html>
+    <body>
+        <h2>System Monitor digest for {escape(host)}</h2>
+        <p>{len(alerts)} alert(s): {escape(summary)}</p>
+        <table border="1" cellpadding="4" cellspacing="0">
+            <tr><th>Severity</th><th>Category</th><th>Host</th><th>Alert</th><th>Count</th><th>Last seen</th></tr>
+            {"".join(rows)}
+        </table>
+    </body>
+</html>"""
+    return subject, "\n".join(lines), html
+
+
+def get_alert_digest() -> Optional[AlertDigest]:
+    """Return the shared digest for ALERT_RECIPIENTS, or None when alert emails are disabled."""
+    global _digest
+    if _digest is None and ALERT_RECIPIENTS:
+        with _digest_lock:
+            if _digest is None:
+                _digest = AlertDigest(ALERT_RECIPIENTS, state_path=ALERT_DIGEST_STATE)
+    return _digest
+
+
+def set_alert_digest(digest: Optional[AlertDigest]) -> None:
+    """Replace the shared digest (None: recreate from settings on next use)."""
+    global _digest
+    with _digest_lock:
+        _digest = digest
@@ -0,0 +1,133 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access);
+"""
+
+
+class CveCache:
+    """
+    Persistent SQLite cache for CVE API responses.
+
+    Entries carry their own TTL. A stored value of None is a negative entry
+    (e.g. a 404), so known-missing CVEs are not re-requested until it expires.
+    When the cache grows past ``max_entries`` the least recently used entries
+    are evicted.
+
+    Example:
+        >>> cache = CveCache('data/cache/cve_cache.sqlite', max_entries=50000)
+        >>> cache.set('cve:CVE-2021-44228', {'id': 'CVE-2021-44228'}, ttl=86400)
+        >>> cache.get('cve:CVE-2021-44228')
+        (True, {'id': 'CVE-2021-44228'})
+    """
+
+    def __init__(self, path: Union[str, Path], max_entries: int = 100000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._size = self._count()
+
+    def get(self, key: str) -> Tuple[bool, Optional[Any]]:
+        """
+        Look up a cached value.
+
+        Returns:
+            Tuple of (hit, value). ``value`` is None for negative entries.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return False, None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            if row[0] is None:
+                self.negative_hits += 1
+                return True, None
+        return True, json.loads(row[0])
+
+    def set(self, key: str, value: Optional[Any], ttl: float) -> None:
+        """Store a value (or None for a negative entry) for ``ttl`` seconds."""
+        payload = None if value is None else json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, now + ttl, now)
+            )
+            # Counts replacements too; corrected by the recount in _evict()
+            self._size += 1
+            if self._size > self.max_entries:
+                self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._size = self._count()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current number of entries."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "negative_hits": self.negative_hits,
+                "evictions": self.evictions,
+                "entries": self._count(),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones down to 90% of the cap."""
+        self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        size = self._count()
+        target = int(self.max_entries * 0.9)
+        if size > target:
+            cursor = self._conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY last_access ASC LIMIT ?)",
+                (size - target,)
+            )
+            self.evictions += cursor.rowcount
+            logger.debug("Evicted %d least recently used CVE cache entries", cursor.rowcount)
+        self._size = self._count()
@@ -0,0 +1,172 @@
+import logging
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from utils.cpe_utils import extract_cpe_matches
+from utils.version_utils import VersionIntervals, match_to_interval, parse_version
+
+logger = logging.getLogger(__name__)
+
+
+class AhoCorasick:
+    """
+    Aho–Corasick automaton for finding every pattern occurring in a text.
+
+    Building is linear in the total pattern length; a search is linear in
+    the text length plus the number of matches, independent of how many
+    patterns there are.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str) -> None:
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def _build(self) -> None:
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(char, 0)
+                fail[child] = target if target != child else 0
+                # Inherit matches that end here via the longest proper suffix
+                if out[fail[child]]:
+                    out[child] = out[child] + out[fail[child]]
+
+    def find(self, text: str) -> Set[int]:
+        """Return the indices (into ``patterns``) of all patterns found in ``text``."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[int] = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class CveMatcher:
+    """
+    Precomputed index for matching installed software against CVE products.
+
+    A CVE matches a software entry when its ``product`` is a substring of the
+    entry's ``DisplayName`` (the same rule check_blacklisted_software always
+    used). Product strings are deduplicated and compiled into a single
+    Aho–Corasick automaton, so each DisplayName is scanned once no matter how
+    many CVEs are indexed. Build the matcher once and reuse it across
+    software lists.
+
+    With ``match_versions`` a product hit is only kept if the entry's
+    ``DisplayVersion`` falls in the CVE's affected version ranges (taken from
+    its CPE configurations). CVEs without version information, and software
+    whose version cannot be parsed, are still reported.
+
+    Example:
+        >>> matcher = CveMatcher(cve_list)
+        >>> matches = matcher.match(software_list)
+    """
+
+    def __init__(self, cve_list: List[Dict], match_versions: bool = True):
+        self.cve_list = cve_list
+        self.match_versions = match_versions
+        self._versions: Dict[int, Optional[Tuple[Dict[str, VersionIntervals], VersionIntervals]]] = {}
+        product_cves: Dict[str, List[int]] = {}
+        self._match_all: List[int] = []
+        for index, cve in enumerate(cve_list):
+            product = cve.get("product")
+            if not isinstance(product, str):
+                continue
+            if product == "":
+                # An empty product is a substring of every name
+                self._match_all.append(index)
+            else:
+                product_cves.setdefault(product, []).append(index)
+
+        self._automaton = AhoCorasick(product_cves)
+        self._product_cves = [product_cves[p] for p in self._automaton.patterns]
+        logger.debug("Indexed %d CVEs over %d distinct products", len(cve_list), len(self._product_cves))
+
+    def match_indices(self, display_name: str) -> List[int]:
+        """Return the positions in ``cve_list`` of CVEs matching ``display_name``, in order."""
+        indices = list(self._match_all)
+        for pattern_id in self._automaton.find(display_name):
+            indices.extend(self._product_cves[pattern_id])
+        indices.sort()
+        return indices
+
+    def _compiled_versions(self, index: int) -> Optional[Tuple[Dict[str, VersionIntervals], VersionIntervals]]:
+        """Compile (once) the affected version intervals of a CVE, per CPE product and combined."""
+        if index in self._versions:
+            return self._versions[index]
+
+        groups: Dict[str, List] = {}
+        for match in extract_cpe_matches(self.cve_list[index]):
+            interval = match_to_interval(match)
+            if interval is not None:
+                groups.setdefault(match["product"].replace("_", " "), []).append(interval)
+
+        compiled = None
+        if groups:
+            combined = VersionIntervals(iv for intervals in groups.values() for iv in intervals)
+            if not combined.unbounded:
+                compiled = ({product: VersionIntervals(ivs) for product, ivs in groups.items()}, combined)
+        self._versions[index] = compiled
+        return compiled
+
+    def version_affected(self, software: Dict, index: int) -> bool:
+        """Check whether ``software``'s DisplayVersion is in the affected ranges of CVE ``index``."""
+        compiled = self._compiled_versions(index)
+        if compiled is None:
+            return True
+        version = parse_version(software.get("DisplayVersion"))
+        if version is None:
+            return True
+
+        by_product, combined = compiled
+        name = software["DisplayName"].lower()
+        relevant = [intervals for product, intervals in by_product.items() if product in name]
+        if relevant:
+            return any(intervals.contains(version) for intervals in relevant)
+        return combined.contains(version)
+
+    def iter_matches(self, software_list: Iterable[Dict]) -> Iterator[Dict]:
+        for software in software_list:
+            name = software.get("DisplayName")
+            if not name:
+                continue
+            for index in self.match_indices(name):
+                if self.match_versions and not self.version_affected(software, index):
+                    continue
+                yield {"software": software, "cve": self.cve_list[index]}
+
+    def match(self, software_list: Iterable[Dict]) -> List[Dict]:
+        """
+        Return ``{"software", "cve"}`` pairs in software order, then CVE order.
+        """
+        return list(self.iter_matches(software_list))
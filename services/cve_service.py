@@ -1,25 +1,206 @@
 import requests
 import json
 import logging
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Iterator, Optional, Tuple
 import re
+import sqlite3
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException, Timeout
+from urllib3.util.retry import Retry
 
-from config.settings import CVE_API_BASE_URL, CVE_REQUEST_TIMEOUT, CVE_MAX_RESULTS
+from config.settings import (
+    CVE_API_BASE_URL,
+    CVE_REQUEST_TIMEOUT,
+    CVE_MAX_RESULTS,
+    CVE_MAX_WORKERS,
+    CVE_BATCH_DEADLINE,
+    CVE_POOL_SIZE,
+    CVE_MAX_RETRIES,
+    CVE_RETRY_BACKOFF,
+    CVE_CACHE_ENABLED,
+    CVE_CACHE_PATH,
+    CVE_CACHE_TTL,
+    CVE_CACHE_NEGATIVE_TTL,
+    CVE_CACHE_SEARCH_TTL,
+    CVE_CACHE_MAX_ENTRIES,
+    CVE_OFFLINE_DB,
+)
+from services.cve_cache import CveCache
+from services.cve_store import CveStore
+from utils.json_stream import iter_json_array
 
 logger = logging.getLogger(__name__)
 
 # CVE ID validation pattern
 CVE_PATTERN = re.compile(r'^CVE-\d{4}-\d{4,}$')
 
+# Bytes read from the response body per streaming step
+STREAM_CHUNK_SIZE = 64 * 1024
 
-def get_cve_by_id(cve_id: str, timeout: int = CVE_REQUEST_TIMEOUT) -> Optional[Dict]:
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+_cache: Optional[CveCache] = None
+_cache_opened = False
+_cache_lock = threading.Lock()
+
+_offline_store: Optional[CveStore] = None
+_offline_store_opened = False
+_offline_store_lock = threading.Lock()
+
+
+def create_session(
+    pool_size: int = CVE_POOL_SIZE,
+    max_retries: int = CVE_MAX_RETRIES,
+    backoff_factor: float = CVE_RETRY_BACKOFF
+) -> requests.Session:
+    """
+    Build a keep-alive HTTP session for the CVE API.
+    
+    Args:
+        pool_size: Maximum number of pooled connections per host (default: from settings)
+        max_retries: Retries for connection errors and 429/5xx responses (default: from settings)
+        backoff_factor: Exponential backoff factor between retries in seconds (default: from settings)
+    
+    Returns:
+        Configured requests.Session
+    
+    Example:
+        >>> set_session(create_session(pool_size=32))
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Accept": "application/json", "Connection": "keep-alive"})
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the shared CVE API session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def set_session(session: Optional[requests.Session]) -> None:
+    """
+    Replace the shared CVE API session (e.g. to point tests at a stub server).
+    
+    The previous session is closed. Passing None resets to a default session
+    on next use.
+    """
+    global _session
+    with _session_lock:
+        previous, _session = _session, session
+    if previous is not None and previous is not session:
+        previous.close()
+
+
+def get_cache() -> Optional[CveCache]:
+    """Return the persistent CVE cache, or None if caching is disabled."""
+    global _cache, _cache_opened
+    if not _cache_opened:
+        with _cache_lock:
+            if not _cache_opened:
+                if CVE_CACHE_ENABLED:
+                    try:
+                        _cache = CveCache(CVE_CACHE_PATH, max_entries=CVE_CACHE_MAX_ENTRIES)
+                    except Exception as e:
+                        logger.error("Failed to open CVE cache at %s, continuing without it: %s", CVE_CACHE_PATH, e)
+                _cache_opened = True
+    return _cache
+
+
+def set_cache(cache: Optional[CveCache]) -> None:
+    """
+    Replace the CVE cache used by lookups. Passing None disables caching
+    until the next call.
+    """
+    global _cache, _cache_opened
+    with _cache_lock:
+        _cache, _cache_opened = cache, True
+
+
+def _cache_get(cache: Optional[CveCache], key: str) -> Tuple[bool, Optional[Any]]:
+    """Look ``key`` up in the cache, treating a cache error (locked or corrupt DB) as a miss."""
+    if cache is None:
+        return False, None
+    try:
+        return cache.get(key)
+    except sqlite3.Error as e:
+        logger.error("CVE cache lookup failed for %s, continuing uncached: %s", key, e)
+        return False, None
+
+
+def _cache_set(cache: Optional[CveCache], key: str, value: Optional[Any], ttl: float) -> None:
+    """Store ``value`` in the cache; a cache error is logged and the value is not cached."""
+    if cache is None:
+        return
+    try:
+        cache.set(key, value, ttl)
+    except sqlite3.Error as e:
+        logger.error("CVE cache update failed for %s, continuing uncached: %s", key, e)
+
+
+def get_offline_store() -> Optional[CveStore]:
+    """Return the offline CVE store, or None if CVE_OFFLINE_DB is not configured."""
+    global _offline_store, _offline_store_opened
+    if not _offline_store_opened:
+        with _offline_store_lock:
+            if not _offline_store_opened:
+                if CVE_OFFLINE_DB:
+                    try:
+                        _offline_store = CveStore(CVE_OFFLINE_DB)
+                        logger.info("Answering CVE lookups from offline store %s", CVE_OFFLINE_DB)
+                    except Exception as e:
+                        logger.error("Failed to open offline CVE store at %s, using the CVE API: %s",
+                                     CVE_OFFLINE_DB, e)
+                _offline_store_opened = True
+    return _offline_store
+
+
+def set_offline_store(store: Optional[CveStore]) -> None:
+    """
+    Serve lookups from ``store`` instead of the CVE API. Passing None
+    switches back to HTTP.
+    """
+    global _offline_store, _offline_store_opened
+    with _offline_store_lock:
+        _offline_store, _offline_store_opened = store, True
+
+
+def get_cve_by_id(
+    cve_id: str,
+    timeout: int = CVE_REQUEST_TIMEOUT,
+    session: Optional[requests.Session] = None
+) -> Optional[Dict]:
     """
-    Fetch CVE details by CVE ID from CVE API.
+    Fetch CVE details by CVE ID from CVE API, or from the offline store
+    when one is configured.
     
     Args:
         cve_id: CVE identifier (e.g., 'CVE-2021-44228')
         timeout: Request timeout in seconds (default: from settings)
+        session: HTTP session to use (default: shared service session)
     
     Returns:
         Dict containing CVE details, or None if not found/error
@@ -35,101 +216,348 @@ def get_cve_by_id(cve_id: str, timeout: int = CVE_REQUEST_TIMEOUT) -> Optional[D
     if not CVE_PATTERN.match(cve_id):
         raise ValueError(f"Invalid CVE ID format: {cve_id}. Expected format: CVE-YYYY-NNNNN")
     
+    store = get_offline_store()
+    if store is not None:
+        cve_data = store.get(cve_id)
+        if cve_data is None:
+            logger.warning("CVE not found in offline store: %s", cve_id)
+        return cve_data
+    
+    cache = get_cache()
+    cache_key = f"cve:{cve_id}"
+    hit, cve_data = _cache_get(cache, cache_key)
+    if hit:
+        logger.debug("CVE cache hit for %s", cve_id)
+        return cve_data
+    
     url = f"{CVE_API_BASE_URL}/cve/{cve_id}"
-    logger.info(f"Fetching CVE data for {cve_id} from {url}")
+    logger.debug("Fetching CVE data for %s from %s", cve_id, url)
     
     try:
-        response = requests.get(url, timeout=timeout)
+        response = (session or get_session()).get(url, timeout=timeout)
         
         if response.status_code == 200:
             cve_data = response.json()
-            logger.info(f"Successfully fetched CVE {cve_id}")
+            logger.debug("Successfully fetched CVE %s", cve_id)
+            _cache_set(cache, cache_key, cve_data, CVE_CACHE_TTL)
             return cve_data
         elif response.status_code == 404:
-            logger.warning(f"CVE not found: {cve_id}")
+            logger.warning("CVE not found: %s", cve_id)
+            _cache_set(cache, cache_key, None, CVE_CACHE_NEGATIVE_TTL)
             return None
         else:
-            logger.error(f"Error fetching CVE {cve_id}: HTTP {response.status_code}")
+            logger.error("Error fetching CVE %s: HTTP %s", cve_id, response.status_code)
             return None
             
     except Timeout:
-        logger.error(f"Timeout fetching CVE {cve_id} after {timeout}s")
+        logger.error("Timeout fetching CVE %s after %ss", cve_id, timeout)
         return None
     except json.JSONDecodeError as e:
-        logger.error(f"Invalid JSON response for CVE {cve_id}: {e}")
+        logger.error("Invalid JSON response for CVE %s: %s", cve_id, e)
         return None
     except RequestException as e:
-        logger.error(f"Network error fetching CVE {cve_id}: {e}")
+        logger.error("Network error fetching CVE %s: %s", cve_id, e)
         return None
 
 
-def get_cve_list(cve_ids: List[str], timeout: int = CVE_REQUEST_TIMEOUT) -> List[Dict]:
+def get_cve_list(
+    cve_ids: List[str],
+    timeout: int = CVE_REQUEST_TIMEOUT,
+    max_workers: int = CVE_MAX_WORKERS,
+    deadline: Optional[float] = CVE_BATCH_DEADLINE
+) -> List[Dict]:
     """
     Fetch multiple CVEs by their IDs.
     
+    With ``max_workers`` greater than 1 the IDs are fetched concurrently on a
+    bounded thread pool. Results keep the order of ``cve_ids`` either way.
+    
     Args:
         cve_ids: List of CVE identifiers
         timeout: Request timeout in seconds per CVE (default: from settings)
+        max_workers: Maximum number of concurrent fetches (default: from settings, 1 = sequential)
+        deadline: Overall time budget in seconds for the whole batch. CVEs not
+            fetched when it expires are left out, and no request waits past
+            it. None or 0 disables it.
     
     Returns:
         List of CVE data dictionaries (excludes failed fetches)
     
     Example:
-        >>> cves = get_cve_list(['CVE-2021-44228', 'CVE-2021-45046'])
+        >>> cves = get_cve_list(['CVE-2021-44228', 'CVE-2021-45046'], max_workers=8, deadline=30)
         >>> print(f"Fetched {len(cves)} CVEs")
     """
-    cve_list = []
-    
-    for cve_id in cve_ids:
-        try:
-            cve_data = get_cve_by_id(cve_id, timeout=timeout)
-            if cve_data:
-                cve_list.append(cve_data)
-        except ValueError as e:
-            logger.warning(f"Skipping invalid CVE ID: {e}")
-            continue
-    
-    logger.info(f"Successfully fetched {len(cve_list)}/{len(cve_ids)} CVEs")
+    expires_at = time.monotonic() + deadline if deadline else None
+
+    if max_workers and max_workers > 1 and len(cve_ids) > 1:
+        results = _fetch_concurrently(cve_ids, timeout, max_workers, expires_at)
+    else:
+        results = _fetch_sequentially(cve_ids, timeout, expires_at)
+
+    cve_list = [cve_data for cve_data in results if cve_data]
+    logger.info("Successfully fetched %d/%d CVEs", len(cve_list), len(cve_ids))
     return cve_list
 
 
-def search_cves_by_vendor(vendor: str, max_results: int = CVE_MAX_RESULTS, timeout: int = CVE_REQUEST_TIMEOUT) -> List[Dict]:
+def _fetch_one(cve_id: str, timeout: float) -> Optional[Dict]:
+    """Fetch a single CVE for a batch, skipping invalid IDs."""
+    try:
+        return get_cve_by_id(cve_id, timeout=timeout)
+    except ValueError as e:
+        logger.warning("Skipping invalid CVE ID: %s", e)
+        return None
+
+
+def _fetch_sequentially(cve_ids: List[str], timeout: float, expires_at: Optional[float]) -> List[Optional[Dict]]:
+    results = []
+    for cve_id in cve_ids:
+        request_timeout = timeout
+        if expires_at is not None:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                logger.warning("Batch deadline reached, skipping %d remaining CVEs", len(cve_ids) - len(results))
+                break
+            # A slow request must not overrun the batch deadline
+            request_timeout = min(timeout, remaining)
+        results.append(_fetch_one(cve_id, request_timeout))
+    return results
+
+
+def _fetch_concurrently(
+    cve_ids: List[str],
+    timeout: int,
+    max_workers: int,
+    expires_at: Optional[float]
+) -> List[Optional[Dict]]:
+    results: List[Optional[Dict]] = [None] * len(cve_ids)
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(cve_ids)), thread_name_prefix="cve-fetch")
+    futures = {executor.submit(_fetch_one, cve_id, timeout): index for index, cve_id in enumerate(cve_ids)}
+    pending = set(futures)
+
+    try:
+        while pending:
+            remaining = None if expires_at is None else expires_at - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                logger.warning("Batch deadline reached, skipping %d remaining CVEs", len(pending))
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    logger.error("Unexpected error fetching CVE %s: %s", cve_ids[futures[future]], e)
+    finally:
+        # Do not block on in-flight requests once the deadline has passed
+        executor.shutdown(wait=not pending, cancel_futures=True)
+
+    return results
+
+
+def search_cves_by_vendor(
+    vendor: str,
+    max_results: int = CVE_MAX_RESULTS,
+    timeout: int = CVE_REQUEST_TIMEOUT,
+    session: Optional[requests.Session] = None,
+    product: Optional[str] = None,
+    stream: bool = False
+) -> List[Dict]:
     """
-    Search for CVEs by vendor name.
+    Search for CVEs by vendor name, optionally narrowed to one product.
     
     Args:
         vendor: Vendor/product name (e.g., 'apache', 'microsoft')
         max_results: Maximum number of results to return (default: from settings)
         timeout: Request timeout in seconds (default: from settings)
+        session: HTTP session to use (default: shared service session)
+        product: Optional product name within the vendor (e.g., 'log4j')
+        stream: If True, parse the response incrementally and stop reading
+            once max_results CVEs are collected (see iter_cves_by_vendor)
     
     Returns:
         List of CVE data dictionaries
     
     Example:
         >>> cves = search_cves_by_vendor('apache', max_results=5)
+        >>> cves = search_cves_by_vendor('apache', product='log4j')
+        >>> cves = search_cves_by_vendor('microsoft', max_results=50, stream=True)
     """
-    url = f"{CVE_API_BASE_URL}/search/{vendor}"
-    logger.info(f"Searching CVEs for vendor: {vendor} at {url}")
+    if stream:
+        return list(iter_cves_by_vendor(vendor, max_results=max_results, timeout=timeout,
+                                        session=session, product=product))
+    
+    search_path = f"{vendor}/{product}" if product else vendor
+    
+    store = get_offline_store()
+    if store is not None:
+        results = store.search(vendor, product=product, max_results=max_results)
+        logger.info("Found %d CVEs for %s in offline store", len(results), search_path)
+        return results
+    
+    cache = get_cache()
+    cache_key = f"search:{search_path}:{max_results}"
+    hit, cached_results = _cache_get(cache, cache_key)
+    if hit:
+        logger.debug("CVE cache hit for vendor search %s", vendor)
+        return cached_results or []
+    
+    url = f"{CVE_API_BASE_URL}/search/{search_path}"
+    logger.info("Searching CVEs for vendor: %s at %s", search_path, url)
     
     try:
-        response = requests.get(url, timeout=timeout)
+        response = (session or get_session()).get(url, timeout=timeout)
         
         if response.status_code == 200:
             results = response.json()
             # Limit results
             limited_results = results[:max_results] if isinstance(results, list) else []
-            logger.info(f"Found {len(limited_results)} CVEs for {vendor}")
+            logger.info("Found %d CVEs for %s", len(limited_results), vendor)
+            if isinstance(results, list):
+                _cache_set(cache, cache_key, limited_results, CVE_CACHE_SEARCH_TTL)
             return limited_results
         else:
-            logger.error(f"Error searching CVEs for {vendor}: HTTP {response.status_code}")
+            logger.error("Error searching CVEs for %s: HTTP %s", vendor, response.status_code)
             return []
             
     except Timeout:
-        logger.error(f"Timeout searching CVEs for {vendor} after {timeout}s")
+        logger.error("Timeout searching CVEs for %s after %ss", vendor, timeout)
         return []
     except json.JSONDecodeError as e:
-        logger.error(f"Invalid JSON response searching for {vendor}: {e}")
+        logger.error("Invalid JSON response searching for %s: %s", vendor, e)
         return []
     except RequestException as e:
-        logger.error(f"Network error searching CVEs for {vendor}: {e}")
-        return []
\ No newline at end of file
+        logger.error("Network error searching CVEs for %s: %s", vendor, e)
+        return []
+
+
+def iter_cves_by_vendor(
+    vendor: str,
+    max_results: Optional[int] = CVE_MAX_RESULTS,
+    timeout: int = CVE_REQUEST_TIMEOUT,
+    session: Optional[requests.Session] = None,
+    product: Optional[str] = None
+) -> Iterator[Dict]:
+    """
+    Stream CVEs for a vendor as they are parsed from the response body.
+    
+    Only one CVE is held in memory at a time, and the connection is closed as
+    soon as max_results CVEs have been yielded (or the caller stops
+    iterating), so the rest of a large vendor result set is never downloaded.
+    Errors are logged and end the iteration, like search_cves_by_vendor.
+    
+    Args:
+        vendor: Vendor/product name (e.g., 'apache', 'microsoft')
+        max_results: Maximum number of CVEs to yield, None for all (default: from settings)
+        timeout: Request timeout in seconds (default: from settings)
+        session: HTTP session to use (default: shared service session)
+        product: Optional product name within the vendor (e.g., 'office')
+    
+    Yields:
+        CVE data dictionaries
+    
+    Example:
+        >>> for cve in iter_cves_by_vendor('microsoft', max_results=None):
+        ...     process(cve)
+    """
+    search_path = f"{vendor}/{product}" if product else vendor
+    
+    store = get_offline_store()
+    if store is not None:
+        yield from store.search(vendor, product=product, max_results=max_results)
+        return
+    
+    cache = get_cache()
+    cache_key = f"search:{search_path}:{max_results}"
+    hit, cached_results = _cache_get(cache, cache_key)
+    if hit:
+        logger.debug("CVE cache hit for vendor search %s", vendor)
+        yield from cached_results or []
+        return
+    
+    url = f"{CVE_API_BASE_URL}/search/{search_path}"
+    logger.info("Streaming CVEs for vendor: %s from %s", search_path, url)
+    
+    try:
+        response = (session or get_session()).get(url, timeout=timeout, stream=True)
+    except Timeout:
+        logger.error("Timeout searching CVEs for %s after %ss", vendor, timeout)
+        return
+    except RequestException as e:
+        logger.error("Network error searching CVEs for %s: %s", vendor, e)
+        return
+    
+    collected = [] if cache is not None else None
+    count = 0
+    try:
+        if response.status_code != 200:
+            logger.error("Error searching CVEs for %s: HTTP %s", vendor, response.status_code)
+            return
+        if max_results is not None and max_results <= 0:
+            return
+        
+        # Non-array bodies (API error objects) yield nothing, as in search_cves_by_vendor
+        for cve in iter_json_array(response.iter_content(chunk_size=STREAM_CHUNK_SIZE), array_keys=()):
+            count += 1
+            if collected is not None:
+                collected.append(cve)
+            yield cve
+            if max_results is not None and count >= max_results:
+                break
+        
+        logger.info("Found %d CVEs for %s", count, vendor)
+        if collected is not None:
+            _cache_set(cache, cache_key, collected, CVE_CACHE_SEARCH_TTL)
+    except Timeout:
+        logger.error("Timeout searching CVEs for %s after %ss", vendor, timeout)
+    except ValueError as e:
+        logger.error("Invalid JSON response searching for %s: %s", vendor, e)
+    except RequestException as e:
+        logger.error("Network error searching CVEs for %s: %s", vendor, e)
+    finally:
+        # Drops the connection instead of draining the remaining body
+        response.close()
+
+
+def parse_watchlist(spec: str) -> List[Dict[str, Optional[str]]]:
+    """
+    Parse a CVE scan watchlist.
+
+    Entries are comma-separated ``Display Name=vendor/product`` pairs. The
+    display name is matched against installed software DisplayNames; the
+    product part is optional.
+
+    Example:
+        >>> parse_watchlist("Apache Tomcat=apache/tomcat, 7-Zip=7-zip")
+        [{'name': 'Apache Tomcat', 'vendor': 'apache', 'product': 'tomcat'},
+         {'name': '7-Zip', 'vendor': '7-zip', 'product': None}]
+    """
+    watchlist = []
+    for entry in spec.split(","):
+        name, sep, search = entry.partition("=")
+        name, search = name.strip(), search.strip()
+        if not sep or not name or not search:
+            if entry.strip():
+                logger.warning("Ignoring invalid watchlist entry: %r", entry.strip())
+            continue
+        vendor, _, product = search.partition("/")
+        watchlist.append({"name": name, "vendor": vendor.strip(), "product": product.strip() or None})
+    return watchlist
+
+
+def fetch_watchlist_cves(
+    watchlist: List[Dict[str, Optional[str]]],
+    max_results: int = CVE_MAX_RESULTS,
+    timeout: int = CVE_REQUEST_TIMEOUT
+) -> List[Dict]:
+    """
+    Search CVEs for every watchlist entry, tagged for check_blacklisted_software.
+
+    Each returned CVE is a copy with ``product`` set to the entry's display
+    name, so it matches installed software by DisplayName.
+    """
+    cve_list = []
+    for entry in watchlist:
+        for cve in search_cves_by_vendor(entry["vendor"], max_results=max_results, timeout=timeout,
+                                         product=entry["product"]):
+            if isinstance(cve, dict):
+                cve_list.append(dict(cve, product=entry["name"]))
+    return cve_list
@@ -0,0 +1,272 @@
+import argparse
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from utils.cpe_utils import extract_cpe_matches
+from utils.json_stream import iter_json_file
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cves (
+    id TEXT PRIMARY KEY,
+    modified TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cve_products (
+    vendor TEXT NOT NULL,
+    product TEXT NOT NULL,
+    cve_id TEXT NOT NULL,
+    PRIMARY KEY (vendor, product, cve_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_cve_products_cve ON cve_products (cve_id);
+CREATE TABLE IF NOT EXISTS imports (
+    source TEXT NOT NULL,
+    imported_at REAL NOT NULL,
+    inserted INTEGER NOT NULL,
+    updated INTEGER NOT NULL,
+    unchanged INTEGER NOT NULL,
+    invalid INTEGER NOT NULL
+);
+"""
+
+
+def _first_english(descriptions: List[Dict], key: str = "value") -> str:
+    for description in descriptions or []:
+        if description.get("lang", "en").startswith("en"):
+            return description.get(key, "")
+    return ""
+
+
+def normalize_cve_record(item: Dict) -> Optional[Dict]:
+    """
+    Convert a feed item to the record shape returned by the CVE API.
+
+    Supports NVD 2.0 and 1.1 feed items, CVE JSON 5 records and CIRCL records.
+    The result has id, summary, published, modified, cvss, vulnerable_product
+    and cpe_matches (see utils.cpe_utils.extract_cpe_matches).
+
+    Returns:
+        Normalized dict, or None if the item has no CVE ID.
+    """
+    if not isinstance(item, dict):
+        return None
+
+    cve = item.get("cve") if isinstance(item.get("cve"), dict) else None
+    cvss = None
+    if cve is not None and "id" in cve:
+        # NVD 2.0
+        cve_id = cve["id"]
+        summary = _first_english(cve.get("descriptions"))
+        published, modified = cve.get("published"), cve.get("lastModified")
+        metrics = cve.get("metrics", {})
+        for version in ("cvssMetricV31", "cvssMetricV30", "cvssMetricV2"):
+            if metrics.get(version):
+                cvss = metrics[version][0].get("cvssData", {}).get("baseScore")
+                break
+    elif cve is not None and "CVE_data_meta" in cve:
+        # NVD 1.1
+        cve_id = cve["CVE_data_meta"].get("ID")
+        summary = _first_english(cve.get("description", {}).get("description_data"))
+        published, modified = item.get("publishedDate"), item.get("lastModifiedDate")
+        impact = item.get("impact", {})
+        cvss = (impact.get("baseMetricV3", {}).get("cvssV3", {}).get("baseScore")
+                or impact.get("baseMetricV2", {}).get("cvssV2", {}).get("baseScore"))
+    elif "cveMetadata" in item:
+        # CVE JSON 5
+        metadata = item["cveMetadata"]
+        cve_id = metadata.get("cveId")
+        summary = _first_english(item.get("containers", {}).get("cna", {}).get("descriptions"))
+        published, modified = metadata.get("datePublished"), metadata.get("dateUpdated")
+    else:
+        # CIRCL API record
+        cve_id = item.get("id")
+        summary = item.get("summary", "")
+        published = item.get("Published") or item.get("published")
+        modified = item.get("Modified") or item.get("modified")
+        cvss = item.get("cvss")
+
+    if not cve_id:
+        return None
+
+    cpe_matches = extract_cpe_matches(item)
+    return {
+        "id": cve_id,
+        "summary": summary,
+        "published": published,
+        "modified": modified,
+        "cvss": cvss,
+        "vulnerable_product": sorted({m["cpe"] for m in cpe_matches if m["cpe"]}),
+        "cpe_matches": cpe_matches,
+    }
+
+
+class CveStore:
+    """
+    Local indexed CVE database built from downloaded NVD/CVE feed files.
+
+    Records are keyed by CVE ID and indexed by (vendor, product), so
+    lookups are single B-tree probes and need no network access.
+
+    Example:
+        >>> store = CveStore('data/cve/cve_store.sqlite')
+        >>> store.import_feed('nvdcve-2.0-2024.json.gz')
+        >>> store.get('CVE-2024-3094')['summary']
+        >>> store.search('apache', product='log4j', max_results=10)
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, cve_id: str) -> Optional[Dict]:
+        """Return the stored record for ``cve_id``, or None if unknown."""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM cves WHERE id = ?", (cve_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def search(self, vendor: str, product: Optional[str] = None, max_results: Optional[int] = None) -> List[Dict]:
+        """
+        Return records affecting ``vendor`` (optionally a single product),
+        newest CVE IDs first.
+        """
+        query = ("SELECT c.data FROM cve_products p JOIN cves c ON c.id = p.cve_id "
+                 "WHERE p.vendor = ?")
+        params: list = [vendor.lower()]
+        if product:
+            query += " AND p.product = ?"
+            params.append(product.lower())
+        # Newest first by year, then sequence number; as text, CVE-2021-9999 would sort above CVE-2021-10000
+        query += (" GROUP BY c.id ORDER BY CAST(substr(c.id, 5, 4) AS INTEGER) DESC, "
+                  "CAST(substr(c.id, 10) AS INTEGER) DESC")
+        if max_results:
+            query += " LIMIT ?"
+            params.append(max_results)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cves").fetchone()[0]
+
+    def import_records(self, items: Iterable[Dict], source: str = "", batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Upsert feed items into the store.
+
+        Imports are incremental: a record is only rewritten when its
+        ``modified`` timestamp is newer than the stored one (or either is
+        missing), so re-importing a feed or applying a delta feed only touches
+        changed CVEs.
+
+        Returns:
+            Counters: inserted, updated, unchanged, invalid
+        """
+        stats = {"inserted": 0, "updated": 0, "unchanged": 0, "invalid": 0}
+        batch = []
+        for item in items:
+            record = normalize_cve_record(item)
+            if record is None:
+                stats["invalid"] += 1
+                continue
+            batch.append(record)
+            if len(batch) >= batch_size:
+                self._write_batch(batch, stats)
+                batch = []
+        if batch:
+            self._write_batch(batch, stats)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO imports VALUES (?, ?, ?, ?, ?, ?)",
+                (source, time.time(), stats["inserted"], stats["updated"], stats["unchanged"], stats["invalid"])
+            )
+        return stats
+
+    def import_feed(self, feed_path: Union[str, Path], batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Stream-import a JSON feed file (NVD 1.1/2.0, or an array of CVE/CIRCL
+        records; ``.gz`` files are decompressed on the fly).
+        """
+        start = time.perf_counter()
+        stats = self.import_records(iter_json_file(feed_path), source=str(feed_path), batch_size=batch_size)
+        logger.info(
+            "Imported CVE feed %s in %.1fs: %d new, %d updated, %d unchanged, %d invalid",
+            feed_path, time.perf_counter() - start,
+            stats['inserted'], stats['updated'], stats['unchanged'], stats['invalid']
+        )
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _write_batch(self, batch: List[Dict], stats: Dict[str, int]) -> None:
+        with self._lock, self._conn:
+            ids = [record["id"] for record in batch]
+            existing = {}
+            for offset in range(0, len(ids), 500):
+                chunk = ids[offset:offset + 500]
+                placeholders = ",".join("?" * len(chunk))
+                existing.update(self._conn.execute(
+                    f"SELECT id, modified FROM cves WHERE id IN ({placeholders})", chunk
+                ).fetchall())
+
+            for record in batch:
+                cve_id = record["id"]
+                if cve_id in existing:
+                    stored_modified = existing[cve_id]
+                    if stored_modified and record["modified"] and record["modified"] <= stored_modified:
+                        stats["unchanged"] += 1
+                        continue
+                    stats["updated"] += 1
+                    self._conn.execute("DELETE FROM cve_products WHERE cve_id = ?", (cve_id,))
+                else:
+                    stats["inserted"] += 1
+                existing[cve_id] = record["modified"]
+
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cves (id, modified, data) VALUES (?, ?, ?)",
+                    (cve_id, record["modified"], json.dumps(record, ensure_ascii=False))
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO cve_products (vendor, product, cve_id) VALUES (?, ?, ?)",
+                    {(m["vendor"], m["product"], cve_id) for m in record["cpe_matches"]}
+                )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point: python -m services.cve_store FEED [FEED ...]"""
+    from config.settings import CVE_OFFLINE_DB
+
+    parser = argparse.ArgumentParser(description="Import CVE/NVD JSON feeds into the offline CVE store")
+    parser.add_argument("feeds", nargs="+", help="Feed files (.json or .json.gz); later files are applied as deltas")
+    parser.add_argument("--db", default=CVE_OFFLINE_DB, help="Store path (default: CVE_OFFLINE_DB)")
+    args = parser.parse_args(argv)
+
+    if not args.db:
+        parser.error("no store path given; pass --db or set CVE_OFFLINE_DB")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    store = CveStore(args.db)
+    try:
+        for feed in args.feeds:
+            store.import_feed(feed)
+        logger.info("Offline CVE store %s holds %d CVEs", args.db, store.count())
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,531 @@
+from contextlib import ExitStack
+from dataclasses import dataclass
 from email.message import EmailMessage
-from email.mime.base import MIMEBase
-from email import encoders
+from email.utils import getaddresses
+import email.policy
+from html import escape
 from config import settings
+from config.settings import (
+    EMAIL_ATTACHMENT_BUDGET,
+    EMAIL_OVERSIZE_STRATEGIES,
+    EMAIL_DOWNSCALE_MAX_DIMENSION,
+    EMAIL_STREAM_THRESHOLD,
+)
+import base64
+import re
 import smtplib
 import logging
-from typing import Union, List, Optional
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from typing import Union, List, Optional, Dict, Iterable, BinaryIO, Tuple, Callable
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".webp")
+
+# Bytes encoded at a time; a multiple of 57 so every base64 line is a full 76 characters
+_BASE64_CHUNK = 57 * 1024
+# Size of a streamed message kept in memory before it spills to a temporary file
+_SPOOL_MEMORY = 1024 * 1024
+# Bytes sent to the socket at a time when streaming a message
+_SEND_BUFFER = 64 * 1024
+_PLACEHOLDER = re.compile(rb"@@attachment-[0-9a-f]{32}@@")
+
+
+def _format_addresses(addresses: Union[str, List[str], None]) -> Optional[str]:
+    if addresses is None:
+        return None
+    if isinstance(addresses, str):
+        return addresses
+    return ", ".join(addresses)
+
+
+@dataclass
+class _Attachment:
+    name: str
+    path: Path
+    size: int
+    # Files the user asked to attach that this one stands for (itself, or the files in a zip)
+    sources: List[Path]
+
+
+def _collect_attachments(attachments: Optional[List[Union[str, Path]]]) -> List[_Attachment]:
+    items = []
+    for attachment_path in attachments or []:
+        try:
+            file_path = Path(attachment_path)
+            if not file_path.exists():
+                logger.warning("Attachment not found: %s", file_path)
+                continue
+            items.append(_Attachment(file_path.name, file_path, int(file_path.stat().st_size), [file_path]))
+        except Exception as e:
+            logger.warning("Failed to attach file %s: %s", attachment_path, e)
+    return items
+
+
+def _downscale_images(items: List[_Attachment], workdir: Path) -> List[_Attachment]:
+    """Re-encode image attachments as JPEG no larger than EMAIL_DOWNSCALE_MAX_DIMENSION (requires Pillow)."""
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning("Pillow is not installed, image attachments cannot be downscaled")
+        return items
+
+    result = []
+    for index, item in enumerate(items):
+        if item.path.suffix.lower() in IMAGE_SUFFIXES:
+            target = workdir / f"{index}_{item.path.stem}.jpg"
+            try:
+                with Image.open(item.path) as image:
+                    image = image.convert("RGB")
+                    image.thumbnail((EMAIL_DOWNSCALE_MAX_DIMENSION, EMAIL_DOWNSCALE_MAX_DIMENSION))
+                    image.save(target, "JPEG", quality=80, optimize=True)
+                size = target.stat().st_size
+                if size < item.size:
+                    result.append(_Attachment(f"{item.path.stem}.jpg", target, size, item.sources))
+                    continue
+            except Exception as e:
+                logger.warning("Failed to downscale attachment %s: %s", item.path, e)
+        result.append(item)
+    return result
+
+
+def _zip_attachments(items: List[_Attachment], workdir: Path) -> List[_Attachment]:
+    """Compress all attachments into one zip archive (files are streamed into it)."""
+    target = workdir / "attachments.zip"
+    names = set()
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for item in items:
+            name = item.name
+            while name in names:
+                name = f"_{name}"
+            names.add(name)
+            archive.write(item.path, arcname=name)
+    sources = [source for item in items for source in item.sources]
+    return [_Attachment(target.name, target, target.stat().st_size, sources)]
+
+
+def _plan_attachments(attachments, stack: ExitStack):
+    """
+    Fit attachments into the size budget.
+
+    Over budget, the EMAIL_OVERSIZE_STRATEGIES are tried in order
+    ("downscale" images, "zip" everything); whatever still does not fit is
+    left out, smallest files first kept, and returned as references.
+
+    Returns:
+        (attachments to send, attachments left out)
+    """
+    budget = EMAIL_ATTACHMENT_BUDGET
+    items = _collect_attachments(attachments)
+    total = sum(item.size for item in items)
+    if total <= budget:
+        return items, []
+
+    workdir = None
+    for strategy in (name.strip().lower() for name in EMAIL_OVERSIZE_STRATEGIES.split(",") if name.strip()):
+        if workdir is None:
+            workdir = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="email-")))
+        if strategy == "downscale":
+            items = _downscale_images(items, workdir)
+        elif strategy == "zip":
+            zipped = _zip_attachments(items, workdir)
+            if zipped[0].size < sum(item.size for item in items):
+                items = zipped
+        else:
+            logger.warning("Unknown attachment strategy: %s", strategy)
+            continue
+        reduced = sum(item.size for item in items)
+        logger.info("Attachments reduced from %d to %d bytes (%s)", total, reduced, strategy)
+        if reduced <= budget:
+            return items, []
+
+    attached, referenced, used = [], [], 0
+    for item in sorted(items, key=lambda item: item.size):
+        if used + item.size <= budget:
+            attached.append(item)
+            used += item.size
+        else:
+            referenced.append(item)
+    logger.warning("%d attachment(s) over the %d byte budget are referenced instead of attached",
+                   len(referenced), budget)
+    return [item for item in items if item in attached], referenced
+
+
+def _reference_note(referenced: List[_Attachment], html: bool = False) -> str:
+    sources = [(source, item.size if len(item.sources) == 1 else None)
+               for item in referenced for source in item.sources]
+    header = f"Not attached (over the {EMAIL_ATTACHMENT_BUDGET / 1024 / 1024:.0f} MB attachment limit):"
+    if html:
+        items = "".join(f"<li>{escape(str(source))}</li>" for source, _ in sources)
+        return f"<p>{escape(header)}</p><ul>{items}</ul>"
+    lines = [f"  - {source}" + (f" ({size / 1024 / 1024:.1f} MB)" if size else "") for source, size in sources]
+    return "\n".join([header] + lines)
+
+
+def _compose(
+    to_address, subject, body, html_body, attachments, cc, bcc, stack: ExitStack
+) -> Tuple[EmailMessage, List[_Attachment]]:
+    """Message with headers and body, plus the attachments to add to it."""
+    files, referenced = _plan_attachments(attachments, stack)
+    if referenced:
+        body = f"{body}\n\n{_reference_note(referenced)}"
+        if html_body:
+            html_body = f"{html_body}\n{_reference_note(referenced, html=True)}"
+
+    msg = EmailMessage()
+    msg["From"] = settings.SMTP_USER
+    msg["Subject"] = subject
+
+    # Handle multiple recipients
+    msg["To"] = _format_addresses(to_address)
+    if cc:
+        msg["Cc"] = _format_addresses(cc)
+    if bcc:
+        msg["Bcc"] = _format_addresses(bcc)
+
+    # Set email content
+    msg.set_content(body)
+    
+    # Add HTML alternative if provided
+    if html_body:
+        msg.add_alternative(html_body, subtype='html')
+
+    return msg, files
+
+
+def _attach_in_memory(msg: EmailMessage, files: List[_Attachment]) -> None:
+    for item in files:
+        try:
+            with open(item.path, 'rb') as f:
+                file_data = f.read()
+                msg.add_attachment(
+                    file_data,
+                    maintype='application',
+                    subtype='octet-stream',
+                    filename=item.name
+                )
+            logger.debug("Attached file: %s", item.name)
+        except Exception as e:
+            logger.warning("Failed to attach file %s: %s", item.path, e)
+
+
+def message_envelope(msg: EmailMessage) -> Tuple[str, List[str]]:
+    """Sender and recipients (To, Cc and Bcc) of a message, as smtplib's send_message derives them."""
+    sender = msg["Sender"] or msg["From"]
+    fields = msg.get_all("To", []) + msg.get_all("Cc", []) + msg.get_all("Bcc", [])
+    return sender, [address for _, address in getaddresses([str(field) for field in fields])]
+
+
+def _write_base64(out: BinaryIO, path: Path) -> int:
+    """Stream a file as base64 lines, without the final line break. Returns bytes written."""
+    written = 0
+    separator = b""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_BASE64_CHUNK)
+            if not chunk:
+                break
+            encoded = base64.encodebytes(chunk).rstrip(b"\n").replace(b"\n", b"\r\n")
+            out.write(separator + encoded)
+            written += len(separator) + len(encoded)
+            separator = b"\r\n"
+    return written
+
+
+def _write_mime(out: BinaryIO, msg: EmailMessage, files: List[_Attachment]) -> int:
+    """
+    Write ``msg`` plus attachments to ``out`` with CRLF line endings, Bcc left out.
+
+    The email package lays out the message with a placeholder for each
+    attachment body, and the files are base64-encoded into those places
+    chunk by chunk, so no attachment is ever held in memory.
+
+    Returns:
+        Bytes written
+    """
+    placeholders = {}
+    for item in files:
+        placeholder = f"@@attachment-{uuid.uuid4().hex}@@"
+        msg.add_attachment(b"", maintype='application', subtype='octet-stream', filename=item.name)
+        list(msg.iter_attachments())[-1].set_payload(placeholder)
+        placeholders[placeholder.encode("ascii")] = item
+    del msg["Bcc"]
+    layout = msg.as_bytes(policy=email.policy.SMTP)
+
+    written, position = 0, 0
+    for match in _PLACEHOLDER.finditer(layout):
+        out.write(layout[position:match.start()])
+        written += match.start() - position
+        written += _write_base64(out, placeholders[match.group()].path)
+        position = match.end()
+    out.write(layout[position:])
+    return written + len(layout) - position
+
+
+def build_message(
+    to_address: Union[str, List[str]],
+    subject: str,
+    body: str,
+    html_body: Optional[str] = None,
+    attachments: Optional[List[Union[str, Path]]] = None,
+    cc: Optional[Union[str, List[str]]] = None,
+    bcc: Optional[Union[str, List[str]]] = None
+) -> EmailMessage:
+    """Build the message sent by send_email (same arguments, see there) in memory.
+
+    Missing or unreadable attachments are logged and left out. Prefer
+    write_message for large attachments.
+    """
+    with ExitStack() as stack:
+        msg, files = _compose(to_address, subject, body, html_body, attachments, cc, bcc, stack)
+        _attach_in_memory(msg, files)
+    return msg
+
+
+def write_message(
+    out: BinaryIO,
+    to_address: Union[str, List[str]],
+    subject: str,
+    body: str,
+    html_body: Optional[str] = None,
+    attachments: Optional[List[Union[str, Path]]] = None,
+    cc: Optional[Union[str, List[str]]] = None,
+    bcc: Optional[Union[str, List[str]]] = None
+) -> Dict:
+    """Stream the message sent by send_email (same arguments) to a binary file.
+
+    Attachments are encoded chunk by chunk, so memory use does not depend on
+    their size. Bcc recipients are only part of the returned envelope.
+
+    Returns:
+        Dict with 'from', 'recipients' (for SmtpClient.send_stream) and 'size' in bytes
+    """
+    with ExitStack() as stack:
+        msg, files = _compose(to_address, subject, body, html_body, attachments, cc, bcc, stack)
+        sender, recipients = message_envelope(msg)
+        size = _write_mime(out, msg, files)
+    return {"from": sender, "recipients": recipients, "size": size}
+
+
+def _warn_refused(refused: Dict[str, Tuple[int, bytes]], subject) -> None:
+    """Log recipients the server refused while accepting the message for the others."""
+    if refused:
+        logger.warning("Email %r not delivered to refused recipients: %s", subject, ", ".join(
+            f"{address} ({code} {response.decode(errors='replace')})" for address, (code, response) in refused.items()
+        ))
+
+
+class SmtpClient:
+    """Reusable authenticated SMTP session.
+
+    The connection (EHLO, STARTTLS, EHLO, LOGIN) is opened on the first
+    send and kept for the following ones, so a batch of messages pays the
+    handshake once. A connection the server has dropped (idle timeout,
+    restart) is reopened transparently and the message retried once. After
+    ``max_messages`` messages the session is renewed, since many servers cap
+    messages per connection. Sends are serialized, so one client can be
+    shared between threads.
+
+    Args:
+        host, port, user, password, timeout: Server settings (default: from settings)
+        starttls: Upgrade the connection with STARTTLS before logging in
+        max_messages: Messages per connection before reconnecting (0 = no limit)
+
+    Example:
+        >>> with SmtpClient() as client:
+        ...     for msg in messages:
+        ...         client.send(msg)
+    """
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        timeout: Optional[float] = None,
+        starttls: Optional[bool] = None,
+        max_messages: Optional[int] = None
+    ):
+        self.host = host if host is not None else settings.SMTP_HOST
+        self.port = port if port is not None else settings.SMTP_PORT
+        self.user = user if user is not None else settings.SMTP_USER
+        self.password = password if password is not None else settings.SMTP_PASSWORD
+        self.timeout = timeout if timeout is not None else getattr(settings, 'SMTP_TIMEOUT', 10)
+        self.starttls = starttls if starttls is not None else getattr(settings, 'SMTP_STARTTLS', True)
+        self.max_messages = max_messages if max_messages is not None else getattr(
+            settings, 'SMTP_MAX_MESSAGES_PER_CONNECTION', 100)
+        self.connections = 0
+        self._server = None
+        self._stack = ExitStack()
+        self._sent_on_connection = 0
+        self._lock = threading.RLock()
+
+    def __enter__(self) -> "SmtpClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _connect(self):
+        started = time.perf_counter()
+        # Connect with timeout for fast failure on network issues
+        server = self._stack.enter_context(smtplib.SMTP(self.host, self.port, timeout=self.timeout))
+        try:
+            server.ehlo()
+            if self.starttls:
+                server.starttls()
+                server.ehlo()
+            if self.user:
+                server.login(self.user, self.password)
+        except BaseException:
+            self._disconnect()
+            raise
+        self._server = server
+        self._sent_on_connection = 0
+        self.connections += 1
+        logger.debug("SMTP session to %s:%s opened in %.3fs", self.host, self.port, time.perf_counter() - started)
+        return server
+
+    def _disconnect(self) -> None:
+        self._server = None
+        try:
+            # Sends QUIT and closes the socket
+            self._stack.close()
+        except Exception as e:
+            logger.debug("Error closing SMTP session: %s", e)
+        self._stack = ExitStack()
+
+    def _deliver(self, transmit: Callable):
+        """Run ``transmit(server)`` on the shared session, reconnecting once if the server dropped it.
+
+        Returns:
+            What ``transmit`` returned
+        """
+        with self._lock:
+            if self._server is not None and self.max_messages and self._sent_on_connection >= self.max_messages:
+                self._disconnect()
+            server = self._server or self._connect()
+            try:
+                result = transmit(server)
+            except smtplib.SMTPServerDisconnected:
+                logger.info("SMTP server %s closed the connection, reconnecting", self.host)
+                self._disconnect()
+                result = transmit(self._connect())
+            self._sent_on_connection += 1
+            return result
+
+    def send(self, msg: EmailMessage) -> int:
+        """Send one message over the shared session.
+
+        The message is serialized once, with Bcc left out of the headers.
+
+        Recipients the server refuses while accepting the others are logged
+        as a warning.
+
+        Returns:
+            int: Size of the sent message in bytes
+
+        Raises:
+            smtplib.SMTPException: On SMTP errors (after one reconnect for a dropped connection)
+            OSError: On network errors while connecting
+        """
+        sender, recipients = message_envelope(msg)
+        bcc = msg["Bcc"]
+        del msg["Bcc"]
+        try:
+            data = msg.as_bytes(policy=email.policy.SMTP)
+        finally:
+            if bcc is not None:
+                msg["Bcc"] = bcc
+        refused = self._deliver(lambda server: server.sendmail(sender, recipients, data))
+        _warn_refused(refused, msg["Subject"])
+        return len(data)
+
+    def send_stream(
+        self, stream: BinaryIO, from_addr: str, to_addrs: List[str]
+    ) -> Dict[str, Tuple[int, bytes]]:
+        """Send an already formatted message from a binary file, line by line.
+
+        Used for large messages (see write_message), which never need to be
+        held in memory. The stream must be seekable, for a retry after a
+        reconnect.
+
+        Returns:
+            Recipients the server refused, as {address: (code, response)}
+            (like smtplib's sendmail, empty when all were accepted)
+
+        Raises:
+            smtplib.SMTPException: As smtplib's sendmail (after one reconnect for a dropped connection)
+        """
+        return self._deliver(lambda server: self._transmit(server, stream, from_addr, to_addrs))
+
+    @staticmethod
+    def _transmit(server, stream: BinaryIO, from_addr: str, to_addrs: List[str]) -> Dict[str, Tuple[int, bytes]]:
+        stream.seek(0)
+        code, response = server.mail(from_addr)
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPSenderRefused(code, response, from_addr)
+        refused = {}
+        for address in to_addrs:
+            code, response = server.rcpt(address)
+            if code not in (250, 251):
+                refused[address] = (code, response)
+        if len(refused) == len(to_addrs):
+            server.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        server.putcmd("data")
+        code, response = server.getreply()
+        if code != 354:
+            server.rset()
+            raise smtplib.SMTPDataError(code, response)
+        buffer = []
+        buffered = 0
+        for line in stream:
+            # CRLF line endings and dot-stuffing, as smtplib's data() applies them
+            line = line.rstrip(b"\r\n") + b"\r\n"
+            if line.startswith(b"."):
+                line = b"." + line
+            buffer.append(line)
+            buffered += len(line)
+            if buffered >= _SEND_BUFFER:
+                server.send(b"".join(buffer))
+                buffer, buffered = [], 0
+        buffer.append(b".\r\n")
+        server.send(b"".join(buffer))
+        code, response = server.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, response)
+        return refused
+
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
+
+
+def _send_composed(
+    client: SmtpClient, to_address, subject, body, html_body=None, attachments=None, cc=None, bcc=None
+) -> int:
+    """Build and send one message, streaming it when its attachments are large. Returns its size in bytes."""
+    with ExitStack() as stack:
+        msg, files = _compose(to_address, subject, body, html_body, attachments, cc, bcc, stack)
+        if sum(item.size for item in files) <= EMAIL_STREAM_THRESHOLD:
+            _attach_in_memory(msg, files)
+            return client.send(msg)
+        # Built in a temporary file and sent from there, so peak memory stays bounded
+        sender, recipients = message_envelope(msg)
+        spool = stack.enter_context(tempfile.SpooledTemporaryFile(max_size=_SPOOL_MEMORY))
+        size = _write_mime(spool, msg, files)
+        _warn_refused(client.send_stream(spool, sender, recipients), subject)
+        return size
+
 
 def send_email(
     to_address: Union[str, List[str]],
@@ -50,66 +567,11 @@ def send_email(
         ... )
         True
     """
-    msg = EmailMessage()
-    msg["From"] = settings.SMTP_USER
-    msg["Subject"] = subject
-
-    # Handle multiple recipients
-    def _format_addresses(addresses: Union[str, List[str], None]) -> Optional[str]:
-        if addresses is None:
-            return None
-        if isinstance(addresses, str):
-            return addresses
-        return ", ".join(addresses)
-
-    msg["To"] = _format_addresses(to_address)
-    if cc:
-        msg["Cc"] = _format_addresses(cc)
-    if bcc:
-        msg["Bcc"] = _format_addresses(bcc)
-
-    # Set email content
-    msg.set_content(body)
-    
-    # Add HTML alternative if provided
-    if html_body:
-        msg.add_alternative(html_body, subtype='html')
-
-    # Add attachments if provided
-    if attachments:
-        for attachment_path in attachments:
-            try:
-                file_path = Path(attachment_path)
-                if not file_path.exists():
-                    logger.warning("Attachment not found: %s", file_path)
-                    continue
-
-                with open(file_path, 'rb') as f:
-                    file_data = f.read()
-                    msg.add_attachment(
-                        file_data,
-                        maintype='application',
-                        subtype='octet-stream',
-                        filename=file_path.name
-                    )
-                logger.debug("Attached file: %s", file_path.name)
-            except Exception as e:
-                logger.warning("Failed to attach file %s: %s", attachment_path, e)
-
     try:
-        # Connect with timeout for fast failure on network issues
-        with smtplib.SMTP(
-            settings.SMTP_HOST,
-            settings.SMTP_PORT,
-            timeout=getattr(settings, 'SMTP_TIMEOUT', 10)
-        ) as server:
-            server.ehlo()
-            server.starttls()
-            server.ehlo()
-            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            server.send_message(msg)
+        with SmtpClient() as client:
+            size = _send_composed(client, to_address, subject, body, html_body, attachments, cc, bcc)
 
-        logger.info("Email sent to %s (subject: %s)", to_address, subject)
+        logger.info("Email sent to %s (subject: %s, %d bytes)", to_address, subject, size)
         return True
 
     except smtplib.SMTPException as e:
@@ -123,3 +585,54 @@ def send_email(
         if raise_on_error:
             raise
         return False
+
+
+def send_emails(
+    messages: Iterable[Union[EmailMessage, Dict]],
+    client: Optional[SmtpClient] = None,
+    raise_on_error: bool = False
+) -> List[bool]:
+    """Send many emails over one SMTP session.
+
+    Args:
+        messages: EmailMessage objects, or dicts of send_email arguments
+            (to_address, subject, body, html_body, attachments, cc, bcc).
+        client: SmtpClient to use and leave open (default: a new one, closed afterwards).
+        raise_on_error: If True, re-raises the first error. If False, failed
+            messages are logged and reported as False.
+
+    Returns:
+        List[bool]: Success of each message, in order.
+
+    Example:
+        >>> send_emails([
+        ...     {"to_address": "ops@example.com", "subject": "host-a: alert", "body": "..."},
+        ...     {"to_address": "ops@example.com", "subject": "host-b: alert", "body": "..."},
+        ... ])
+        [True, True]
+    """
+    results = []
+    started = time.perf_counter()
+    owned = client is None
+    client = client or SmtpClient()
+    try:
+        for message in messages:
+            try:
+                if isinstance(message, EmailMessage):
+                    client.send(message)
+                else:
+                    _send_composed(client, **message)
+                results.append(True)
+            except Exception as e:
+                recipient = message["To"] if isinstance(message, EmailMessage) else message.get("to_address")
+                logger.exception("Error sending email to %s: %s", recipient, e)
+                if raise_on_error:
+                    raise
+                results.append(False)
+    finally:
+        if owned:
+            client.close()
+
+    logger.info("Sent %d of %d emails in %.2fs over %d SMTP session(s)",
+                sum(results), len(results), time.perf_counter() - started, client.connections)
+    return results
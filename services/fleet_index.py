@@ -0,0 +1,335 @@
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from utils.report_formats import FORMATS, deserialize_report
+
+logger = logging.getLogger(__name__)
+
+# Latest report of each host, as written by save_software_list_to_file
+REPORT_NAMES = {f"software{ext}": fmt for fmt, ext in FORMATS.items()}
+
+# Hosts written per transaction during ingestion
+INGEST_BATCH_SIZE = 200
+
+# Product ids kept in memory while ingesting; the map is dropped when it grows past this
+PRODUCT_ID_CACHE_SIZE = 100000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    id INTEGER PRIMARY KEY,
+    hostname TEXT NOT NULL UNIQUE,
+    report_path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    entries INTEGER NOT NULL,
+    ingested_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    name_key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    publisher TEXT NOT NULL,
+    UNIQUE (name_key, version, publisher)
+);
+CREATE TABLE IF NOT EXISTS host_products (
+    product_id INTEGER NOT NULL,
+    host_id INTEGER NOT NULL,
+    PRIMARY KEY (product_id, host_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_host_products_host ON host_products (host_id);
+"""
+
+ProductKey = Tuple[str, str, str]
+
+
+def _product_key(entry: Dict) -> Optional[ProductKey]:
+    name = (entry.get("DisplayName") or "").strip()
+    if not name:
+        return None
+    return name, (entry.get("DisplayVersion") or "").strip(), (entry.get("Publisher") or "").strip()
+
+
+def find_host_reports(data_dir: Union[str, Path]) -> Iterator[Tuple[str, Path, str]]:
+    """
+    Yield (hostname, latest report path, format) for each host under
+    ``data_dir`` (data_dir/<hostname>/reports/software.<ext>). When a host
+    has latest reports in several formats, the most recently written wins.
+    """
+    try:
+        host_dirs = os.scandir(data_dir)
+    except FileNotFoundError:
+        return
+    with host_dirs:
+        for host_dir in host_dirs:
+            if not host_dir.is_dir():
+                continue
+            reports_dir = os.path.join(host_dir.path, "reports")
+            candidates = []
+            for name, fmt in REPORT_NAMES.items():
+                path = os.path.join(reports_dir, name)
+                try:
+                    candidates.append((os.stat(path).st_mtime_ns, path, fmt))
+                except OSError:
+                    continue
+            if candidates:
+                _, path, fmt = max(candidates)
+                yield host_dir.name, Path(path), fmt
+
+
+class FleetIndex:
+    """
+    Inverted index of the installed software of a fleet of hosts.
+
+    Every host's latest inventory report is ingested into SQLite, mapping
+    each distinct (product, version, publisher) to the hosts that have it,
+    so "which hosts run X at version Y" is an index probe instead of a scan
+    of every report. Ingestion is incremental: reports whose mtime and size
+    are unchanged are not opened, and reports whose content hash is
+    unchanged are not re-indexed. Reports are processed one at a time, so
+    memory use does not grow with the number of hosts.
+
+    Example:
+        >>> index = FleetIndex('data/fleet/fleet_index.sqlite')
+        >>> index.ingest('data')
+        >>> index.hosts_with('7-Zip', version='23.01')
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def ingest(self, data_dir: Union[str, Path], prune: bool = True,
+               batch_size: int = INGEST_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Bring the index up to date with the host reports under ``data_dir``.
+
+        Args:
+            data_dir: Directory holding one <hostname>/reports/ folder per host
+            prune: Drop hosts whose report is no longer present
+            batch_size: Hosts written per transaction
+
+        Returns:
+            Counters: indexed (new or changed reports), unchanged, failed, removed
+        """
+        start = time.perf_counter()
+        stats = {"indexed": 0, "unchanged": 0, "failed": 0, "removed": 0}
+        product_ids: Dict[ProductKey, int] = {}
+        seen = set()
+
+        with self._lock:
+            known = {row[0]: row[1:] for row in self._conn.execute(
+                "SELECT hostname, id, mtime_ns, size, sha256 FROM hosts")}
+
+            pending = 0
+            self._conn.execute("BEGIN")
+            try:
+                for hostname, path, fmt in find_host_reports(data_dir):
+                    seen.add(hostname)
+                    self._ingest_host(hostname, path, fmt, known.get(hostname), product_ids, stats)
+                    pending += 1
+                    if pending >= batch_size:
+                        self._conn.execute("COMMIT")
+                        self._conn.execute("BEGIN")
+                        pending = 0
+                    if len(product_ids) > PRODUCT_ID_CACHE_SIZE:
+                        product_ids.clear()
+
+                if prune:
+                    for hostname in set(known) - seen:
+                        self._delete_host(known[hostname][0])
+                        stats["removed"] += 1
+                if stats["indexed"] or stats["removed"]:
+                    # Products no host has any more
+                    self._conn.execute(
+                        "DELETE FROM products WHERE id NOT IN (SELECT product_id FROM host_products)")
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        logger.info(
+            "Fleet index updated from %s in %.1fs: %d indexed, %d unchanged, %d failed, %d removed",
+            data_dir, time.perf_counter() - start,
+            stats['indexed'], stats['unchanged'], stats['failed'], stats['removed']
+        )
+        return stats
+
+    def _ingest_host(self, hostname: str, path: Path, fmt: str, known: Optional[Tuple],
+                     product_ids: Dict[ProductKey, int], stats: Dict[str, int]) -> None:
+        try:
+            stat = path.stat()
+            if known is not None and (known[1], known[2]) == (stat.st_mtime_ns, stat.st_size):
+                stats["unchanged"] += 1
+                return
+            data = path.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            if known is not None and known[3] == digest:
+                # Rewritten with the same content
+                self._conn.execute("UPDATE hosts SET report_path = ?, mtime_ns = ?, size = ? WHERE id = ?",
+                                   (str(path), stat.st_mtime_ns, stat.st_size, known[0]))
+                stats["unchanged"] += 1
+                return
+            software_list = deserialize_report(data, fmt)
+        except Exception as e:
+            logger.warning("Skipping unreadable report %s: %s", path, e)
+            stats["failed"] += 1
+            return
+
+        self._conn.execute(
+            "INSERT INTO hosts (hostname, report_path, mtime_ns, size, sha256, entries, ingested_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (hostname) DO UPDATE SET "
+            "report_path = excluded.report_path, mtime_ns = excluded.mtime_ns, size = excluded.size, "
+            "sha256 = excluded.sha256, entries = excluded.entries, ingested_at = excluded.ingested_at",
+            (hostname, str(path), stat.st_mtime_ns, stat.st_size, digest, len(software_list), time.time())
+        )
+        host_id = self._conn.execute("SELECT id FROM hosts WHERE hostname = ?", (hostname,)).fetchone()[0]
+
+        new_ids = set()
+        for entry in software_list:
+            key = _product_key(entry)
+            if key is not None:
+                new_ids.add(self._product_id(key, product_ids))
+        old_ids = {row[0] for row in self._conn.execute(
+            "SELECT product_id FROM host_products WHERE host_id = ?", (host_id,))}
+
+        self._conn.executemany("DELETE FROM host_products WHERE product_id = ? AND host_id = ?",
+                               [(product_id, host_id) for product_id in old_ids - new_ids])
+        self._conn.executemany("INSERT INTO host_products (product_id, host_id) VALUES (?, ?)",
+                               [(product_id, host_id) for product_id in new_ids - old_ids])
+        stats["indexed"] += 1
+
+    def _product_id(self, key: ProductKey, product_ids: Dict[ProductKey, int]) -> int:
+        product_id = product_ids.get(key)
+        if product_id is None:
+            name, version, publisher = key
+            self._conn.execute(
+                "INSERT OR IGNORE INTO products (name_key, name, version, publisher) VALUES (?, ?, ?, ?)",
+                (name.lower(), name, version, publisher)
+            )
+            product_id = self._conn.execute(
+                "SELECT id FROM products WHERE name_key = ? AND version = ? AND publisher = ?",
+                (name.lower(), version, publisher)
+            ).fetchone()[0]
+            product_ids[key] = product_id
+        return product_id
+
+    def _delete_host(self, host_id: int) -> None:
+        self._conn.execute("DELETE FROM host_products WHERE host_id = ?", (host_id,))
+        self._conn.execute("DELETE FROM hosts WHERE id = ?", (host_id,))
+
+    def hosts_with(self, product: str, version: Optional[str] = None,
+                   publisher: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Hosts that have ``product`` installed (case-insensitive display name),
+        optionally at one version or from one publisher.
+
+        Returns:
+            List of dicts with hostname, version and publisher, sorted by hostname
+        """
+        query = ("SELECT h.hostname, p.version, p.publisher FROM products p "
+                 "JOIN host_products hp ON hp.product_id = p.id JOIN hosts h ON h.id = hp.host_id "
+                 "WHERE p.name_key = ?")
+        params: list = [product.strip().lower()]
+        if version is not None:
+            query += " AND p.version = ?"
+            params.append(version)
+        if publisher is not None:
+            query += " AND p.publisher = ?"
+            params.append(publisher)
+        query += " ORDER BY h.hostname, p.version"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [{"hostname": hostname, "version": version, "publisher": publisher}
+                for hostname, version, publisher in rows]
+
+    def versions(self, product: str) -> List[Dict]:
+        """Versions of ``product`` found in the fleet, with the number of hosts per version."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT p.version, COUNT(DISTINCT hp.host_id) FROM products p "
+                "JOIN host_products hp ON hp.product_id = p.id WHERE p.name_key = ? "
+                "GROUP BY p.version ORDER BY p.version",
+                (product.strip().lower(),)
+            ).fetchall()
+        return [{"version": version, "hosts": hosts} for version, hosts in rows]
+
+    def host_software(self, hostname: str) -> List[Dict[str, str]]:
+        """Indexed software of one host."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT p.name, p.version, p.publisher FROM hosts h "
+                "JOIN host_products hp ON hp.host_id = h.id JOIN products p ON p.id = hp.product_id "
+                "WHERE h.hostname = ? ORDER BY p.name_key, p.version",
+                (hostname,)
+            ).fetchall()
+        return [{"DisplayName": name, "DisplayVersion": version, "Publisher": publisher}
+                for name, version, publisher in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hosts": self._conn.execute("SELECT COUNT(*) FROM hosts").fetchone()[0],
+                "products": self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0],
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point: python -m services.fleet_index {ingest,hosts,versions} ..."""
+    from config.settings import DATA_DIR, FLEET_INDEX_PATH
+
+    parser = argparse.ArgumentParser(description="Fleet-wide installed software index")
+    parser.add_argument("--db", default=FLEET_INDEX_PATH, help="Index path (default: FLEET_INDEX_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Index new and changed host reports")
+    ingest.add_argument("--data-dir", default=DATA_DIR, help="Directory of <hostname>/reports/ folders (default: DATA_DIR)")
+    ingest.add_argument("--keep-missing", action="store_true", help="Keep hosts whose report has disappeared")
+
+    hosts = commands.add_parser("hosts", help="List hosts with a product installed")
+    hosts.add_argument("product", help="Display name (case-insensitive)")
+    hosts.add_argument("--version", help="Only this exact version")
+    hosts.add_argument("--publisher", help="Only this exact publisher")
+
+    versions = commands.add_parser("versions", help="Count hosts per version of a product")
+    versions.add_argument("product", help="Display name (case-insensitive)")
+
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    index = FleetIndex(args.db)
+    try:
+        if args.command == "ingest":
+            index.ingest(args.data_dir, prune=not args.keep_missing)
+            counts = index.counts()
+            logger.info("Fleet index %s holds %d hosts and %d products", args.db, counts['hosts'], counts['products'])
+        elif args.command == "hosts":
+            for host in index.hosts_with(args.product, version=args.version, publisher=args.publisher):
+                print(f"{host['hostname']}\t{host['version']}\t{host['publisher']}")
+        else:
+            for row in index.versions(args.product):
+                print(f"{row['version'] or '(no version)'}\t{row['hosts']}")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
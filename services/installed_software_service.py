@@ -1,47 +1,97 @@
-import winreg
 import json
 import logging
+import threading
 from pathlib import Path
 
-from config.settings import DATA_DIR
+from config.settings import DATA_DIR, REPORT_FORMAT, INVENTORY_CACHE_ENABLED, INVENTORY_CACHE_PATH
+from services.cve_matcher import CveMatcher
+from services.inventory_backends import detect_backend
+from services.inventory_cache import InventoryCache
+from services.inventory_store import InventoryStore
 from utils.paths_utils import get_reports_dir, ensure_dir
+from utils.file_utils import atomic_write, publish_link
+from utils.report_formats import detect_format, extension_for, serialize_report, write_report
+
+try:
+    import winreg
+except ImportError:  # Not Windows; a Linux package database backend is used instead
+    winreg = None
 
 logger = logging.getLogger(__name__)
 
-def list_installed_software():
-    registry_paths = [
-        r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
-        r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"
-        r"HKEY_CURRENT_USER\SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"
-    ]
+_inventory_cache = None
+_inventory_cache_opened = False
+_inventory_cache_lock = threading.Lock()
 
-    software_list = []
+def list_installed_software(backend=None):
+    """
+    List installed software as dicts with DisplayName, DisplayVersion, Publisher,
+    InstallDate, InstallLocation and UninstallString.
 
-    for path in registry_paths:
-        try:
-            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, path) as key:
-                for i in range(winreg.QueryInfoKey(key)[0]):
-                    subkey_name = winreg.EnumKey(key, i)
-                    with winreg.OpenKey(key, subkey_name) as subkey:
-                        software = {}
-                        for field in ["DisplayName", "DisplayVersion", "Publisher", "InstallDate", "InstallLocation", "UninstallString"]:
-                            try:
-                                value, _ = winreg.QueryValueEx(subkey, field)
-                                software[field] = value
-                            except FileNotFoundError:
-                                software[field] = ""
-                        if software.get("DisplayName"):
-                            software_list.append(software)
-        except FileNotFoundError:
-            continue
+    Args:
+        backend: InventoryBackend to read from (default: detected for this
+            host: Windows registry, dpkg or rpm)
+
+    Returns:
+        List of software entries (empty if no backend is available or it fails)
+    """
+    backend = backend or detect_backend(winreg, cache=get_inventory_cache())
+    if backend is None:
+        logger.warning("No software inventory backend available on this host")
+        return []
 
+    cache = backend.cache
+    scan = cache.begin_scan() if cache is not None else None
+    try:
+        software_list = backend.list_software()
+    except Exception as e:
+        logger.error("Failed to list installed software with the %s backend: %s", backend.name, e)
+        return []
+    if cache is not None:
+        cache.save(scan)
+    logger.debug("Listed %d installed packages with the %s backend", len(software_list), backend.name)
     return software_list
 
-def save_software_list_to_file(software_list, filename=None):
+
+def get_inventory_cache():
+    """Return the shared inventory cache, or None if INVENTORY_CACHE_ENABLED is off."""
+    global _inventory_cache, _inventory_cache_opened
+    if not _inventory_cache_opened:
+        with _inventory_cache_lock:
+            if not _inventory_cache_opened:
+                if INVENTORY_CACHE_ENABLED:
+                    _inventory_cache = InventoryCache(INVENTORY_CACHE_PATH)
+                _inventory_cache_opened = True
+    return _inventory_cache
+
+
+def set_inventory_cache(cache):
+    """Replace the inventory cache used by list_installed_software. None disables caching."""
+    global _inventory_cache, _inventory_cache_opened
+    with _inventory_cache_lock:
+        _inventory_cache, _inventory_cache_opened = cache, True
+
+def save_software_list_to_file(software_list, filename=None, fmt=None):
+    """
+    Save the software list to the reports directory.
+
+    Without a filename, a dated copy (software_<date>) and the latest list
+    (software) are written. The extension follows the report format.
+
+    Args:
+        software_list: Entries from list_installed_software()
+        filename: Custom file name; its extension picks the format when recognised
+        fmt: Report format, see utils.report_formats.FORMATS (default: from settings)
+
+    Returns:
+        Path of the latest (or custom) file, None on error
+    """
     if not software_list:
         logger.warning("No software found to save.")
         return
     
+    fmt = fmt or REPORT_FORMAT
+    
     # Get the reports directory path
     reports_dir = get_reports_dir(DATA_DIR)
     ensure_dir(reports_dir)
@@ -50,51 +100,106 @@ def save_software_list_to_file(software_list, filename=None):
     if filename is None:
         from datetime import datetime
         today = datetime.now().strftime("%Y-%m-%d")
-        dated_filename = f"software_{today}.json"
-        latest_filename = "software.json"
+        extension = extension_for(fmt)
+        dated_filename = f"software_{today}{extension}"
+        latest_filename = f"software{extension}"
+        
+        try:
+            data = serialize_report(software_list, fmt)
+        except Exception as e:
+            logger.error("Failed to serialize software list as %s: %s", fmt, e)
+            return None
         
         # Save dated version
         dated_path = reports_dir / dated_filename
         try:
-            with open(dated_path, "w", encoding='utf-8') as f:
-                json.dump(software_list, f, indent=4, ensure_ascii=False)
-            logger.info(f"Dated software list saved to {dated_path}")
+            atomic_write(dated_path, data)
+            logger.info("Dated software list saved to %s", dated_path)
         except Exception as e:
-            logger.error(f"Failed to save dated software list to {dated_path}: {e}")
+            logger.error("Failed to save dated software list to %s: %s", dated_path, e)
             return None
         
-        # Save/update latest version
+        # Publish latest version as a hard link to the dated file, or a copy where links are unsupported
         latest_path = reports_dir / latest_filename
         try:
-            with open(latest_path, "w", encoding='utf-8') as f:
-                json.dump(software_list, f, indent=4, ensure_ascii=False)
-            logger.info(f"Latest software list saved to {latest_path} with {len(software_list)} entries")
+            if not publish_link(dated_path, latest_path):
+                atomic_write(latest_path, data)
+            logger.info("Latest software list saved to %s with %d entries", latest_path, len(software_list))
             return str(latest_path)
         except Exception as e:
-            logger.error(f"Failed to save latest software list to {latest_path}: {e}")
+            logger.error("Failed to save latest software list to %s: %s", latest_path, e)
             return str(dated_path)  # Return dated path if latest fails
     
     # Custom filename provided
     file_path = reports_dir / filename
     try:
-        with open(file_path, "w", encoding='utf-8') as f:
-            json.dump(software_list, f, indent=4, ensure_ascii=False)
-        logger.info(f"Software list saved to {file_path} with {len(software_list)} entries")
+        fmt = detect_format(filename)
+    except ValueError:
+        pass
+    try:
+        write_report(software_list, file_path, fmt)
+        logger.info("Software list saved to %s with %d entries", file_path, len(software_list))
         return str(file_path)
     except Exception as e:
-        logger.error(f"Failed to save software list to {file_path}: {e}")
+        logger.error("Failed to save software list to %s: %s", file_path, e)
         return None
 
 
-def check_blacklisted_software(software_list, cve_list):
-    blacklisted_software = []
-    for software in software_list:
-        for cve in cve_list:
-            if software.get("DisplayName") and cve.get("product") in software["DisplayName"]:
-                blacklisted_software.append({
-                    "software": software,
-                    "cve": cve
-                })
-    return blacklisted_software
+def get_inventory_store():
+    """Inventory history store of this host: DATA_DIR/<hostname>/reports/inventory/"""
+    return InventoryStore(get_reports_dir(DATA_DIR) / "inventory")
+
+
+def record_software_inventory(software_list, store=None):
+    """
+    Record the software list in the inventory history instead of a full dated file.
+
+    Only changes since the previous day are written. The latest list is still
+    kept in software.json (or the REPORT_FORMAT equivalent) for readers of
+    that file, but only rewritten when it changed.
+
+    Returns:
+        The store's summary dict plus 'saved_file' (path of the latest list, None on error)
+    """
+    store = store or get_inventory_store()
+    try:
+        summary = store.record(software_list)
+    except Exception as e:
+        logger.error("Failed to record software inventory: %s", e)
+        return {"saved_file": None}
+
+    latest_path = get_reports_dir(DATA_DIR) / f"software{extension_for(REPORT_FORMAT)}"
+    if summary["modified"] or not latest_path.exists():
+        summary["saved_file"] = save_software_list_to_file(software_list, latest_path.name)
+    else:
+        summary["saved_file"] = str(latest_path)
+    return summary
+
+
+def save_cve_matches_to_file(matches, filename="cve_matches.json"):
+    """
+    Save check_blacklisted_software results to the reports directory.
+
+    An empty list is saved too, so the report always reflects the latest scan.
+    """
+    reports_dir = get_reports_dir(DATA_DIR)
+    ensure_dir(reports_dir)
+
+    file_path = reports_dir / filename
+    try:
+        atomic_write(file_path, json.dumps(matches, indent=4, ensure_ascii=False).encode("utf-8"))
+        logger.info("CVE matches saved to %s with %d entries", file_path, len(matches))
+        return str(file_path)
+    except Exception as e:
+        logger.error("Failed to save CVE matches to %s: %s", file_path, e)
+        return None
+
 
+def check_blacklisted_software(software_list, cve_list, match_versions=True):
+    """
+    Pair installed software with CVEs whose product appears in its DisplayName.
 
+    With match_versions, pairs whose DisplayVersion lies outside the CVE's
+    affected version ranges are dropped.
+    """
+    return CveMatcher(cve_list, match_versions=match_versions).match(software_list)
@@ -0,0 +1,408 @@
+import logging
+import os
+from abc import ABC, abstractmethod
+import re
+import shutil
+import sqlite3
+import struct
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from services.inventory_cache import InventoryCache
+
+logger = logging.getLogger(__name__)
+
+# Every backend produces entries with exactly these keys ("" when unknown)
+SOFTWARE_FIELDS = ("DisplayName", "DisplayVersion", "Publisher", "InstallDate", "InstallLocation", "UninstallString")
+
+DPKG_STATUS_PATH = "/var/lib/dpkg/status"
+DPKG_INFO_DIR = "/var/lib/dpkg/info"
+RPMDB_SQLITE_PATHS = ("/var/lib/rpm/rpmdb.sqlite", "/usr/lib/sysimage/rpm/rpmdb.sqlite")
+
+# (label, root key attribute of winreg, Uninstall key path), in deduplication priority order
+REGISTRY_UNINSTALL_KEYS = (
+    ("HKLM", "HKEY_LOCAL_MACHINE", r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
+    ("HKLM\\WOW6432Node", "HKEY_LOCAL_MACHINE", r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"),
+    ("HKCU", "HKEY_CURRENT_USER", r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
+)
+
+_MAINTAINER_EMAIL = re.compile(r"\s*<[^>]*>\s*$")
+
+
+def _software(**fields) -> Dict[str, str]:
+    return {field: fields.get(field) or "" for field in SOFTWARE_FIELDS}
+
+
+def _install_date(timestamp: float) -> str:
+    # Same YYYYMMDD form as the registry's InstallDate
+    return datetime.fromtimestamp(timestamp).strftime("%Y%m%d")
+
+
+class InventoryBackend(ABC):
+    """
+    Source of installed software entries for one platform.
+
+    Backends given an InventoryCache skip re-reading sources whose change
+    signal (mtime, registry last-write time) is unchanged.
+    """
+
+    name = "base"
+    cache: Optional[InventoryCache] = None
+
+    @abstractmethod
+    def is_available(self) -> bool:
+        """Whether this platform's software source exists on this machine."""
+
+    @abstractmethod
+    def list_software(self) -> List[Dict[str, str]]:
+        """Return installed software as dicts with the SOFTWARE_FIELDS keys."""
+
+
+class WindowsRegistryBackend(InventoryBackend):
+    """
+    Uninstall keys of the Windows registry.
+
+    The machine-wide, 32-bit (WOW6432Node) and per-user Uninstall keys are
+    scanned concurrently, each under its own root; winreg releases the GIL
+    during registry calls. Software listed under several keys is reported
+    once, from the first key in REGISTRY_UNINSTALL_KEYS order. Time and
+    entries per key are kept in ``hive_stats`` after each scan.
+
+    Args:
+        registry: The winreg module (injected so the backend can be imported,
+            and tested, on any platform)
+        cache: Optional InventoryCache
+        max_workers: Scanning threads (default: one per key, 1 = sequential)
+    """
+
+    name = "windows-registry"
+
+    def __init__(self, registry, cache: Optional[InventoryCache] = None, max_workers: Optional[int] = None):
+        self.registry = registry
+        self.cache = cache
+        self.max_workers = max_workers
+        self.hive_stats: Dict[str, Dict] = {}
+
+    def is_available(self) -> bool:
+        return self.registry is not None
+
+    def list_software(self) -> List[Dict[str, str]]:
+        workers = self.max_workers or len(REGISTRY_UNINSTALL_KEYS)
+        if workers == 1:
+            scans = [self._scan_hive(*hive) for hive in REGISTRY_UNINSTALL_KEYS]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="registry-scan") as executor:
+                scans = list(executor.map(lambda hive: self._scan_hive(*hive), REGISTRY_UNINSTALL_KEYS))
+
+        software_list = []
+        seen = set()
+        for entries in scans:
+            for software in entries:
+                identity = (software["DisplayName"], software["DisplayVersion"], software["Publisher"])
+                if identity not in seen:
+                    seen.add(identity)
+                    software_list.append(software)
+
+        logger.info(
+            "Registry scan: %s; %d unique",
+            ", ".join(f"{hive} {stats['entries']} entries in {stats['seconds']:.3f}s"
+                      for hive, stats in self.hive_stats.items()),
+            len(software_list)
+        )
+        return software_list
+
+    def _scan_hive(self, hive: str, root: str, path: str) -> List[Dict]:
+        winreg = self.registry
+        started = time.perf_counter()
+        software_list = []
+        try:
+            with winreg.OpenKey(getattr(winreg, root), path) as key:
+                for i in range(winreg.QueryInfoKey(key)[0]):
+                    subkey_name = winreg.EnumKey(key, i)
+                    try:
+                        with winreg.OpenKey(key, subkey_name) as subkey:
+                            software = self._read_subkey(subkey, f"registry:{hive}\\{subkey_name}")
+                    except OSError as e:
+                        logger.debug("Skipping unreadable registry key %s\\%s: %s", hive, subkey_name, e)
+                        continue
+                    if software.get("DisplayName"):
+                        software_list.append(software)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("Failed to scan registry key %s: %s", hive, e)
+
+        self.hive_stats[hive] = {"entries": len(software_list), "seconds": time.perf_counter() - started}
+        return software_list
+
+    def _read_subkey(self, subkey, cache_key: str) -> Dict:
+        winreg = self.registry
+        signature = None
+        if self.cache is not None:
+            # Last-write time changes whenever a value of the key is written
+            signature = winreg.QueryInfoKey(subkey)[2]
+            hit, software = self.cache.get(cache_key, signature)
+            if hit:
+                return software
+
+        software = {}
+        for field in SOFTWARE_FIELDS:
+            try:
+                value, _ = winreg.QueryValueEx(subkey, field)
+                software[field] = value
+            except FileNotFoundError:
+                software[field] = ""
+        if self.cache is not None:
+            self.cache.set(cache_key, signature, software)
+        return software
+
+
+def _file_signature(*paths) -> List:
+    """mtime and size of each path (None for missing files)."""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append([stat.st_mtime_ns, stat.st_size])
+        except OSError:
+            signature.append(None)
+    return signature
+
+
+def _cached_listing(backend: InventoryBackend, cache_key: str, signature, list_software) -> List[Dict[str, str]]:
+    if backend.cache is None:
+        return list_software()
+    hit, software_list = backend.cache.get(cache_key, signature)
+    if not hit:
+        software_list = list_software()
+        backend.cache.set(cache_key, signature, software_list)
+    return software_list
+
+
+class DpkgBackend(InventoryBackend):
+    """
+    Debian/Ubuntu packages, read from the dpkg status database.
+
+    The status file is streamed one line at a time and only the handful of
+    fields needed are looked at, so memory stays flat however many packages
+    are installed. InstallDate comes from the mtime of the package's file
+    list in /var/lib/dpkg/info.
+    """
+
+    name = "dpkg"
+
+    def __init__(self, status_path=DPKG_STATUS_PATH, info_dir=DPKG_INFO_DIR, cache: Optional[InventoryCache] = None):
+        self.status_path = Path(status_path)
+        self.info_dir = Path(info_dir)
+        self.cache = cache
+
+    def is_available(self) -> bool:
+        return self.status_path.is_file()
+
+    def iter_packages(self) -> Iterator[Dict[str, str]]:
+        """Yield the Package/Status/Version/Maintainer/Architecture fields of each stanza."""
+        wanted = ("Package", "Status", "Version", "Maintainer", "Architecture")
+        stanza: Dict[str, str] = {}
+        with open(self.status_path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if line[0] == "\n":
+                    if stanza:
+                        yield stanza
+                        stanza = {}
+                    continue
+                # Continuation lines (Description, Conffiles) start with whitespace
+                if line[0] in " \t":
+                    continue
+                field, sep, value = line.partition(":")
+                if sep and field in wanted:
+                    stanza[field] = value.strip()
+        if stanza:
+            yield stanza
+
+    def _install_date(self, package: str, architecture: str, info_files) -> str:
+        for name in (f"{package}.list", f"{package}:{architecture}.list"):
+            if name in info_files:
+                try:
+                    return _install_date(os.stat(os.path.join(self.info_dir, name)).st_mtime)
+                except OSError:
+                    break
+        return ""
+
+    def list_software(self) -> List[Dict[str, str]]:
+        # dpkg rewrites the status file on every package change
+        return _cached_listing(self, f"dpkg:{self.status_path}", _file_signature(self.status_path),
+                               self._list_from_status)
+
+    def _list_from_status(self) -> List[Dict[str, str]]:
+        # One directory listing instead of a failing stat() per multi-arch package
+        try:
+            info_files = set(os.listdir(self.info_dir))
+        except OSError:
+            info_files = set()
+
+        software_list = []
+        for stanza in self.iter_packages():
+            # Removed-but-not-purged packages keep a stanza with "deinstall ok config-files"
+            if not stanza.get("Status", "").endswith(" installed") or "Package" not in stanza:
+                continue
+            package = stanza["Package"]
+            software_list.append(_software(
+                DisplayName=package,
+                DisplayVersion=stanza.get("Version"),
+                Publisher=_MAINTAINER_EMAIL.sub("", stanza.get("Maintainer", "")),
+                InstallDate=self._install_date(package, stanza.get("Architecture", ""), info_files),
+                UninstallString=f"dpkg --remove {package}",
+            ))
+        return software_list
+
+
+# rpm header tags and data types used below
+RPMTAG_NAME = 1000
+RPMTAG_VERSION = 1001
+RPMTAG_RELEASE = 1002
+RPMTAG_EPOCH = 1003
+RPMTAG_INSTALLTIME = 1008
+RPMTAG_VENDOR = 1011
+RPMTAG_PACKAGER = 1015
+RPM_INT32_TYPE = 4
+RPM_STRING_TYPES = (6, 8, 9)  # STRING, STRING_ARRAY, I18NSTRING (first value is used)
+
+_RPM_TAGS = (RPMTAG_NAME, RPMTAG_VERSION, RPMTAG_RELEASE, RPMTAG_EPOCH,
+             RPMTAG_INSTALLTIME, RPMTAG_VENDOR, RPMTAG_PACKAGER)
+
+
+def parse_rpm_header(blob: bytes) -> Dict[int, object]:
+    """
+    Read the name/version/vendor tags from an rpm header blob as stored in rpmdb.sqlite.
+
+    The blob is the header without its magic: index entry count and data
+    size (big-endian uint32), 16-byte index entries (tag, type, offset,
+    count), then the data store the offsets point into.
+    """
+    index_count, data_size = struct.unpack_from(">II", blob, 0)
+    data_start = 8 + index_count * 16
+    if data_start + data_size > len(blob):
+        raise ValueError("Truncated rpm header")
+
+    values: Dict[int, object] = {}
+    for i in range(index_count):
+        tag, tag_type, offset, count = struct.unpack_from(">iIiI", blob, 8 + i * 16)
+        if tag not in _RPM_TAGS or not 0 <= offset < data_size:
+            continue
+        position = data_start + offset
+        if tag_type in RPM_STRING_TYPES:
+            end = blob.index(b"\0", position)
+            values[tag] = blob[position:end].decode("utf-8", errors="replace")
+        elif tag_type == RPM_INT32_TYPE and count:
+            values[tag] = struct.unpack_from(">I", blob, position)[0]
+    return values
+
+
+def _rpm_software(name, version, release, epoch, install_time, vendor) -> Dict[str, str]:
+    full_version = f"{version}-{release}" if release else version
+    if epoch not in (None, "", "(none)", 0, "0"):
+        full_version = f"{epoch}:{full_version}"
+    return _software(
+        DisplayName=name,
+        DisplayVersion=full_version,
+        Publisher=vendor if vendor != "(none)" else "",
+        InstallDate=_install_date(int(install_time)) if install_time not in (None, "", "(none)") else "",
+        UninstallString=f"rpm -e {name}",
+    )
+
+
+class RpmBackend(InventoryBackend):
+    """
+    RHEL/Fedora/SUSE packages.
+
+    Reads the SQLite rpm database (rpm 4.16+) directly, parsing only the
+    header tags needed from each package blob. Older Berkeley DB / ndb
+    databases fall back to streaming ``rpm -qa`` output.
+    """
+
+    name = "rpm"
+
+    # One line per package; fields separated by tabs
+    QUERY_FORMAT = "%{NAME}\t%{VERSION}\t%{RELEASE}\t%{EPOCH}\t%{INSTALLTIME}\t%{VENDOR}\n"
+
+    def __init__(self, db_paths=RPMDB_SQLITE_PATHS, rpm_command="rpm", cache: Optional[InventoryCache] = None):
+        self.db_paths = [Path(path) for path in db_paths]
+        self.rpm_command = rpm_command
+        self.cache = cache
+
+    def _sqlite_path(self) -> Optional[Path]:
+        return next((path for path in self.db_paths if path.is_file()), None)
+
+    def is_available(self) -> bool:
+        return self._sqlite_path() is not None or shutil.which(self.rpm_command) is not None
+
+    def list_software(self) -> List[Dict[str, str]]:
+        db_path = self._sqlite_path()
+        if db_path is None:
+            return self._list_from_command()
+        # Committed transactions may still sit in the write-ahead log
+        signature = _file_signature(db_path, f"{db_path}-wal")
+        return _cached_listing(self, f"rpm:{db_path}", signature, lambda: self._list_from_db(db_path))
+
+    def _list_from_db(self, db_path: Path) -> List[Dict[str, str]]:
+        try:
+            return self._list_from_sqlite(db_path)
+        except (sqlite3.Error, ValueError, struct.error) as e:
+            logger.warning("Could not read %s (%s), falling back to rpm -qa", db_path, e)
+        return self._list_from_command()
+
+    def _list_from_sqlite(self, db_path: Path) -> List[Dict[str, str]]:
+        software_list = []
+        connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            for (blob,) in connection.execute("SELECT blob FROM Packages"):
+                tags = parse_rpm_header(bytes(blob))
+                name = tags.get(RPMTAG_NAME)
+                # gpg-pubkey pseudo packages are keys, not software
+                if not name or name == "gpg-pubkey":
+                    continue
+                software_list.append(_rpm_software(
+                    name, tags.get(RPMTAG_VERSION, ""), tags.get(RPMTAG_RELEASE, ""), tags.get(RPMTAG_EPOCH),
+                    tags.get(RPMTAG_INSTALLTIME), tags.get(RPMTAG_VENDOR) or tags.get(RPMTAG_PACKAGER, ""),
+                ))
+        finally:
+            connection.close()
+        return software_list
+
+    def _list_from_command(self) -> List[Dict[str, str]]:
+        software_list = []
+        with subprocess.Popen(
+            [self.rpm_command, "-qa", "--queryformat", self.QUERY_FORMAT],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, errors="replace"
+        ) as process:
+            for line in process.stdout:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) != 6 or fields[0] == "gpg-pubkey":
+                    continue
+                software_list.append(_rpm_software(*fields))
+        if process.returncode:
+            raise RuntimeError(f"rpm -qa exited with status {process.returncode}")
+        return software_list
+
+
+def detect_backend(registry=None, cache: Optional[InventoryCache] = None) -> Optional[InventoryBackend]:
+    """
+    Pick the inventory backend for this host.
+
+    Args:
+        registry: The winreg module, or None when not on Windows
+        cache: Optional InventoryCache for the backend to use
+
+    Returns:
+        The first available backend (registry, dpkg, then rpm), or None
+    """
+    candidates = [WindowsRegistryBackend(registry, cache=cache)] if registry is not None else []
+    candidates += [DpkgBackend(cache=cache), RpmBackend(cache=cache)]
+    for backend in candidates:
+        if backend.is_available():
+            return backend
+    return None
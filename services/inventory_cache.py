@@ -0,0 +1,118 @@
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from utils.file_utils import atomic_write
+from utils.paths_utils import ensure_dir
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+
+
+class InventoryCache:
+    """
+    Inventory results keyed on cheap change signals.
+
+    Each entry stores a value together with the signature of its source
+    (a registry key's last-write time, a package database's mtime and
+    size, ...). A lookup only hits while the caller presents the same
+    signature, so nothing expires by age.
+
+    A scan starts with begin_scan() and ends with save(scan), which
+    persists the entries and drops those not used since that scan began,
+    so sources that disappeared (uninstalled software) are pruned. Each
+    scan only prunes against its own start, so overlapping scans (the
+    inventory job and a CVE scan listing software at the same time) do
+    not drop each other's entries.
+
+    Example:
+        >>> cache = InventoryCache("data/cache/inventory_cache.json")
+        >>> scan = cache.begin_scan()
+        >>> hit, software = cache.get("dpkg:/var/lib/dpkg/status", [mtime_ns, size])
+        >>> cache.save(scan)
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Scan generation each entry was last used in
+        self._last_used: Dict[str, int] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.path is not None:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self._entries = data.get("entries", {})
+                self._last_used = dict.fromkeys(self._entries, 0)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Ignoring unreadable inventory cache %s: %s", self.path, e)
+
+    def get(self, key: str, signature) -> Tuple[bool, Any]:
+        """
+        Returns:
+            (hit, value); value is None on a miss
+        """
+        # JSON turns tuples into lists, so compare in that form
+        signature = json.loads(json.dumps(signature))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["signature"] == signature:
+                self._last_used[key] = self._generation
+                self.hits += 1
+                return True, entry["value"]
+            self.misses += 1
+            return False, None
+
+    def set(self, key: str, signature, value) -> None:
+        entry = {"signature": json.loads(json.dumps(signature)), "value": value}
+        with self._lock:
+            self._entries[key] = entry
+            self._last_used[key] = self._generation
+
+    def begin_scan(self) -> int:
+        """Start a scan; pass the returned generation to save() once the scan has completed."""
+        with self._lock:
+            self._generation += 1
+            return self._generation
+
+    def save(self, scan: Optional[int] = None) -> None:
+        """
+        Write the entries to disk if persistent.
+
+        Args:
+            scan: Generation from begin_scan() of a completed scan; entries
+                not used since it began are dropped first (default: keep all)
+        """
+        with self._lock:
+            if scan is not None:
+                stale = [key for key, generation in self._last_used.items() if generation < scan]
+                for key in stale:
+                    del self._entries[key], self._last_used[key]
+            entries = dict(self._entries)
+        logger.debug("Inventory cache: %d hits, %d misses, %d entries kept", self.hits, self.misses, len(entries))
+        if self.path is None:
+            return
+        try:
+            ensure_dir(self.path.parent)
+            atomic_write(self.path, json.dumps({"version": CACHE_VERSION, "entries": entries},
+                                               separators=(",", ":"), ensure_ascii=False).encode("utf-8"),
+                         fsync=False)
+        except Exception as e:
+            logger.warning("Failed to save inventory cache to %s: %s", self.path, e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = {}
+            self._last_used = {}
@@ -0,0 +1,238 @@
+import gzip
+import json
+import logging
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from config.settings import INVENTORY_SNAPSHOT_INTERVAL
+from utils.file_utils import atomic_write
+from utils.paths_utils import ensure_dir
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PREFIX = "snapshot_"
+SNAPSHOT_SUFFIX = ".json.gz"
+DELTA_PREFIX = "delta_"
+DELTA_SUFFIX = ".json"
+
+# (DisplayName, Publisher, occurrence); occurrence tells apart entries sharing a name and publisher
+SoftwareKey = Tuple[str, str, int]
+DateLike = Union[str, date, None]
+
+
+def _key_entries(software_list: List[Dict]) -> Dict[SoftwareKey, Dict]:
+    keyed: Dict[SoftwareKey, Dict] = {}
+    seen: Dict[Tuple[str, str], int] = {}
+    for entry in software_list:
+        base = (entry.get("DisplayName") or "", entry.get("Publisher") or "")
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+        keyed[base + (occurrence,)] = entry
+    return keyed
+
+
+def diff_inventories(old: List[Dict], new: List[Dict]) -> Dict[str, List]:
+    """
+    Compare two software lists keyed on DisplayName + Publisher.
+
+    Keys are [DisplayName, Publisher, occurrence] lists; occurrence is 0
+    unless several entries share a name and publisher.
+
+    Returns:
+        Dict with 'added' and 'changed' ([key, new entry] pairs, 'changed'
+        covering any field such as DisplayVersion) and 'removed' (keys)
+    """
+    old_keyed = _key_entries(old)
+    new_keyed = _key_entries(new)
+    return {
+        "added": [[list(key), entry] for key, entry in new_keyed.items() if key not in old_keyed],
+        "removed": [list(key) for key in old_keyed if key not in new_keyed],
+        "changed": [[list(key), entry] for key, entry in new_keyed.items()
+                    if key in old_keyed and old_keyed[key] != entry],
+    }
+
+
+def apply_diff(software_list: List[Dict], delta: Dict[str, List]) -> List[Dict]:
+    """Apply a diff_inventories result to a software list."""
+    keyed = _key_entries(software_list)
+    for key in delta.get("removed", []):
+        keyed.pop(tuple(key), None)
+    for key, entry in delta.get("changed", []) + delta.get("added", []):
+        keyed[tuple(key)] = entry
+    return list(keyed.values())
+
+
+def _parse_date(value: DateLike) -> Optional[date]:
+    if value is None or isinstance(value, date):
+        return value
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+class InventoryStore:
+    """
+    Change history of a host's installed software.
+
+    Each recorded day only writes what changed since the previous day (a
+    delta file, nothing at all if the inventory is unchanged). A full
+    compacted snapshot is written on the first record and then every
+    ``snapshot_interval`` days, instead of that day's delta, so rebuilding
+    a date reads one snapshot plus at most that many deltas.
+
+    Example:
+        >>> store = InventoryStore(get_reports_dir(DATA_DIR) / "inventory")
+        >>> summary = store.record(list_installed_software())
+        >>> software_list = store.rebuild("2025-11-20")
+    """
+
+    def __init__(self, root, snapshot_interval: int = INVENTORY_SNAPSHOT_INTERVAL):
+        self.root = Path(root)
+        self.snapshot_interval = max(int(snapshot_interval), 1)
+
+    def _dated_files(self, prefix: str, suffix: str) -> List[Tuple[date, Path]]:
+        files = []
+        for path in self.root.glob(f"{prefix}*{suffix}"):
+            try:
+                files.append((_parse_date(path.name[len(prefix):-len(suffix)]), path))
+            except ValueError:
+                logger.warning("Ignoring unexpected inventory file %s", path)
+        return sorted(files)
+
+    def snapshot_dates(self) -> List[date]:
+        return [day for day, _ in self._dated_files(SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX)]
+
+    def delta_dates(self) -> List[date]:
+        return [day for day, _ in self._dated_files(DELTA_PREFIX, DELTA_SUFFIX)]
+
+    def latest_date(self) -> Optional[date]:
+        dates = self.snapshot_dates() + self.delta_dates()
+        return max(dates) if dates else None
+
+    @staticmethod
+    def _read_snapshot(path: Path) -> List[Dict]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)["software"]
+
+    def _state(self, until: date, inclusive: bool = True) -> Tuple[Optional[date], List[Dict]]:
+        """Software list at the end of ``until`` (or just before it), and the snapshot date used."""
+        def in_range(day):
+            return day <= until if inclusive else day < until
+
+        snapshots = [(day, path) for day, path in self._dated_files(SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX) if in_range(day)]
+        if not snapshots:
+            return None, []
+        snapshot_date, snapshot_path = snapshots[-1]
+        software_list = self._read_snapshot(snapshot_path)
+
+        for day, path in self._dated_files(DELTA_PREFIX, DELTA_SUFFIX):
+            if snapshot_date < day and in_range(day):
+                with open(path, "r", encoding="utf-8") as f:
+                    software_list = apply_diff(software_list, json.load(f))
+        return snapshot_date, software_list
+
+    def rebuild(self, day: DateLike = None) -> List[Dict]:
+        """
+        Reconstruct the software list as recorded at the end of ``day``.
+
+        Args:
+            day: Date or 'YYYY-MM-DD' string (default: latest recorded date)
+
+        Returns:
+            Software list, empty if nothing was recorded on or before that date
+        """
+        day = _parse_date(day) or self.latest_date()
+        if day is None:
+            return []
+        return self._state(day)[1]
+
+    def iter_deltas(self, start: DateLike = None, end: DateLike = None) -> Iterator[Dict]:
+        """
+        Yield recorded changes (with their 'date') between two dates, inclusive, oldest first.
+
+        Snapshot days have no delta file; their changes are recomputed from
+        the snapshot and the state before it.
+        """
+        start, end = _parse_date(start), _parse_date(end)
+        snapshots = dict(self._dated_files(SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX))
+        deltas = dict(self._dated_files(DELTA_PREFIX, DELTA_SUFFIX))
+        first_snapshot = min(snapshots, default=None)
+        for day in sorted(snapshots.keys() | deltas.keys()):
+            if (start is not None and day < start) or (end is not None and day > end):
+                continue
+            if day in deltas:
+                with open(deltas[day], "r", encoding="utf-8") as f:
+                    yield json.load(f)
+            elif day != first_snapshot:
+                delta = diff_inventories(self._state(day, inclusive=False)[1], self._read_snapshot(snapshots[day]))
+                if any(delta.values()):
+                    yield dict(delta, date=day.isoformat())
+
+    def record(self, software_list: List[Dict], day: DateLike = None) -> Dict:
+        """
+        Record the inventory for ``day`` (default: today).
+
+        Recording the same day again replaces that day's delta. Days before
+        the latest recorded one cannot be recorded.
+
+        Returns:
+            Summary dict with the date, counts of added/removed/changed
+            entries since the previous day (and how many of those changed
+            DisplayVersion), whether a snapshot was written, and whether
+            the list differs from the latest recorded one ('modified')
+        """
+        day = _parse_date(day) or date.today()
+        latest = self.latest_date()
+        if latest is not None and day < latest:
+            raise ValueError(f"Cannot record inventory for {day}: history already extends to {latest}")
+        ensure_dir(self.root)
+
+        snapshot_date, previous = self._state(day, inclusive=False)
+        delta = diff_inventories(previous, software_list)
+        previous_keyed = _key_entries(previous)
+        version_changed = sum(
+            1 for key, entry in delta["changed"]
+            if previous_keyed[tuple(key)].get("DisplayVersion") != entry.get("DisplayVersion")
+        )
+        has_changes = any(delta.values())
+        # Compared with the latest recorded state, which for a re-run is today's
+        current = self._state(day)[1] if latest == day else previous
+        modified = _key_entries(current) != _key_entries(software_list)
+
+        snapshot_path = self.root / f"{SNAPSHOT_PREFIX}{day.isoformat()}{SNAPSHOT_SUFFIX}"
+        # An existing snapshot for today is refreshed; otherwise one is only due if something changed
+        write_snapshot = modified and (
+            snapshot_date is None
+            or snapshot_path.exists()
+            or (has_changes and (day - snapshot_date) >= timedelta(days=self.snapshot_interval))
+        )
+        if write_snapshot:
+            payload = json.dumps({"date": day.isoformat(), "software": software_list},
+                                 separators=(",", ":"), ensure_ascii=False)
+            atomic_write(snapshot_path, gzip.compress(payload.encode("utf-8")))
+            logger.info("Inventory snapshot written to %s with %d entries", snapshot_path, len(software_list))
+
+        delta_path = self.root / f"{DELTA_PREFIX}{day.isoformat()}{DELTA_SUFFIX}"
+        if modified:
+            # A snapshot already holds the day's changes, so it gets no delta
+            if has_changes and not write_snapshot:
+                payload = json.dumps(dict(delta, date=day.isoformat()), separators=(",", ":"), ensure_ascii=False)
+                atomic_write(delta_path, payload.encode("utf-8"))
+            elif delta_path.exists():
+                # A re-run today undid earlier changes, or made today a snapshot day
+                delta_path.unlink()
+
+        summary = {
+            "date": day.isoformat(),
+            "entries": len(software_list),
+            "added": len(delta["added"]),
+            "removed": len(delta["removed"]),
+            "changed": len(delta["changed"]),
+            "version_changed": version_changed,
+            "snapshot": write_snapshot,
+            "modified": modified,
+        }
+        logger.info(
+            "Inventory for %s: %d added, %d removed, %d changed (%d version changes)",
+            day, summary['added'], summary['removed'], summary['changed'], version_changed
+        )
+        return summary
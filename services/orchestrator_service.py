@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OrchestratedJob:
+    """
+    A blocking job for run_jobs.
+
+    Attributes:
+        name: Unique job name, used as the key in the run result
+        func: Blocking callable run in a worker thread, without arguments
+        timeout: Seconds before the job is reported as timed out (None = no limit)
+        depends_on: Names of jobs that must succeed before this one starts
+    """
+    name: str
+    func: Callable[[], Any]
+    timeout: Optional[float] = None
+    depends_on: Sequence[str] = ()
+
+
+@dataclass
+class JobResult:
+    name: str
+    ok: bool
+    duration: float
+    result: Any = None
+    error: Optional[str] = None
+    timed_out: bool = False
+
+    def to_dict(self) -> Dict:
+        return {
+            "ok": self.ok,
+            "duration": round(self.duration, 3),
+            "result": self.result,
+            "error": self.error,
+            "timed_out": self.timed_out,
+        }
+
+
+@dataclass
+class RunResult:
+    """Consolidated outcome of one orchestrated run."""
+    started_at: str
+    duration: float = 0.0
+    jobs: Dict[str, JobResult] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return all(job.ok for job in self.jobs.values())
+
+    def to_dict(self) -> Dict:
+        return {
+            "started_at": self.started_at,
+            "duration": round(self.duration, 3),
+            "ok": self.ok,
+            "jobs": {name: job.to_dict() for name, job in self.jobs.items()},
+        }
+
+
+def _run_in_daemon_thread(func: Callable[[], Any], name: str) -> "asyncio.Future":
+    """
+    Run ``func`` on a new daemon thread and return a future for its result.
+
+    Daemon threads are not joined at interpreter exit (ThreadPoolExecutor
+    workers are), so a job that hangs past its timeout cannot keep the
+    process alive.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(setter, value):
+        # The job may have timed out (future cancelled) or the run finished already
+        if not future.done():
+            setter(value)
+
+    def target():
+        try:
+            result = func()
+        except BaseException as e:
+            outcome = (future.set_exception, e)
+        else:
+            outcome = (future.set_result, result)
+        try:
+            loop.call_soon_threadsafe(resolve, *outcome)
+        except RuntimeError:
+            # Event loop already closed: the run ended without this job
+            pass
+
+    threading.Thread(target=target, name=name, daemon=True).start()
+    return future
+
+
+async def _run_job(job: OrchestratedJob, slots: asyncio.Semaphore, dependencies: List["asyncio.Task"]) -> JobResult:
+    if dependencies:
+        results = await asyncio.gather(*dependencies)
+        failed = [result.name for result in results if not result.ok]
+        if failed:
+            logger.warning("Skipping job %s: dependency %s failed", job.name, ", ".join(failed))
+            return JobResult(job.name, False, 0.0, error=f"Dependency failed: {', '.join(failed)}")
+
+    async with slots:
+        return await _run_timed(job)
+
+
+async def _run_timed(job: OrchestratedJob) -> JobResult:
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(_run_in_daemon_thread(job.func, f"job-{job.name}"), job.timeout)
+        return JobResult(job.name, True, time.perf_counter() - started, result=result)
+    except asyncio.TimeoutError:
+        logger.error("Job %s timed out after %ss", job.name, job.timeout)
+        return JobResult(job.name, False, time.perf_counter() - started,
+                         error=f"Timed out after {job.timeout}s", timed_out=True)
+    except Exception as e:
+        logger.exception("Job %s failed: %s", job.name, e)
+        return JobResult(job.name, False, time.perf_counter() - started, error=str(e))
+
+
+async def run_jobs_async(jobs: Sequence[OrchestratedJob], max_workers: Optional[int] = None) -> RunResult:
+    """
+    Run blocking jobs concurrently on worker threads and collect their results.
+
+    Independent jobs start together, so the run takes about as long as the
+    slowest job (or chain of dependent jobs). A job that exceeds its timeout
+    is reported as failed right away; Python threads cannot be interrupted,
+    so its thread is left to finish in the background. Job threads are
+    daemon threads, so a hung job does not keep the process from exiting.
+
+    Args:
+        jobs: Jobs to run; dependencies must refer to earlier jobs
+        max_workers: Jobs running at once (default: all)
+
+    Returns:
+        RunResult with one JobResult per job, in the given order
+    """
+    seen = set()
+    for job in jobs:
+        if job.name in seen:
+            raise ValueError(f"Duplicate job name: {job.name}")
+        missing = [name for name in job.depends_on if name not in seen]
+        if missing:
+            raise ValueError(f"Job {job.name} depends on unknown or later job(s): {', '.join(missing)}")
+        seen.add(job.name)
+
+    run = RunResult(started_at=datetime.now().isoformat(timespec="seconds"))
+    started = time.perf_counter()
+    slots = asyncio.Semaphore(max_workers or max(len(jobs), 1))
+    tasks: Dict[str, asyncio.Task] = {}
+    for job in jobs:
+        dependencies = [tasks[name] for name in job.depends_on]
+        tasks[job.name] = asyncio.ensure_future(_run_job(job, slots, dependencies))
+
+    for name, task in tasks.items():
+        run.jobs[name] = await task
+
+    run.duration = time.perf_counter() - started
+    logger.info(
+        "Run finished in %.3fs: %s",
+        run.duration,
+        ", ".join(f"{name} {'ok' if job.ok else 'failed'} ({job.duration:.3f}s)" for name, job in run.jobs.items())
+    )
+    return run
+
+
+def run_jobs(jobs: Sequence[OrchestratedJob], max_workers: Optional[int] = None) -> RunResult:
+    """
+    Blocking wrapper around run_jobs_async for synchronous callers.
+
+    Example:
+        >>> result = run_jobs([
+        ...     OrchestratedJob("screenshot", take_screenshot, timeout=60),
+        ...     OrchestratedJob("inventory", list_installed_software, timeout=300),
+        ... ])
+        >>> result.jobs["inventory"].duration
+    """
+    return asyncio.run(run_jobs_async(jobs, max_workers=max_workers))
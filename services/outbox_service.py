@@ -0,0 +1,404 @@
+import json
+import logging
+import os
+import random
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Union
+
+from config.settings import (
+    OUTBOX_DIR,
+    OUTBOX_CONCURRENCY,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_RETRY_BACKOFF,
+    OUTBOX_RETRY_BACKOFF_MAX,
+    OUTBOX_POLL_INTERVAL,
+)
+from utils.file_utils import atomic_open, atomic_write
+from utils.lazy_import import lazy_import
+from utils.paths_utils import ensure_dir
+
+# Only needed once there is something to spool or send, so an empty outbox costs nothing
+email_service = lazy_import("services.email_service")
+
+if TYPE_CHECKING:
+    from email.message import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+PENDING_DIR = "pending"
+DEAD_DIR = "dead"
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def _is_permanent(error: Exception) -> bool:
+    """Whether retrying cannot help: the server rejected the message or its recipients (5xx)."""
+    import smtplib
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        # {recipient: (code, message)}; 4xx refusals (greylisting, mailbox busy, over quota) are temporary
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(500 <= code < 600 for code in codes)
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        # Usually a credentials problem that gets fixed; keep the message
+        return False
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
+def _refusal_error(refused: Dict) -> str:
+    return "Recipients refused: " + ", ".join(
+        f"{address} ({code} {reply.decode(errors='replace') if isinstance(reply, bytes) else reply})"
+        for address, (code, reply) in refused.items()
+    )
+
+
+class Outbox:
+    """
+    Persistent email queue delivered in the background.
+
+    enqueue() only writes the message to a spool directory (the message as
+    <id>.eml plus its envelope and delivery state in <id>.json), so callers
+    never wait on SMTP. Spooled messages are streamed to the server, never
+    loaded into memory. Delivery passes send every due message over at most
+    ``concurrency`` SMTP sessions. A failed message is retried with
+    exponential backoff (``backoff`` seconds, doubling up to
+    ``backoff_max``, with ±10% jitter); after ``max_attempts`` attempts, or
+    on a permanent rejection, it is moved to the dead-letter directory.
+    When only some recipients are refused, the message stays queued for
+    those refused with a temporary 4xx code, and a copy addressed to the
+    ones refused with a 5xx is dead-lettered. Messages survive restarts until they are delivered or dead-lettered.
+
+    Example:
+        >>> outbox = Outbox('data/outbox')
+        >>> outbox.enqueue({"to_address": "ops@example.com", "subject": "Alert", "body": "..."})
+        >>> outbox.start()   # background worker, or outbox.process_due() for one pass
+    """
+
+    def __init__(
+        self,
+        root,
+        concurrency: int = OUTBOX_CONCURRENCY,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+        backoff: float = OUTBOX_RETRY_BACKOFF,
+        backoff_max: float = OUTBOX_RETRY_BACKOFF_MAX,
+        client_factory: Optional[Callable] = None
+    ):
+        self.root = Path(root)
+        self.pending_dir = self.root / PENDING_DIR
+        self.dead_dir = self.root / DEAD_DIR
+        self.concurrency = max(int(concurrency), 1)
+        self.max_attempts = max(int(max_attempts), 1)
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.client_factory = client_factory
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def enqueue(self, message: Union["EmailMessage", Dict]) -> str:
+        """
+        Spool a message for delivery.
+
+        Args:
+            message: EmailMessage, or a dict of send_email arguments
+                (attachments are read now, so later changes to the files do not matter)
+
+        Returns:
+            str: Message id
+        """
+        message_id = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        ensure_dir(self.pending_dir)
+        eml_path = self.pending_dir / f"{message_id}.eml"
+        # The .json file makes the message visible to the worker, so it is written last
+        if not isinstance(message, dict):
+            import email.policy
+            sender, recipients = email_service.message_envelope(message)
+            bcc = message["Bcc"]
+            del message["Bcc"]
+            try:
+                atomic_write(eml_path, message.as_bytes(policy=email.policy.SMTP))
+            finally:
+                if bcc is not None:
+                    message["Bcc"] = bcc
+            envelope = {"from": sender, "recipients": recipients}
+            to, subject = message["To"], message["Subject"]
+        else:
+            # Attachments are streamed into the spool file, never held in memory
+            with atomic_open(eml_path) as f:
+                envelope = email_service.write_message(f, **message)
+            to = message.get("to_address")
+            to, subject = to if isinstance(to, str) else ", ".join(to), message.get("subject")
+        self._write_state(self.pending_dir, {
+            "id": message_id,
+            "to": to,
+            "subject": subject,
+            "from": envelope["from"],
+            "recipients": envelope["recipients"],
+            "created": time.time(),
+            "attempts": 0,
+            "next_attempt": 0,
+            "last_error": None,
+        })
+        logger.debug("Queued email %s to %s", message_id, to)
+        self._wakeup.set()
+        return message_id
+
+    def _write_state(self, directory: Path, state: Dict) -> None:
+        atomic_write(directory / f"{state['id']}.json", json.dumps(state).encode("utf-8"))
+
+    def _list(self, directory: Path) -> List[Dict]:
+        states = []
+        for path in sorted(directory.glob("*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    states.append(json.load(f))
+            except FileNotFoundError:
+                # Delivered meanwhile
+                continue
+            except Exception as e:
+                logger.warning("Ignoring unreadable outbox entry %s: %s", path, e)
+        return states
+
+    def pending(self) -> List[Dict]:
+        """Delivery state of queued messages, oldest first."""
+        return self._list(self.pending_dir)
+
+    def dead_letters(self) -> List[Dict]:
+        """State of messages that were given up on, with their last error."""
+        return self._list(self.dead_dir)
+
+    def requeue(self, message_id: str) -> bool:
+        """Move a dead letter back to the queue for immediate delivery. Returns False if unknown."""
+        states = [state for state in self.dead_letters() if state["id"] == message_id]
+        if not states:
+            return False
+        state = dict(states[0], attempts=0, next_attempt=0)
+        state.pop("dead_at", None)
+        ensure_dir(self.pending_dir)
+        os.replace(self.dead_dir / f"{message_id}.eml", self.pending_dir / f"{message_id}.eml")
+        self._write_state(self.pending_dir, state)
+        (self.dead_dir / f"{message_id}.json").unlink()
+        self._wakeup.set()
+        return True
+
+    def process_due(self, now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Deliver every message whose next attempt is due.
+
+        Returns:
+            Counters: sent, retried (failed, will be retried), dead, pending (left in the queue);
+            a message refused for some recipients counts once per outcome
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            due = [state for state in self.pending()
+                   if state["next_attempt"] <= now and state["id"] not in self._in_flight]
+            self._in_flight.update(state["id"] for state in due)
+
+        stats = {"sent": 0, "retried": 0, "dead": 0, "pending": 0}
+        if due:
+            started = time.perf_counter()
+            # One SMTP session per worker, each sending an interleaved share of the queue
+            workers = min(self.concurrency, len(due))
+            shares = [due[i::workers] for i in range(workers)]
+            try:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="outbox") as executor:
+                    for share_stats in executor.map(self._deliver, shares):
+                        for key, value in share_stats.items():
+                            stats[key] += value
+            finally:
+                with self._lock:
+                    self._in_flight.difference_update(state["id"] for state in due)
+            logger.info("Outbox: %d sent, %d to retry, %d dead-lettered in %.2fs",
+                        stats["sent"], stats["retried"], stats["dead"], time.perf_counter() - started)
+        stats["pending"] = len(self.pending())
+        return stats
+
+    def _deliver(self, states: List[Dict]) -> Dict[str, int]:
+        import smtplib
+        stats = {"sent": 0, "retried": 0, "dead": 0}
+        # SmtpClient with the SMTP_* settings by default
+        client_factory = self.client_factory or email_service.SmtpClient
+        with client_factory() as client:
+            for state in states:
+                if self._stopping.is_set():
+                    break
+                eml_path = self.pending_dir / f"{state['id']}.eml"
+                try:
+                    f = open(eml_path, "rb")
+                except OSError as e:
+                    self._dead_letter(state, f"Unreadable message: {e}")
+                    stats["dead"] += 1
+                    continue
+
+                try:
+                    with f:
+                        refused = client.send_stream(f, state["from"], state["recipients"]) or {}
+                except smtplib.SMTPRecipientsRefused as e:
+                    # Every recipient refused: handled per recipient like a partial refusal
+                    refused = e.recipients
+                except Exception as e:
+                    state = dict(state, attempts=state["attempts"] + 1, last_error=f"{type(e).__name__}: {e}")
+                    if _is_permanent(e) or state["attempts"] >= self.max_attempts:
+                        self._dead_letter(state, state["last_error"])
+                        stats["dead"] += 1
+                    else:
+                        self._schedule_retry(state, e)
+                        stats["retried"] += 1
+                    continue
+
+                if len(refused) < len(state["recipients"]):
+                    logger.info("Email sent to %s (subject: %s)", state["to"], state["subject"])
+                    stats["sent"] += 1
+                if not refused:
+                    # State first: an .eml without state is never picked up
+                    (self.pending_dir / f"{state['id']}.json").unlink()
+                    eml_path.unlink()
+                    continue
+
+                for key, value in self._handle_refused(state, refused).items():
+                    stats[key] += value
+        return stats
+
+    def _handle_refused(self, state: Dict, refused: Dict) -> Dict[str, int]:
+        """
+        Retry the recipients refused with a temporary 4xx code and dead-letter
+        the rest; the message stays spooled for the temporary ones only.
+        """
+        stats = {"retried": 0, "dead": 0}
+        # {recipient: (code, message)}; 4xx refusals (greylisting, mailbox busy, over quota) are temporary
+        temporary = [address for address, (code, _) in refused.items() if 400 <= code < 500]
+        permanent = {address: reply for address, reply in refused.items() if address not in temporary}
+        state = dict(state, attempts=state["attempts"] + 1)
+
+        if temporary and state["attempts"] < self.max_attempts:
+            if permanent:
+                # Dead-lettered as a copy, the spooled message is still needed for the retry
+                dead = dict(state, id=f"{state['id']}-refused", recipients=list(permanent))
+                ensure_dir(self.dead_dir)
+                shutil.copyfile(self.pending_dir / f"{state['id']}.eml", self.dead_dir / f"{dead['id']}.eml")
+                self._write_dead(dead, _refusal_error(permanent))
+                stats["dead"] += 1
+            state = dict(state, recipients=temporary, last_error=_refusal_error({a: refused[a] for a in temporary}))
+            self._schedule_retry(state, state["last_error"])
+            stats["retried"] += 1
+        else:
+            self._dead_letter(dict(state, recipients=list(refused)), _refusal_error(refused))
+            stats["dead"] += 1
+        return stats
+
+    def _schedule_retry(self, state: Dict, error) -> None:
+        delay = min(self.backoff * 2 ** (state["attempts"] - 1), self.backoff_max)
+        state["next_attempt"] = time.time() + delay * random.uniform(0.9, 1.1)
+        self._write_state(self.pending_dir, state)
+        logger.warning("Email %s to %s failed (attempt %d), retrying in %.0fs: %s",
+                       state["id"], state["to"], state["attempts"], delay, error)
+
+    def _dead_letter(self, state: Dict, error: str) -> None:
+        ensure_dir(self.dead_dir)
+        eml_path = self.pending_dir / f"{state['id']}.eml"
+        if eml_path.exists():
+            os.replace(eml_path, self.dead_dir / eml_path.name)
+        self._write_dead(state, error)
+        (self.pending_dir / f"{state['id']}.json").unlink()
+
+    def _write_dead(self, state: Dict, error: str) -> None:
+        state = dict(state, last_error=error, dead_at=time.time())
+        self._write_state(self.dead_dir, state)
+        logger.error("Giving up on email %s to %s after %d attempt(s): %s",
+                     state["id"], ", ".join(state["recipients"]), state["attempts"], error)
+
+    def next_due(self) -> Optional[float]:
+        """Time of the earliest pending attempt, None if the queue is empty."""
+        states = self.pending()
+        return min(state["next_attempt"] for state in states) if states else None
+
+    def start(self, poll_interval: float = OUTBOX_POLL_INTERVAL) -> None:
+        """Deliver in a background thread: right after each enqueue, and when retries fall due."""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, args=(poll_interval,), name="outbox", daemon=True)
+        self._thread.start()
+        logger.info("Outbox worker started (%s)", self.root)
+
+    def _run(self, poll_interval: float) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.clear()
+            try:
+                self.process_due()
+                next_due = self.next_due()
+            except Exception as e:
+                logger.exception("Outbox delivery pass failed: %s", e)
+                next_due = None
+            wait = poll_interval if next_due is None else min(max(next_due - time.time(), 0.0), poll_interval)
+            self._wakeup.wait(wait)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the worker after the message being sent; the rest stays spooled for the next start."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("Outbox worker still sending after %ss", timeout)
+        self._thread = None
+        logger.info("Outbox worker stopped, %d message(s) pending", len(self.pending()))
+
+
+def get_outbox() -> Outbox:
+    """Return the shared outbox spooling under OUTBOX_DIR."""
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = Outbox(OUTBOX_DIR)
+    return _outbox
+
+
+def set_outbox(outbox: Optional[Outbox]) -> None:
+    """Replace the shared outbox (None: recreate from settings on next use)."""
+    global _outbox
+    with _outbox_lock:
+        _outbox = outbox
+
+
+def queue_email(
+    to_address: Union[str, List[str]],
+    subject: str,
+    body: str,
+    html_body: Optional[str] = None,
+    attachments: Optional[List[Union[str, Path]]] = None,
+    cc: Optional[Union[str, List[str]]] = None,
+    bcc: Optional[Union[str, List[str]]] = None,
+    raise_on_error: bool = False
+) -> Optional[str]:
+    """Queue an email in the shared outbox instead of sending it now.
+
+    Takes the same arguments as email_service.send_email. Delivery happens in
+    the outbox worker (daemon mode) or the outbox job of a one-shot run.
+
+    Returns:
+        str: Message id, or None if the message could not be spooled (when raise_on_error=False).
+
+    Example:
+        >>> queue_email("ops@example.com", "CVE alert", "New matches found")
+    """
+    try:
+        return get_outbox().enqueue({
+            "to_address": to_address, "subject": subject, "body": body,
+            "html_body": html_body, "attachments": attachments, "cc": cc, "bcc": bcc,
+        })
+    except Exception as e:
+        logger.exception("Failed to queue email to %s: %s", to_address, e)
+        if raise_on_error:
+            raise
+        return None
@@ -0,0 +1,153 @@
+import logging
+import random
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    """
+    A periodic job and its run counters.
+
+    Attributes:
+        name: Job name used in logs
+        func: Callable run on every tick, without arguments
+        interval: Seconds between ticks
+        jitter: Up to this many seconds of random delay added to each tick
+        run_immediately: Run the first tick at start instead of after one interval
+        runs: Completed runs (including failed ones)
+        failures: Runs that raised an exception
+        skipped: Ticks dropped because the previous run overran them
+        last_duration: Seconds taken by the latest run
+    """
+    name: str
+    func: Callable[[], object]
+    interval: float
+    jitter: float = 0.0
+    run_immediately: bool = True
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    last_duration: float = 0.0
+
+
+class Scheduler:
+    """
+    In-process scheduler running each job on its own thread at a fixed interval.
+
+    A job never overlaps itself: when a run takes longer than its interval the
+    missed ticks are skipped rather than queued, and the job resumes on its
+    original cadence. Jitter delays individual ticks without drifting the
+    schedule. stop() (or SIGTERM/SIGINT in run_forever) interrupts waiting
+    jobs immediately and lets running ones finish.
+
+    Example:
+        >>> scheduler = Scheduler()
+        >>> scheduler.add_job("screenshot", take_screenshot, interval=300, jitter=15)
+        >>> scheduler.run_forever()
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], object],
+        interval: float,
+        jitter: float = 0.0,
+        run_immediately: bool = True
+    ) -> Job:
+        if interval <= 0:
+            raise ValueError(f"Job interval must be positive, got {interval}")
+        if name in self.jobs:
+            raise ValueError(f"Job already scheduled: {name}")
+        job = Job(name, func, interval, max(jitter, 0.0), run_immediately)
+        self.jobs[name] = job
+        return job
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def start(self) -> None:
+        """Start one worker thread per job."""
+        for job in self.jobs.values():
+            thread = threading.Thread(target=self._run_job, args=(job,), name=f"job-{job.name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Scheduler started with %d job(s): %s", len(self.jobs), ", ".join(self.jobs))
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Signal every job to stop and wait up to ``timeout`` seconds for running ones."""
+        self._stop.set()
+        if not self._threads:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            thread.join(remaining)
+            if thread.is_alive():
+                logger.warning("%s still running at shutdown", thread.name)
+        self._threads = []
+        logger.info("Scheduler stopped")
+
+    def run_forever(self, handle_signals: bool = True, shutdown_timeout: Optional[float] = 60) -> None:
+        """
+        Start the jobs and block until stop() is called or SIGTERM/SIGINT arrives.
+
+        Signal handlers can only be installed from the main thread; elsewhere
+        they are left untouched.
+        """
+        previous = {}
+        if handle_signals and threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                previous[sig] = signal.signal(sig, self._handle_signal)
+
+        try:
+            self.start()
+            while not self._stop.wait(1.0):
+                pass
+        finally:
+            self.stop(shutdown_timeout)
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+
+    def _handle_signal(self, signum, frame) -> None:
+        logger.info("Received signal %d, shutting down", signum)
+        self._stop.set()
+
+    def _run_job(self, job: Job) -> None:
+        next_run = time.monotonic() + (0 if job.run_immediately else job.interval)
+        while True:
+            delay = next_run - time.monotonic() + (random.uniform(0, job.jitter) if job.jitter else 0)
+            if self._stop.wait(max(delay, 0)):
+                return
+
+            started = time.monotonic()
+            try:
+                job.func()
+            except Exception as e:
+                job.failures += 1
+                logger.exception("Job %s failed: %s", job.name, e)
+            job.runs += 1
+            job.last_duration = time.monotonic() - started
+            logger.debug("Job %s finished in %.3fs", job.name, job.last_duration)
+
+            next_run += job.interval
+            now = time.monotonic()
+            if next_run <= now:
+                missed = int((now - next_run) // job.interval) + 1
+                job.skipped += missed
+                next_run += missed * job.interval
+                logger.warning(
+                    "Job %s took %.1fs, longer than its %ss interval; skipping %d run(s)",
+                    job.name, job.last_duration, job.interval, missed
+                )
@@ -1,38 +1,358 @@
+from contextlib import nullcontext
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import base64
+import json
+import os
+import threading
+import time
 import mss, mss.tools
 import logging
 
-from config.settings import SCREENSHOT_DIR
+from config.settings import (
+    SCREENSHOT_DIR,
+    SCREENSHOT_ENCODE_WORKERS,
+    SCREENSHOT_FORMAT,
+    SCREENSHOT_PNG_LEVEL,
+    SCREENSHOT_QUALITY,
+    SCREENSHOT_GRAYSCALE,
+    SCREENSHOT_MAX_DIMENSION,
+    SCREENSHOT_SKIP_UNCHANGED,
+    SCREENSHOT_CHANGE_THRESHOLD,
+)
+from utils.file_utils import atomic_write
 from utils.paths_utils import get_screenshots_dir, ensure_dir
 from utils.time_utils import timestamp
 
 logger = logging.getLogger(__name__)
 
+_EXTENSIONS = {"png": "png", "webp": "webp", "jpeg": "jpg"}
 
-def take_screenshot():
+# Change detection: sample grid of the fingerprint, and how far a sample must
+# move (0-255) to count as changed
+FINGERPRINT_GRID = (160, 90)
+PIXEL_TOLERANCE = 16
+FINGERPRINT_FILE = ".last_frames.json"
+
+# Last fingerprint per monitor index, shared across captures in this process
+_last_fingerprints = {}
+_fingerprints_loaded = False
+_fingerprint_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class EncodingProfile:
+    """
+    How captured frames are encoded.
+
+    Attributes:
+        format: 'png' (lossless), 'webp' or 'jpeg' (lossy)
+        png_level: zlib compression level for PNG, 0 (fastest) to 9 (smallest)
+        quality: Quality for WebP/JPEG, 1-100
+        grayscale: Store a single luminance channel
+        max_dimension: Downscale so neither side exceeds this many pixels (0 = full resolution)
+
+    Anything other than a plain PNG needs Pillow installed.
+    """
+    format: str = "png"
+    png_level: int = 6
+    quality: int = 85
+    grayscale: bool = False
+    max_dimension: int = 0
+
+    def __post_init__(self):
+        if self.format not in _EXTENSIONS:
+            raise ValueError(f"Unsupported screenshot format: {self.format}. Expected one of {sorted(_EXTENSIONS)}")
+        if not 0 <= self.png_level <= 9:
+            raise ValueError(f"PNG compression level must be 0-9, got {self.png_level}")
+        if not 1 <= self.quality <= 100:
+            raise ValueError(f"Quality must be 1-100, got {self.quality}")
+
+    @property
+    def extension(self):
+        return _EXTENSIONS[self.format]
+
+    @property
+    def needs_pillow(self):
+        return self.format != "png" or self.grayscale or self.max_dimension > 0
+
+
+# Named presets, selectable by name in take_screenshot(profile=...)
+PROFILES = {
+    "lossless": EncodingProfile(),
+    "fast": EncodingProfile(png_level=1),
+    "small-png": EncodingProfile(png_level=9),
+    "webp": EncodingProfile(format="webp", quality=80),
+    "webp-1080": EncodingProfile(format="webp", quality=75, max_dimension=1920),
+    "jpeg": EncodingProfile(format="jpeg", quality=80),
+    "gray-jpeg-1080": EncodingProfile(format="jpeg", quality=70, grayscale=True, max_dimension=1920),
+}
+
+
+def default_profile():
+    """Encoding profile configured through the SCREENSHOT_* settings."""
+    return EncodingProfile(
+        format=SCREENSHOT_FORMAT,
+        png_level=SCREENSHOT_PNG_LEVEL,
+        quality=SCREENSHOT_QUALITY,
+        grayscale=SCREENSHOT_GRAYSCALE,
+        max_dimension=SCREENSHOT_MAX_DIMENSION,
+    )
+
+
+def _resolve_profile(profile):
+    if profile is None:
+        return default_profile()
+    if isinstance(profile, str):
+        try:
+            return PROFILES[profile]
+        except KeyError:
+            raise ValueError(f"Unknown screenshot profile: {profile}. Expected one of {sorted(PROFILES)}")
+    return profile
+
+
+def _encode_with_pillow(screenshot, file_path, profile):
+    try:
+        from PIL import Image
+    except ImportError:
+        raise RuntimeError("Screenshot profile requires Pillow: pip install Pillow")
+
+    # Decode straight from BGRA, skipping the intermediate RGB copy
+    image = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
+    if profile.grayscale:
+        image = image.convert("L")
+    if profile.max_dimension and max(image.size) > profile.max_dimension:
+        image.thumbnail((profile.max_dimension, profile.max_dimension), Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+    if profile.format == "png":
+        image.save(file_path, "PNG", compress_level=profile.png_level)
+    elif profile.format == "webp":
+        image.save(file_path, "WEBP", quality=profile.quality, method=4)
+    else:
+        image.save(file_path, "JPEG", quality=profile.quality)
+
+
+def encode_frame(screenshot, file_path, profile=None):
+    """
+    Encode one captured frame to ``file_path`` using an encoding profile.
+
+    Args:
+        screenshot: mss ScreenShot
+        file_path: Destination path
+        profile: EncodingProfile or preset name (default: from settings)
+
+    Returns:
+        str: The written path
+    """
+    profile = _resolve_profile(profile)
+    if profile.needs_pillow:
+        _encode_with_pillow(screenshot, str(file_path), profile)
+    else:
+        # PNG compression (zlib) releases the GIL, so frames encode in parallel
+        mss.tools.to_png(screenshot.rgb, screenshot.size, level=profile.png_level, output=str(file_path))
+    return str(file_path)
+
+
+def frame_fingerprint(screenshot, grid=FINGERPRINT_GRID):
+    """
+    Cheap downsampled fingerprint of a frame: the green channel (a luminance
+    proxy) sampled on a grid, taken straight from the raw BGRA buffer.
+
+    Returns:
+        bytes of at most grid[0] * grid[1] samples
+    """
+    width, height = screenshot.size
+    raw = screenshot.raw
+    stride = width * 4
+    step_x = max(width // grid[0], 1)
+    step_y = max(height // grid[1], 1)
+    first_x = (step_x // 2) * 4 + 1
+
+    samples = bytearray()
+    for y in range(step_y // 2, height, step_y)[:grid[1]]:
+        row = raw[y * stride:(y + 1) * stride]
+        samples += row[first_x::step_x * 4][:grid[0]]
+    return bytes(samples)
+
+
+def fingerprint_difference(previous, current):
+    """Fraction (0-1) of fingerprint samples that changed noticeably."""
+    if previous is None or len(previous) != len(current) or not current:
+        return 1.0
+    changed = sum(1 for a, b in zip(previous, current) if abs(a - b) > PIXEL_TOLERANCE)
+    return changed / len(current)
+
+
+def reset_change_detection(target_dir=None):
+    """Forget the last frames so the next capture saves every monitor."""
+    global _fingerprints_loaded
+    with _fingerprint_lock:
+        _last_fingerprints.clear()
+        _fingerprints_loaded = True
+        if target_dir is not None:
+            try:
+                (target_dir / FINGERPRINT_FILE).unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _load_fingerprints(target_dir):
+    """Restore fingerprints saved by a previous run (e.g. the last cron invocation)."""
+    global _fingerprints_loaded
+    if _fingerprints_loaded:
+        return
+    _fingerprints_loaded = True
+    try:
+        with open(target_dir / FINGERPRINT_FILE, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        for idx, value in stored.items():
+            _last_fingerprints[int(idx)] = (tuple(value["size"]), base64.b64decode(value["fingerprint"]))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning("Ignoring unreadable screenshot fingerprints: %s", e)
+
+
+def _save_fingerprints(target_dir):
+    stored = {
+        str(idx): {"size": list(size), "fingerprint": base64.b64encode(fingerprint).decode("ascii")}
+        for idx, (size, fingerprint) in _last_fingerprints.items()
+    }
+    try:
+        atomic_write(target_dir / FINGERPRINT_FILE, json.dumps(stored).encode("utf-8"), fsync=False)
+    except OSError as e:
+        logger.warning("Failed to save screenshot fingerprints: %s", e)
+
+
+def _changed_frames(frames, target_dir, threshold):
+    """
+    Keep frames that differ from the monitor's previous frame by more than ``threshold``.
+
+    Returns:
+        (changed frames, {monitor index: (size, fingerprint)} of the changed
+        frames), to be passed to _commit_fingerprints once they are saved
+    """
+    changed = []
+    candidates = {}
+    with _fingerprint_lock:
+        _load_fingerprints(target_dir)
+        for idx, screenshot in frames:
+            fingerprint = frame_fingerprint(screenshot)
+            size = tuple(screenshot.size)
+            previous_size, previous = _last_fingerprints.get(idx, (None, None))
+            difference = fingerprint_difference(previous if previous_size == size else None, fingerprint)
+            if difference > threshold:
+                candidates[idx] = (size, fingerprint)
+                changed.append((idx, screenshot))
+            else:
+                logger.debug("Monitor %d unchanged (%.2f%% of samples differ), skipping", idx, difference * 100)
+    return changed, candidates
+
+
+def _commit_fingerprints(target_dir, fingerprints):
+    """Remember the fingerprints of saved frames, writing the file only if something changed."""
+    if not fingerprints:
+        return
+    with _fingerprint_lock:
+        _last_fingerprints.update(fingerprints)
+        _save_fingerprints(target_dir)
+
+
+def _encode_frames(jobs, max_workers, profile):
+    if len(jobs) <= 1 or max_workers == 1:
+        return [encode_frame(screenshot, file_path, profile) for screenshot, file_path in jobs]
+
+    workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="screenshot-encode") as executor:
+        return list(executor.map(lambda job: encode_frame(job[0], job[1], profile), jobs))
+
+
+def take_screenshot(
+    with_stats=False,
+    max_workers=SCREENSHOT_ENCODE_WORKERS,
+    profile=None,
+    skip_unchanged=SCREENSHOT_SKIP_UNCHANGED,
+    change_threshold=SCREENSHOT_CHANGE_THRESHOLD,
+    sct=None
+):
+    """
+    Capture every monitor and save one image per monitor.
+
+    All monitors are grabbed back-to-back first so the frames are taken at
+    nearly the same moment, then encoded on a worker pool.
+
+    Args:
+        with_stats: If True, return (paths, stats) where stats holds the number
+            of monitors, frames saved/skipped and per-stage timings in seconds
+            (capture, encode, total).
+        max_workers: Encoding threads (default: from settings, 0 = one per monitor up to CPU count).
+        profile: EncodingProfile or name from PROFILES (default: from settings, full-resolution PNG).
+        skip_unchanged: Skip monitors whose frame matches the previous capture
+            (default: from settings). Fingerprints persist next to the screenshots.
+        change_threshold: Fraction of fingerprint samples that must change for a
+            frame to be saved (default: from settings).
+        sct: Open mss instance to reuse (e.g. across daemon ticks); it must
+            belong to the calling thread. A new one is opened and closed if None.
+
+    Returns:
+        List of saved file paths (empty on error, or when every frame was
+        skipped), or (paths, stats) if with_stats.
+    """
     # Build target directory using utils
     target_dir = get_screenshots_dir(SCREENSHOT_DIR)
     ensure_dir(target_dir)
 
     saved_files = []
+    stats = {
+        "monitors": 0,
+        "frames_saved": 0,
+        "frames_skipped": 0,
+        "capture_seconds": 0.0,
+        "encode_seconds": 0.0,
+        "total_seconds": 0.0,
+    }
+    start = time.perf_counter()
 
     try:
-        with mss.mss() as sct:
-            for idx, monitor in enumerate(sct.monitors[1:], start=1):
+        profile = _resolve_profile(profile)
+        with (mss.mss() if sct is None else nullcontext(sct)) as sct:
+            # One timestamp for the whole set of frames
+            stamp = timestamp()
+            frames = [(idx, sct.grab(monitor)) for idx, monitor in enumerate(sct.monitors[1:], start=1)]
+        monitors = len(frames)
+        fingerprints = {}
+        if skip_unchanged:
+            frames, fingerprints = _changed_frames(frames, target_dir, change_threshold)
+        captured = time.perf_counter()
 
-                # Generate filename
-                filename = f"screenshot_{timestamp()}_{idx}.png"
-                file_path = target_dir / filename
+        jobs = [
+            (screenshot, target_dir / f"screenshot_{stamp}_{idx}.{profile.extension}")
+            for idx, screenshot in frames
+        ]
+        saved_files = _encode_frames(jobs, max_workers, profile)
+        encoded = time.perf_counter()
+        # Only after encoding succeeded: a frame that failed to save must not count as seen
+        _commit_fingerprints(target_dir, fingerprints)
 
-                # Capture
-                screenshot = sct.grab(monitor)
-
-                # Save file
-                mss.tools.to_png(screenshot.rgb, screenshot.size, output=str(file_path))
-                saved_files.append(str(file_path))
-
-        return saved_files
+        stats.update(
+            monitors=monitors,
+            frames_saved=len(saved_files),
+            frames_skipped=monitors - len(frames),
+            capture_seconds=captured - start,
+            encode_seconds=encoded - captured,
+            total_seconds=encoded - start,
+        )
+        logger.info(
+            "Captured %d monitor(s) in %.3fs, saved %d and skipped %d unchanged, encoded as %s in %.3fs",
+            monitors, stats["capture_seconds"], stats["frames_saved"], stats["frames_skipped"],
+            profile.format, stats["encode_seconds"]
+        )
 
     except Exception as e:
         logger.exception("Screenshot failed: %s", e)
-        return []
+        saved_files = []
+
+    if with_stats:
+        return saved_files, stats
+    return saved_files
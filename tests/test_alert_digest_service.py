@@ -0,0 +1,206 @@
+"""
+Unit tests for alert_digest_service module.
+Tests coalescing, deduplication, per-recipient rate limiting and rendering.
+"""
+import pytest
+from unittest.mock import patch
+from services.alert_digest_service import AlertDigest, cvss_severity, render_digest, Alert
+
+
+def make_digest(tmp_path=None, recipients=('ops@example.com',), **kwargs):
+    delivered = []
+    kwargs.setdefault('window', 60)
+    kwargs.setdefault('dedupe_ttl', 3600)
+    kwargs.setdefault('rate_limit', 0)
+    state_path = tmp_path / 'alert_digest.json' if tmp_path is not None else None
+    digest = AlertDigest(list(recipients), state_path=state_path, deliver=delivered.extend, **kwargs)
+    return digest, delivered
+
+
+def cve_match(cve_id, name='7-Zip', version='19.00', cvss=9.8):
+    return {
+        'software': {'DisplayName': name, 'DisplayVersion': version},
+        'cve': {'id': cve_id, 'summary': f'Summary of {cve_id}', 'cvss': cvss},
+    }
+
+
+class TestAlertDigest:
+    """Test cases for AlertDigest"""
+
+    def test_coalesces_within_window(self):
+        """Test that alerts are held until the window passes, then sent as one digest"""
+        digest, delivered = make_digest()
+        digest.add('a', 'First alert', now=1000)
+        digest.add('b', 'Second alert', now=1030)
+
+        assert digest.flush(now=1059) == {'alerts': 0, 'sent': 0, 'rate_limited': 0}
+        stats = digest.flush(now=1060)
+
+        assert stats == {'alerts': 2, 'sent': 1, 'rate_limited': 0}
+        assert len(delivered) == 1
+        assert 'First alert' in delivered[0]['body']
+        assert 'Second alert' in delivered[0]['html_body']
+        assert digest.pending() == []
+
+    def test_duplicate_keys_merged_and_suppressed_after_send(self):
+        """Test that a repeated key is counted while pending and dropped after it was sent"""
+        digest, delivered = make_digest()
+        assert digest.add('cve:CVE-1:host', 'CVE-1', now=1000) is True
+        assert digest.add('cve:CVE-1:host', 'CVE-1', now=1010) is True
+        assert digest.pending()[0].count == 2
+
+        digest.flush(now=1100)
+        assert digest.add('cve:CVE-1:host', 'CVE-1', now=2000) is False
+        assert digest.suppressed == 1
+        assert digest.pending() == []
+        assert '(x2)' in delivered[0]['body']
+
+        # Reported again once the dedupe TTL has passed
+        assert digest.add('cve:CVE-1:host', 'CVE-1', now=1100 + 3600) is True
+
+    def test_rate_limit_per_recipient(self):
+        """Test that a recipient over the hourly limit gets held alerts in a later digest"""
+        digest, delivered = make_digest(recipients=['ops@example.com', 'sec@example.com'], rate_limit=1)
+        digest._sends['sec@example.com'] = [1000]
+        digest.add('a', 'Alert A', now=1000)
+
+        stats = digest.flush(now=1100)
+
+        assert stats == {'alerts': 1, 'sent': 1, 'rate_limited': 1}
+        assert [message['to_address'] for message in delivered] == ['ops@example.com']
+        assert digest.pending()[0].recipients == ['sec@example.com']
+
+        # ops@ is not sent the same alert again; sec@ gets it once its hour has passed
+        assert digest.flush(now=2000)['sent'] == 0
+        assert digest.flush(now=4600) == {'alerts': 1, 'sent': 1, 'rate_limited': 0}
+        assert delivered[1]['to_address'] == 'sec@example.com'
+        assert digest.pending() == []
+
+    def test_state_survives_restart(self, tmp_path):
+        """Test that pending alerts and sent keys persist across instances"""
+        first, _ = make_digest(tmp_path)
+        first.add('a', 'Alert A', now=1000)
+        first.add('b', 'Alert B', now=1000)
+        first.flush(now=1100)
+        first.add('c', 'Alert C', now=1200)
+
+        second, delivered = make_digest(tmp_path)
+
+        assert second.add('a', 'Alert A', now=1300) is False
+        assert [alert.key for alert in second.pending()] == ['c']
+        second.flush(now=1300)
+        assert 'Alert C' in delivered[0]['body']
+
+    def test_pending_alerts_follow_recipient_changes(self, tmp_path):
+        """Test that alerts saved for recipients no longer configured are sent to the current ones"""
+        first, _ = make_digest(tmp_path, recipients=['old@example.com'])
+        first.add('a', 'Alert A', now=1000)
+        second, _ = make_digest(tmp_path, recipients=['ops@example.com', 'old@example.com'])
+        second.add('b', 'Alert B', now=1000)
+
+        third, delivered = make_digest(tmp_path, recipients=['new@example.com', 'ops@example.com'])
+
+        assert {alert.key: alert.recipients for alert in third.pending()} == {
+            'a': ['new@example.com', 'ops@example.com'], 'b': ['ops@example.com']
+        }
+        assert third.flush(now=1100) == {'alerts': 2, 'sent': 2, 'rate_limited': 0}
+        assert third.pending() == [] and not third.due(now=5000)
+        assert [message['to_address'] for message in delivered] == ['new@example.com', 'ops@example.com']
+
+    def test_flush_drops_removed_recipients(self):
+        """Test that recipients removed at runtime are not waited for"""
+        digest, delivered = make_digest(recipients=['ops@example.com', 'old@example.com'])
+        digest.add('a', 'Alert A', now=1000)
+        digest.recipients = ['ops@example.com']
+
+        assert digest.flush(now=1100)['sent'] == 1
+        assert digest.pending() == []
+
+        digest.add('b', 'Alert B', now=1200)
+        digest.recipients = []
+        assert digest.flush(now=1300)['sent'] == 0
+        assert digest.pending() == []
+
+    def test_failed_delivery_keeps_partial_progress(self, tmp_path):
+        """Test that digests delivered before a failure are not sent again"""
+        recipients = ['ops@example.com', 'sec@example.com']
+        digest, _ = make_digest(tmp_path, recipients=recipients)
+        delivered = []
+
+        def deliver(messages):
+            if messages[0]['to_address'] == 'sec@example.com' and len(delivered) == 1:
+                raise OSError('Disk full')
+            delivered.extend(messages)
+
+        digest.deliver = deliver
+        digest.add('a', 'Alert A', now=1000)
+
+        with pytest.raises(OSError):
+            digest.flush(now=1100)
+        assert digest.pending()[0].recipients == ['sec@example.com']
+
+        restarted, delivered_later = make_digest(tmp_path, recipients=recipients)
+        assert restarted.flush(now=1200) == {'alerts': 1, 'sent': 1, 'rate_limited': 0}
+        assert [message['to_address'] for message in delivered + delivered_later] == recipients
+        assert restarted.pending() == []
+
+    def test_add_cve_matches(self):
+        """Test that CVE matches are keyed on CVE id and host with a CVSS severity"""
+        digest, _ = make_digest()
+
+        added = digest.add_cve_matches([cve_match('CVE-1'), cve_match('CVE-1'), cve_match('CVE-2', cvss=5.0)],
+                                       host='host-a', now=1000)
+
+        assert added == 3
+        alerts = {alert.key: alert for alert in digest.pending()}
+        assert alerts['cve:CVE-1:host-a'].count == 2
+        assert alerts['cve:CVE-1:host-a'].severity == 'critical'
+        assert alerts['cve:CVE-2:host-a'].severity == 'medium'
+        assert alerts['cve:CVE-2:host-a'].title == '7-Zip 19.00: CVE-2'
+
+    def test_cve_batch_saved_once(self, tmp_path):
+        """Test that a batch of CVE matches rewrites the state file once"""
+        digest, _ = make_digest(tmp_path)
+
+        with patch('services.alert_digest_service.atomic_write') as mock_write:
+            digest.add_cve_matches([cve_match(f'CVE-{i}') for i in range(50)], host='host-a', now=1000)
+
+        assert mock_write.call_count == 1
+        assert len(digest.pending()) == 50
+
+    def test_severity_normalized_and_validated(self):
+        """Test that severities are case-insensitive and unknown ones are rejected"""
+        digest, _ = make_digest()
+
+        digest.add('a', 'Alert A', severity='HIGH', now=1000)
+        assert digest.pending()[0].severity == 'high'
+        with pytest.raises(ValueError):
+            digest.add('b', 'Alert B', severity='urgent', now=1000)
+        assert len(digest.pending()) == 1
+
+
+class TestRendering:
+    """Test cases for cvss_severity and render_digest"""
+
+    @pytest.mark.parametrize('score, severity', [
+        (9.8, 'critical'), (7.0, 'high'), ('5.5', 'medium'), (2, 'low'), (None, 'info'), ('n/a', 'info'),
+    ])
+    def test_cvss_severity(self, score, severity):
+        """Test CVSS score to severity mapping"""
+        assert cvss_severity(score) == severity
+
+    def test_html_escaped_with_severity_summary(self):
+        """Test that alert text is escaped and the subject counts alerts per severity"""
+        alerts = [
+            Alert('a', 'Low <thing>', severity='low', host='h', last_seen=1000),
+            Alert('b', 'Critical & urgent', severity='critical', host='h', last_seen=1000),
+        ]
+        subject, text, html = render_digest(alerts, 'h')
+
+        assert subject == 'System Monitor digest for h: 2 alert(s) (1 critical, 1 low)'
+        assert 'Low &lt;thing&gt;' in html
+        assert 'Critical &amp; urgent' in html
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,154 @@
+"""
+Unit tests for cve_cache module.
+Tests TTLs, negative caching, LRU eviction and persistence.
+"""
+import sqlite3
+import pytest
+from unittest.mock import patch, MagicMock
+from services.cve_cache import CveCache
+from services.cve_service import get_cve_by_id, search_cves_by_vendor, set_cache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cve_cache = CveCache(tmp_path / 'cve_cache.sqlite', max_entries=10)
+    yield cve_cache
+    cve_cache.close()
+
+
+class TestCveCache:
+    """Test cases for CveCache class"""
+
+    def test_set_and_get(self, cache):
+        """Test storing and reading back an entry"""
+        cache.set('cve:CVE-2021-44228', {'id': 'CVE-2021-44228'}, ttl=60)
+
+        assert cache.get('cve:CVE-2021-44228') == (True, {'id': 'CVE-2021-44228'})
+        assert cache.stats()['hits'] == 1
+
+    def test_miss(self, cache):
+        """Test lookup of an unknown key"""
+        assert cache.get('cve:CVE-2021-0001') == (False, None)
+        assert cache.stats()['misses'] == 1
+
+    def test_negative_entry(self, cache):
+        """Test that None is cached as a negative hit"""
+        cache.set('cve:CVE-2099-99999', None, ttl=60)
+
+        assert cache.get('cve:CVE-2099-99999') == (True, None)
+        assert cache.stats()['negative_hits'] == 1
+
+    def test_expired_entry_is_a_miss(self, cache):
+        """Test that entries past their TTL are not served"""
+        with patch('services.cve_cache.time.time', return_value=1000.0):
+            cache.set('cve:CVE-2021-44228', {'id': 'CVE-2021-44228'}, ttl=10)
+        with patch('services.cve_cache.time.time', return_value=1011.0):
+            assert cache.get('cve:CVE-2021-44228') == (False, None)
+
+    def test_lru_eviction(self, cache):
+        """Test that the least recently used entries are evicted past max_entries"""
+        for i in range(10):
+            with patch('services.cve_cache.time.time', return_value=1000.0 + i):
+                cache.set(f'key{i}', i, ttl=10 ** 10)
+        # Touch key0 so key1 becomes the least recently used
+        with patch('services.cve_cache.time.time', return_value=2000.0):
+            cache.get('key0')
+            cache.set('key10', 10, ttl=10 ** 10)
+
+        stats = cache.stats()
+        assert stats['entries'] <= 10
+        assert stats['evictions'] >= 1
+        assert cache.get('key0')[0] is True
+        assert cache.get('key1')[0] is False
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test that entries survive reopening the cache file"""
+        path = tmp_path / 'cve_cache.sqlite'
+        first = CveCache(path)
+        first.set('cve:CVE-2021-44228', {'id': 'CVE-2021-44228'}, ttl=60)
+        first.close()
+
+        second = CveCache(path)
+        try:
+            assert second.get('cve:CVE-2021-44228') == (True, {'id': 'CVE-2021-44228'})
+        finally:
+            second.close()
+
+
+class TestCveServiceCaching:
+    """Test cases for cache integration in cve_service"""
+
+    @pytest.fixture(autouse=True)
+    def enabled_cache(self, cache):
+        set_cache(cache)
+        yield cache
+        set_cache(None)
+
+    @patch('services.cve_service.requests.Session.get')
+    def test_get_cve_served_from_cache(self, mock_get):
+        """Test that a warm cache avoids network calls"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'id': 'CVE-2021-44228'}
+        mock_get.return_value = mock_response
+
+        assert get_cve_by_id('CVE-2021-44228') == {'id': 'CVE-2021-44228'}
+        assert get_cve_by_id('CVE-2021-44228') == {'id': 'CVE-2021-44228'}
+
+        mock_get.assert_called_once()
+
+    @patch('services.cve_service.requests.Session.get')
+    def test_not_found_is_negatively_cached(self, mock_get):
+        """Test that 404 responses are cached"""
+        mock_get.return_value.status_code = 404
+
+        assert get_cve_by_id('CVE-2099-99999') is None
+        assert get_cve_by_id('CVE-2099-99999') is None
+
+        mock_get.assert_called_once()
+
+    @patch('services.cve_service.requests.Session.get')
+    def test_server_errors_are_not_cached(self, mock_get):
+        """Test that transient errors are retried on the next lookup"""
+        mock_get.return_value.status_code = 500
+
+        get_cve_by_id('CVE-2021-44228')
+        get_cve_by_id('CVE-2021-44228')
+
+        assert mock_get.call_count == 2
+
+    @patch('services.cve_service.requests.Session.get')
+    def test_search_served_from_cache(self, mock_get):
+        """Test that vendor searches are cached per max_results"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = [{'id': f'CVE-2021-000{i}'} for i in range(5)]
+        mock_get.return_value = mock_response
+
+        first = search_cves_by_vendor('apache', max_results=3)
+        second = search_cves_by_vendor('apache', max_results=3)
+
+        assert first == second
+        assert len(second) == 3
+        mock_get.assert_called_once()
+
+    @patch('services.cve_service.requests.Session.get')
+    def test_cache_errors_fall_back_to_network(self, mock_get, enabled_cache):
+        """Test that a locked or corrupt cache DB is logged and lookups continue uncached"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'id': 'CVE-2021-44228'}
+        mock_get.return_value = mock_response
+        locked = sqlite3.OperationalError('database is locked')
+
+        with patch.object(enabled_cache, 'get', side_effect=locked), \
+                patch.object(enabled_cache, 'set', side_effect=locked):
+            assert get_cve_by_id('CVE-2021-44228') == {'id': 'CVE-2021-44228'}
+            mock_response.json.return_value = [{'id': 'CVE-2021-0001'}]
+            assert search_cves_by_vendor('apache') == [{'id': 'CVE-2021-0001'}]
+
+        assert mock_get.call_count == 2
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,214 @@
+"""
+Unit tests for cve_matcher module.
+Tests the Aho-Corasick automaton and software-to-CVE matching.
+"""
+import random
+import pytest
+from services.cve_matcher import AhoCorasick, CveMatcher
+from utils.version_utils import VersionIntervals, parse_version
+
+
+def naive_match(software_list, cve_list):
+    """Reference implementation: the original nested substring loop"""
+    return [
+        {'software': software, 'cve': cve}
+        for software in software_list
+        for cve in cve_list
+        if software.get('DisplayName') and cve.get('product') in software['DisplayName']
+    ]
+
+
+class TestAhoCorasick:
+    """Test cases for AhoCorasick class"""
+
+    def test_overlapping_patterns(self):
+        """Test classic overlapping and suffix patterns"""
+        automaton = AhoCorasick(['he', 'she', 'his', 'hers'])
+
+        found = {automaton.patterns[i] for i in automaton.find('ushers')}
+
+        assert found == {'he', 'she', 'hers'}
+
+    def test_no_match(self):
+        """Test text containing no pattern"""
+        automaton = AhoCorasick(['java', 'python'])
+
+        assert automaton.find('Microsoft Edge') == set()
+
+    def test_matches_naive_substring_search(self):
+        """Test against str.__contains__ on random inputs"""
+        rng = random.Random(42)
+        patterns = list({''.join(rng.choice('abc') for _ in range(rng.randint(1, 4))) for _ in range(40)})
+        automaton = AhoCorasick(patterns)
+
+        for _ in range(200):
+            text = ''.join(rng.choice('abcd') for _ in range(rng.randint(0, 20)))
+            expected = {i for i, p in enumerate(automaton.patterns) if p in text}
+            assert automaton.find(text) == expected
+
+
+class TestCveMatcher:
+    """Test cases for CveMatcher class"""
+
+    def test_same_pairs_as_nested_loop(self):
+        """Test equivalence with the original nested loop, including order"""
+        rng = random.Random(7)
+        words = ['Apache', 'Tomcat', 'Java', 'Runtime', 'Edge', 'Office', '2019', 'x64']
+        software_list = [
+            {'DisplayName': ' '.join(rng.sample(words, rng.randint(1, 4))), 'DisplayVersion': '1.0'}
+            for _ in range(60)
+        ] + [{'DisplayName': ''}, {'Publisher': 'No Name'}]
+        cve_list = [
+            {'id': f'CVE-2021-{i:04d}', 'product': ' '.join(rng.sample(words, rng.randint(1, 2)))}
+            for i in range(80)
+        ]
+
+        assert CveMatcher(cve_list).match(software_list) == naive_match(software_list, cve_list)
+
+    def test_duplicate_products_keep_cve_order(self):
+        """Test several CVEs sharing one product"""
+        software_list = [{'DisplayName': 'Apache Tomcat 9.0'}]
+        cve_list = [
+            {'product': 'Tomcat', 'id': 'CVE-2021-0003'},
+            {'product': 'Apache Tomcat', 'id': 'CVE-2021-0001'},
+            {'product': 'Tomcat', 'id': 'CVE-2021-0002'}
+        ]
+
+        result = CveMatcher(cve_list).match(software_list)
+
+        assert [m['cve']['id'] for m in result] == ['CVE-2021-0003', 'CVE-2021-0001', 'CVE-2021-0002']
+
+    def test_empty_product_matches_everything(self):
+        """Test that an empty product behaves like the substring test"""
+        software_list = [{'DisplayName': 'A'}, {'DisplayName': 'B'}]
+        cve_list = [{'product': '', 'id': 'CVE-2021-0001'}]
+
+        assert CveMatcher(cve_list).match(software_list) == naive_match(software_list, cve_list)
+
+    def test_cves_without_product_are_ignored(self):
+        """Test that CVEs lacking a product never match"""
+        software_list = [{'DisplayName': 'Apache Tomcat'}]
+        cve_list = [{'id': 'CVE-2021-0001'}, {'product': None, 'id': 'CVE-2021-0002'}]
+
+        assert CveMatcher(cve_list).match(software_list) == []
+
+    def test_matcher_is_reusable(self):
+        """Test matching several software lists with one index"""
+        matcher = CveMatcher([{'product': 'Edge', 'id': 'CVE-2021-0001'}])
+
+        assert len(matcher.match([{'DisplayName': 'Microsoft Edge'}])) == 1
+        assert matcher.match([{'DisplayName': 'Firefox'}]) == []
+
+
+def log4j_cve(cve_id='CVE-2021-44228', **bounds):
+    """CVE in normalized store format with one affected log4j range"""
+    match = {'cpe': 'cpe:2.3:a:apache:log4j:*:*:*:*:*:*:*:*', 'vendor': 'apache', 'product': 'log4j', 'version': ''}
+    match.update(bounds)
+    return {'id': cve_id, 'product': 'Log4j', 'cpe_matches': [match]}
+
+
+class TestParseVersion:
+    """Test cases for parse_version function"""
+
+    @pytest.mark.parametrize('lower, higher', [
+        ('9.0.41', '9.0.100'),
+        ('2.14.1', '2.15.0'),
+        ('2.15.0-rc1', '2.15.0'),
+        ('2.0-beta9', '2.0'),
+        ('1.9', '1.10'),
+        ('120.0.6099.130', '121.0.1')
+    ])
+    def test_ordering(self, lower, higher):
+        """Test numeric and pre-release ordering"""
+        assert parse_version(lower) < parse_version(higher)
+
+    def test_trailing_zeros_ignored(self):
+        """Test that 2.0 and 2.0.0 are the same version"""
+        assert parse_version('2.0') == parse_version('2.0.0') == parse_version('2')
+
+    def test_unparseable(self):
+        """Test empty and non-string versions"""
+        assert parse_version('') is None
+        assert parse_version(None) is None
+        assert parse_version('...') is None
+
+
+class TestVersionIntervals:
+    """Test cases for VersionIntervals class"""
+
+    def test_merged_intervals(self):
+        """Test membership across overlapping, touching and disjoint ranges"""
+        v = parse_version
+        intervals = VersionIntervals([
+            (v('2.0'), True, v('2.3'), False),
+            (v('2.3'), True, v('2.5'), True),
+            (v('3.0'), False, v('3.1'), False),
+            (v('2.1'), True, v('2.2'), True)
+        ])
+
+        assert intervals.contains(v('2.0'))
+        assert intervals.contains(v('2.3'))
+        assert intervals.contains(v('2.5'))
+        assert not intervals.contains(v('2.6'))
+        assert not intervals.contains(v('3.0'))
+        assert intervals.contains(v('3.0.5'))
+        assert not intervals.contains(v('3.1'))
+        assert not intervals.contains(v('1.9'))
+
+
+class TestVersionAwareMatching:
+    """Test cases for version-range filtering in CveMatcher"""
+
+    def test_range_filters_fixed_versions(self):
+        """Test that versions past the fixed release are not reported"""
+        software_list = [
+            {'DisplayName': 'Log4j Core', 'DisplayVersion': '2.14.1'},
+            {'DisplayName': 'Log4j Core', 'DisplayVersion': '2.15.0'},
+            {'DisplayName': 'Log4j Core', 'DisplayVersion': '1.2.17'}
+        ]
+        cve_list = [log4j_cve(version_start_including='2.0', version_end_excluding='2.15.0')]
+
+        result = CveMatcher(cve_list).match(software_list)
+
+        assert [m['software']['DisplayVersion'] for m in result] == ['2.14.1']
+
+    def test_exact_versions_from_circl_records(self):
+        """Test exact vulnerable_product versions"""
+        cve = {
+            'id': 'CVE-2021-0001',
+            'product': 'Tomcat',
+            'vulnerable_product': [
+                'cpe:2.3:a:apache:tomcat:9.0.40:*:*:*:*:*:*:*',
+                'cpe:2.3:a:apache:tomcat:9.0.41:*:*:*:*:*:*:*'
+            ]
+        }
+        software_list = [
+            {'DisplayName': 'Apache Tomcat', 'DisplayVersion': '9.0.41'},
+            {'DisplayName': 'Apache Tomcat', 'DisplayVersion': '9.0.42'}
+        ]
+
+        result = CveMatcher([cve]).match(software_list)
+
+        assert [m['software']['DisplayVersion'] for m in result] == ['9.0.41']
+
+    def test_unknown_versions_are_kept(self):
+        """Test conservative behaviour without version information"""
+        software_list = [
+            {'DisplayName': 'Log4j Core', 'DisplayVersion': ''},
+            {'DisplayName': 'Log4j Core'}
+        ]
+        cve_list = [log4j_cve(version_end_excluding='2.15.0'), {'id': 'CVE-2021-0002', 'product': 'Log4j'}]
+
+        assert len(CveMatcher(cve_list).match(software_list)) == 4
+
+    def test_match_versions_disabled(self):
+        """Test that match_versions=False keeps every product hit"""
+        software_list = [{'DisplayName': 'Log4j Core', 'DisplayVersion': '2.17.0'}]
+        cve_list = [log4j_cve(version_end_excluding='2.15.0')]
+
+        assert CveMatcher(cve_list).match(software_list) == []
+        assert len(CveMatcher(cve_list, match_versions=False).match(software_list)) == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -5,15 +5,72 @@ Tests CVE fetching and searching functionality with mocked API calls.
 import pytest
 from unittest.mock import patch, MagicMock
 import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import requests
 from requests.exceptions import Timeout, RequestException
-from services.cve_service import get_cve_by_id, get_cve_list, search_cves_by_vendor
+from services.cve_service import (
+    get_cve_by_id,
+    get_cve_list,
+    search_cves_by_vendor,
+    iter_cves_by_vendor,
+    create_session,
+    get_session,
+    set_session,
+    parse_watchlist,
+    fetch_watchlist_cves
+)
+
+
+class _StubCveHandler(BaseHTTPRequestHandler):
+    """Minimal CVE API stub: serves /cve/<id>, fails the first N requests with 503."""
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests += 1
+        if self.server.failures_left > 0:
+            self.server.failures_left -= 1
+            self._reply(503, b'{}')
+            return
+        cve_id = self.path.rsplit('/', 1)[-1]
+        self._reply(200, json.dumps({'id': cve_id}).encode())
+
+    def _reply(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_cve_server(monkeypatch):
+    """Run a local CVE API stub and point the service at it"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubCveHandler)
+    server.connections = 0
+    server.requests = 0
+    server.failures_left = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr('services.cve_service.CVE_API_BASE_URL', f'http://127.0.0.1:{server.server_port}/api')
+    yield server
+    server.shutdown()
+    server.server_close()
+    set_session(None)
 
 
 class TestGetCveById:
     """Test cases for get_cve_by_id function"""
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
     def test_get_cve_success(self, mock_get):
         """Test successful CVE fetch"""
         mock_response = MagicMock()
@@ -55,7 +112,7 @@ class TestGetCveById:
             'CVE-2023-12345678'  # CVE with more than 4 digits after year
         ]
         
-        with patch('services.cve_service.requests.get') as mock_get:
+        with patch('services.cve_service.requests.Session.get') as mock_get:
             mock_response = MagicMock()
             mock_response.status_code = 200
             mock_response.json.return_value = {'id': 'test'}
@@ -65,7 +122,7 @@ class TestGetCveById:
                 result = get_cve_by_id(cve_id)
                 assert result is not None
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
     def test_get_cve_not_found(self, mock_get):
         """Test CVE not found (404)"""
         mock_response = MagicMock()
@@ -76,7 +133,7 @@ class TestGetCveById:
         
         assert result is None
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
     def test_get_cve_server_error(self, mock_get):
         """Test server error response"""
         mock_response = MagicMock()
@@ -87,7 +144,7 @@ class TestGetCveById:
         
         assert result is None
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
     def test_get_cve_timeout(self, mock_get):
         """Test timeout handling"""
         mock_get.side_effect = Timeout("Connection timeout")
@@ -96,7 +153,7 @@ class TestGetCveById:
         
         assert result is None
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
     def test_get_cve_json_decode_error(self, mock_get):
         """Test invalid JSON response"""
         mock_response = MagicMock()
@@ -108,7 +165,7 @@ class TestGetCveById:
         
         assert result is None
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
     def test_get_cve_network_error(self, mock_get):
         """Test network error handling"""
         mock_get.side_effect = RequestException("Network error")
@@ -117,7 +174,7 @@ class TestGetCveById:
         
         assert result is None
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
     def test_get_cve_custom_timeout(self, mock_get):
         """Test with custom timeout parameter"""
         mock_response = MagicMock()
@@ -147,7 +204,7 @@ class TestGetCveList:
         ]
         
         cve_ids = ['CVE-2021-44228', 'CVE-2021-45046', 'CVE-2021-45105']
-        result = get_cve_list(cve_ids)
+        result = get_cve_list(cve_ids, max_workers=1)
         
         assert len(result) == 3
         assert result[0]['id'] == 'CVE-2021-44228'
@@ -163,7 +220,7 @@ class TestGetCveList:
         ]
         
         cve_ids = ['CVE-2021-44228', 'CVE-2099-99999', 'CVE-2021-45105']
-        result = get_cve_list(cve_ids)
+        result = get_cve_list(cve_ids, max_workers=1)
         
         assert len(result) == 2
         assert result[0]['id'] == 'CVE-2021-44228'
@@ -186,7 +243,7 @@ class TestGetCveList:
         ]
         
         cve_ids = ['INVALID', 'CVE-2021-45046']
-        result = get_cve_list(cve_ids)
+        result = get_cve_list(cve_ids, max_workers=1)
         
         assert len(result) == 1
         assert result[0]['id'] == 'CVE-2021-45046'
@@ -199,12 +256,102 @@ class TestGetCveList:
         result = get_cve_list(['CVE-2021-44228'], timeout=20)
         
         mock_get_cve.assert_called_once_with('CVE-2021-44228', timeout=20)
+    
+    @patch('services.cve_service.get_cve_by_id')
+    def test_get_cve_list_concurrent_preserves_order(self, mock_get_cve):
+        """Test concurrent mode returns results in input order"""
+        delays = {'CVE-2021-0001': 0.05, 'CVE-2021-0002': 0.0, 'CVE-2021-0003': 0.02}
+        
+        def fake_fetch(cve_id, timeout):
+            time.sleep(delays[cve_id])
+            return {'id': cve_id}
+        
+        mock_get_cve.side_effect = fake_fetch
+        
+        result = get_cve_list(list(delays), max_workers=3)
+        
+        assert [cve['id'] for cve in result] == list(delays)
+        assert mock_get_cve.call_count == 3
+    
+    @patch('services.cve_service.get_cve_by_id')
+    def test_get_cve_list_concurrent_skips_invalid_and_failed(self, mock_get_cve):
+        """Test concurrent mode keeps the skip/exclude contract"""
+        def fake_fetch(cve_id, timeout):
+            if cve_id == 'INVALID':
+                raise ValueError("Invalid format")
+            if cve_id == 'CVE-2099-99999':
+                return None
+            return {'id': cve_id}
+        
+        mock_get_cve.side_effect = fake_fetch
+        
+        cve_ids = ['CVE-2021-44228', 'INVALID', 'CVE-2099-99999', 'CVE-2021-45046']
+        result = get_cve_list(cve_ids, max_workers=4)
+        
+        assert [cve['id'] for cve in result] == ['CVE-2021-44228', 'CVE-2021-45046']
+    
+    @patch('services.cve_service.get_cve_by_id')
+    def test_get_cve_list_concurrent_deadline(self, mock_get_cve):
+        """Test that slow fetches past the batch deadline are excluded"""
+        def fake_fetch(cve_id, timeout):
+            if cve_id == 'CVE-2021-0002':
+                time.sleep(0.5)
+            return {'id': cve_id}
+        
+        mock_get_cve.side_effect = fake_fetch
+        
+        start = time.monotonic()
+        result = get_cve_list(['CVE-2021-0001', 'CVE-2021-0002', 'CVE-2021-0003'], max_workers=3, deadline=0.1)
+        
+        assert time.monotonic() - start < 0.4
+        assert [cve['id'] for cve in result] == ['CVE-2021-0001', 'CVE-2021-0003']
+    
+    @patch('services.cve_service.get_cve_by_id')
+    def test_get_cve_list_sequential_deadline(self, mock_get_cve):
+        """Test that the deadline also bounds sequential mode"""
+        def fake_fetch(cve_id, timeout):
+            time.sleep(0.1)
+            return {'id': cve_id}
+        
+        mock_get_cve.side_effect = fake_fetch
+        
+        result = get_cve_list(['CVE-2021-0001', 'CVE-2021-0002', 'CVE-2021-0003'], max_workers=1, deadline=0.05)
+        
+        assert [cve['id'] for cve in result] == ['CVE-2021-0001']
+    
+    @patch('services.cve_service.get_cve_by_id')
+    def test_get_cve_list_sequential_timeout_capped_by_deadline(self, mock_get_cve):
+        """Test that sequential requests are given no more time than is left of the deadline"""
+        timeouts = []
+        
+        def fake_fetch(cve_id, timeout):
+            timeouts.append(timeout)
+            time.sleep(0.05)
+            return {'id': cve_id}
+        
+        mock_get_cve.side_effect = fake_fetch
+        
+        get_cve_list(['CVE-2021-0001', 'CVE-2021-0002', 'CVE-2021-0003'], timeout=10, max_workers=1, deadline=1)
+        
+        assert len(timeouts) == 3
+        assert all(timeout <= 1 for timeout in timeouts)
+        assert timeouts[0] > timeouts[1] > timeouts[2]
+    
+    @patch('services.cve_service._fetch_concurrently')
+    def test_get_cve_list_concurrent_by_default(self, mock_pool):
+        """Test that batches use the thread pool unless configured otherwise"""
+        mock_pool.return_value = [{'id': 'CVE-2021-0001'}, None]
+        
+        result = get_cve_list(['CVE-2021-0001', 'CVE-2021-0002'])
+        
+        assert result == [{'id': 'CVE-2021-0001'}]
+        assert mock_pool.call_args.args[2] > 1
 
 
 class TestSearchCvesByVendor:
     """Test cases for search_cves_by_vendor function"""
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
     def test_search_vendor_success(self, mock_get):
         """Test successful vendor search"""
         mock_response = MagicMock()
@@ -225,7 +372,7 @@ class TestSearchCvesByVendor:
             timeout=10
         )
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
     def test_search_vendor_max_results(self, mock_get):
         """Test max_results parameter"""
         mock_response = MagicMock()
@@ -244,7 +391,7 @@ class TestSearchCvesByVendor:
         assert result[0]['id'] == 'CVE-2021-0000'
         assert result[4]['id'] == 'CVE-2021-0004'
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
     def test_search_vendor_no_results(self, mock_get):
         """Test vendor with no CVEs"""
         mock_response = MagicMock()
@@ -256,7 +403,7 @@ class TestSearchCvesByVendor:
         
         assert result == []
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
     def test_search_vendor_error_response(self, mock_get):
         """Test error response from API"""
         mock_response = MagicMock()
@@ -267,7 +414,7 @@ class TestSearchCvesByVendor:
         
         assert result == []
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
     def test_search_vendor_timeout(self, mock_get):
         """Test timeout during search"""
         mock_get.side_effect = Timeout("Connection timeout")
@@ -276,7 +423,7 @@ class TestSearchCvesByVendor:
         
         assert result == []
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
     def test_search_vendor_json_error(self, mock_get):
         """Test invalid JSON response"""
         mock_response = MagicMock()
@@ -288,7 +435,7 @@ class TestSearchCvesByVendor:
         
         assert result == []
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
     def test_search_vendor_network_error(self, mock_get):
         """Test network error during search"""
         mock_get.side_effect = RequestException("Network error")
@@ -297,7 +444,7 @@ class TestSearchCvesByVendor:
         
         assert result == []
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
     def test_search_vendor_custom_timeout(self, mock_get):
         """Test custom timeout parameter"""
         mock_response = MagicMock()
@@ -312,7 +459,23 @@ class TestSearchCvesByVendor:
             timeout=30
         )
     
-    @patch('services.cve_service.requests.get')
+    @patch('services.cve_service.requests.Session.get')
+    def test_search_vendor_and_product(self, mock_get):
+        """Test narrowing a search to one product"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = [{'id': 'CVE-2021-44228'}]
+        mock_get.return_value = mock_response
+        
+        result = search_cves_by_vendor('apache', product='log4j')
+        
+        assert len(result) == 1
+        mock_get.assert_called_once_with(
+            'https://cve.circl.lu/api/search/apache/log4j',
+            timeout=10
+        )
+    
+    @patch('services.cve_service.requests.Session.get')
     def test_search_vendor_non_list_response(self, mock_get):
         """Test when API returns non-list response"""
         mock_response = MagicMock()
@@ -326,5 +489,169 @@ class TestSearchCvesByVendor:
         assert result == []
 
 
+def streamed_response(items, chunk_size=16, status_code=200):
+    """Mock streaming response that records how many body chunks were read"""
+    body = json.dumps(items).encode()
+    response = MagicMock()
+    response.status_code = status_code
+    response.chunks_read = 0
+    
+    def iter_content(chunk_size=chunk_size):
+        for i in range(0, len(body), 16):
+            response.chunks_read += 1
+            yield body[i:i + 16]
+    
+    response.iter_content.side_effect = iter_content
+    response.total_chunks = -(-len(body) // 16)
+    return response
+
+
+class TestIterCvesByVendor:
+    """Test cases for iter_cves_by_vendor function"""
+    
+    @patch('services.cve_service.requests.Session.get')
+    def test_stream_stops_at_max_results(self, mock_get):
+        """Test that the body is not read past max_results"""
+        response = streamed_response([{'id': f'CVE-2021-{i:04d}'} for i in range(1000)])
+        mock_get.return_value = response
+        
+        result = list(iter_cves_by_vendor('microsoft', max_results=5))
+        
+        assert [cve['id'] for cve in result] == [f'CVE-2021-{i:04d}' for i in range(5)]
+        assert response.chunks_read < response.total_chunks / 10
+        response.close.assert_called_once()
+        mock_get.assert_called_once_with(
+            'https://cve.circl.lu/api/search/microsoft',
+            timeout=10,
+            stream=True
+        )
+    
+    @patch('services.cve_service.requests.Session.get')
+    def test_stream_all_results(self, mock_get):
+        """Test max_results=None yields the full result set"""
+        mock_get.return_value = streamed_response([{'id': f'CVE-2021-{i:04d}'} for i in range(30)])
+        
+        assert len(list(iter_cves_by_vendor('apache', max_results=None))) == 30
+    
+    @patch('services.cve_service.requests.Session.get')
+    def test_stream_closes_when_caller_stops(self, mock_get):
+        """Test that abandoning the generator closes the response"""
+        response = streamed_response([{'id': f'CVE-2021-{i:04d}'} for i in range(100)])
+        mock_get.return_value = response
+        
+        cves = iter_cves_by_vendor('apache', max_results=None)
+        next(cves)
+        cves.close()
+        
+        response.close.assert_called_once()
+    
+    @patch('services.cve_service.requests.Session.get')
+    def test_stream_error_response(self, mock_get):
+        """Test HTTP errors and non-list bodies yield nothing"""
+        mock_get.return_value = streamed_response([], status_code=500)
+        assert list(iter_cves_by_vendor('apache')) == []
+        
+        mock_get.return_value = streamed_response({'error': 'Invalid request'})
+        assert list(iter_cves_by_vendor('apache')) == []
+    
+    @patch('services.cve_service.requests.Session.get')
+    def test_stream_network_error(self, mock_get):
+        """Test network errors end the stream"""
+        mock_get.side_effect = RequestException("Network error")
+        
+        assert list(iter_cves_by_vendor('apache')) == []
+    
+    @patch('services.cve_service.requests.Session.get')
+    def test_search_vendor_stream_mode(self, mock_get):
+        """Test search_cves_by_vendor(stream=True) returns a list"""
+        mock_get.return_value = streamed_response([{'id': f'CVE-2021-{i:04d}'} for i in range(100)])
+        
+        result = search_cves_by_vendor('apache', max_results=3, stream=True)
+        
+        assert [cve['id'] for cve in result] == ['CVE-2021-0000', 'CVE-2021-0001', 'CVE-2021-0002']
+
+
+class TestCveSession:
+    """Test cases for the shared HTTP session"""
+    
+    def test_get_session_is_shared(self):
+        """Test that the default session is created once and reused"""
+        set_session(None)
+        try:
+            assert get_session() is get_session()
+        finally:
+            set_session(None)
+    
+    def test_set_session_injects_session(self):
+        """Test that an injected session is used for requests"""
+        mock_session = MagicMock()
+        mock_session.get.return_value.status_code = 404
+        set_session(mock_session)
+        try:
+            get_cve_by_id('CVE-2021-44228')
+        finally:
+            set_session(None)
+        
+        mock_session.get.assert_called_once_with(
+            'https://cve.circl.lu/api/cve/CVE-2021-44228',
+            timeout=10
+        )
+    
+    def test_create_session_pool_and_retries(self):
+        """Test connection pool sizing and retry policy on the adapter"""
+        session = create_session(pool_size=25, max_retries=4, backoff_factor=0.1)
+        adapter = session.get_adapter('https://cve.circl.lu/api')
+        
+        assert adapter._pool_maxsize == 25
+        assert adapter.max_retries.total == 4
+        assert 429 in adapter.max_retries.status_forcelist
+        assert 503 in adapter.max_retries.status_forcelist
+    
+    def test_connections_are_reused(self, stub_cve_server):
+        """Test that batch lookups share one keep-alive connection"""
+        session = create_session(pool_size=1, max_retries=0)
+        
+        for i in range(5):
+            result = get_cve_by_id(f'CVE-2021-000{i}', session=session)
+            assert result == {'id': f'CVE-2021-000{i}'}
+        
+        assert stub_cve_server.requests == 5
+        assert stub_cve_server.connections == 1
+    
+    def test_retries_transient_errors(self, stub_cve_server):
+        """Test that 503 responses are retried with backoff"""
+        stub_cve_server.failures_left = 2
+        set_session(create_session(max_retries=3, backoff_factor=0))
+        
+        result = get_cve_by_id('CVE-2021-44228')
+        
+        assert result == {'id': 'CVE-2021-44228'}
+        assert stub_cve_server.requests == 3
+
+
+class TestWatchlist:
+    """Test cases for the CVE scan watchlist"""
+    
+    def test_parse_watchlist(self):
+        """Test parsing entries with and without a product"""
+        watchlist = parse_watchlist(" Apache Tomcat=apache/tomcat, 7-Zip=7-zip ,bogus,")
+        
+        assert watchlist == [
+            {'name': 'Apache Tomcat', 'vendor': 'apache', 'product': 'tomcat'},
+            {'name': '7-Zip', 'vendor': '7-zip', 'product': None}
+        ]
+        assert parse_watchlist('') == []
+    
+    @patch('services.cve_service.search_cves_by_vendor')
+    def test_fetch_watchlist_cves(self, mock_search):
+        """Test that results are tagged with the display name to match on"""
+        mock_search.return_value = [{'id': 'CVE-2020-1938'}]
+        
+        result = fetch_watchlist_cves([{'name': 'Apache Tomcat', 'vendor': 'apache', 'product': 'tomcat'}])
+        
+        assert result == [{'id': 'CVE-2020-1938', 'product': 'Apache Tomcat'}]
+        assert mock_search.call_args.kwargs['product'] == 'tomcat'
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
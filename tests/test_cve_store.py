@@ -0,0 +1,226 @@
+"""
+Unit tests for cve_store module.
+Tests streaming feed import, delta imports and indexed lookups.
+"""
+import gzip
+import json
+import sqlite3
+import pytest
+from unittest.mock import patch
+from services.cve_store import CveStore, normalize_cve_record
+from services.cve_service import get_cve_by_id, get_offline_store, search_cves_by_vendor, set_offline_store
+from utils.json_stream import iter_json_array
+
+
+def nvd2_item(cve_id, product='log4j', modified='2024-01-01T00:00:00.000', end_excluding='2.15.0'):
+    return {
+        'cve': {
+            'id': cve_id,
+            'published': '2021-12-10T10:15:09.143',
+            'lastModified': modified,
+            'descriptions': [{'lang': 'en', 'value': f'{product} issue'}],
+            'metrics': {'cvssMetricV31': [{'cvssData': {'baseScore': 10.0}}]},
+            'configurations': [{'nodes': [{'cpeMatch': [{
+                'vulnerable': True,
+                'criteria': f'cpe:2.3:a:apache:{product}:*:*:*:*:*:*:*:*',
+                'versionStartIncluding': '2.0.1',
+                'versionEndExcluding': end_excluding
+            }]}]}]
+        }
+    }
+
+
+def write_feed(path, items):
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump({'resultsPerPage': len(items), 'format': 'NVD_CVE', 'vulnerabilities': items}, f)
+    return path
+
+
+@pytest.fixture
+def store(tmp_path):
+    cve_store = CveStore(tmp_path / 'cve_store.sqlite')
+    yield cve_store
+    cve_store.close()
+
+
+class TestIterJsonArray:
+    """Test cases for the streaming JSON array reader"""
+
+    def test_top_level_array_in_small_chunks(self):
+        """Test items split across many chunk boundaries"""
+        document = json.dumps([{'id': i, 'text': 'é' * i, 'score': 12345.678} for i in range(20)]).encode()
+        chunks = [document[i:i + 7] for i in range(0, len(document), 7)]
+
+        items = list(iter_json_array(chunks))
+
+        assert [item['id'] for item in items] == list(range(20))
+        assert items[3]['text'] == 'ééé'
+        assert items[0]['score'] == 12345.678
+
+    def test_array_under_known_key(self):
+        """Test that other top-level members are skipped"""
+        document = '{"format": "NVD", "totals": {"a": [1, 2]}, "CVE_Items": [1, 2, 3], "tail": true}'
+
+        assert list(iter_json_array([document])) == [1, 2, 3]
+
+    def test_stops_reading_when_consumer_stops(self):
+        """Test that only the chunks needed for consumed items are read"""
+        consumed = []
+
+        def chunks():
+            for i in range(1000):
+                consumed.append(i)
+                yield ('[' if i == 0 else ',') + json.dumps({'id': i})
+
+        items = iter_json_array(chunks())
+        first = [next(items) for _ in range(3)]
+
+        assert [item['id'] for item in first] == [0, 1, 2]
+        assert len(consumed) < 10
+
+
+class TestNormalizeCveRecord:
+    """Test cases for normalize_cve_record function"""
+
+    def test_nvd2_item(self):
+        """Test NVD 2.0 feed item normalization"""
+        record = normalize_cve_record(nvd2_item('CVE-2021-44228'))
+
+        assert record['id'] == 'CVE-2021-44228'
+        assert record['summary'] == 'log4j issue'
+        assert record['cvss'] == 10.0
+        assert record['cpe_matches'][0]['vendor'] == 'apache'
+        assert record['cpe_matches'][0]['version_end_excluding'] == '2.15.0'
+
+    def test_nvd11_item(self):
+        """Test NVD 1.1 feed item normalization"""
+        item = {
+            'cve': {
+                'CVE_data_meta': {'ID': 'CVE-2019-0001'},
+                'description': {'description_data': [{'lang': 'en', 'value': 'Junos issue'}]}
+            },
+            'configurations': {'nodes': [{'operator': 'OR', 'children': [], 'cpe_match': [
+                {'vulnerable': True, 'cpe23Uri': 'cpe:2.3:o:juniper:junos:18.1:*:*:*:*:*:*:*'}
+            ]}]},
+            'impact': {'baseMetricV3': {'cvssV3': {'baseScore': 7.5}}},
+            'lastModifiedDate': '2019-10-09T23:49Z'
+        }
+
+        record = normalize_cve_record(item)
+
+        assert record['id'] == 'CVE-2019-0001'
+        assert record['cvss'] == 7.5
+        assert record['vulnerable_product'] == ['cpe:2.3:o:juniper:junos:18.1:*:*:*:*:*:*:*']
+        assert record['cpe_matches'][0]['version'] == '18.1'
+
+    def test_circl_record(self):
+        """Test CIRCL API record normalization"""
+        record = normalize_cve_record({
+            'id': 'CVE-2021-45046',
+            'summary': 'Log4j 2',
+            'vulnerable_product': ['cpe:2.3:a:apache:log4j:2.15.0:*:*:*:*:*:*:*']
+        })
+
+        assert record['cpe_matches'][0]['product'] == 'log4j'
+
+    def test_item_without_id(self):
+        """Test that items without a CVE ID are rejected"""
+        assert normalize_cve_record({'summary': 'nothing'}) is None
+        assert normalize_cve_record('not a dict') is None
+
+
+class TestCveStore:
+    """Test cases for CveStore class"""
+
+    def test_import_and_lookup(self, store, tmp_path):
+        """Test importing a gzip feed and looking records up"""
+        feed = write_feed(tmp_path / 'feed.json.gz', [
+            nvd2_item('CVE-2021-44228'),
+            nvd2_item('CVE-2021-45046'),
+            nvd2_item('CVE-2022-22965', product='tomcat'),
+            {'cve': {}}
+        ])
+
+        stats = store.import_feed(feed)
+
+        assert stats == {'inserted': 3, 'updated': 0, 'unchanged': 0, 'invalid': 1}
+        assert store.get('CVE-2021-44228')['summary'] == 'log4j issue'
+        assert store.get('CVE-2099-99999') is None
+        assert len(store.search('apache')) == 3
+        assert [r['id'] for r in store.search('Apache', product='log4j')] == ['CVE-2021-45046', 'CVE-2021-44228']
+        assert len(store.search('apache', max_results=1)) == 1
+        assert store.search('microsoft') == []
+
+    def test_delta_import(self, store, tmp_path):
+        """Test that re-imports only rewrite modified records"""
+        store.import_feed(write_feed(tmp_path / 'base.json.gz', [
+            nvd2_item('CVE-2021-44228'),
+            nvd2_item('CVE-2021-45046')
+        ]))
+
+        stats = store.import_feed(write_feed(tmp_path / 'delta.json.gz', [
+            nvd2_item('CVE-2021-44228'),
+            nvd2_item('CVE-2021-45046', product='log4j-core', modified='2024-06-01T00:00:00.000'),
+            nvd2_item('CVE-2021-45105')
+        ]))
+
+        assert stats == {'inserted': 1, 'updated': 1, 'unchanged': 1, 'invalid': 0}
+        assert store.count() == 3
+        # Product index follows the updated record
+        assert [r['id'] for r in store.search('apache', product='log4j-core')] == ['CVE-2021-45046']
+        assert 'CVE-2021-45046' not in [r['id'] for r in store.search('apache', product='log4j')]
+
+    def test_search_orders_by_year_and_sequence(self, store):
+        """Test that search sorts IDs numerically, newest first"""
+        store.import_records([nvd2_item(cve_id) for cve_id in
+                              ('CVE-2021-9999', 'CVE-2021-10000', 'CVE-2022-0001', 'CVE-2020-44228')])
+
+        assert [r['id'] for r in store.search('apache')] == [
+            'CVE-2022-0001', 'CVE-2021-10000', 'CVE-2021-9999', 'CVE-2020-44228'
+        ]
+
+
+class TestCveServiceOffline:
+    """Test cases for offline store integration in cve_service"""
+
+    @pytest.fixture(autouse=True)
+    def offline_store(self, store):
+        store.import_records([nvd2_item('CVE-2021-44228'), nvd2_item('CVE-2022-22965', product='tomcat')])
+        set_offline_store(store)
+        yield store
+        set_offline_store(None)
+
+    @patch('services.cve_service.requests.Session.get')
+    def test_get_cve_from_store(self, mock_get):
+        """Test that lookups never touch the network"""
+        assert get_cve_by_id('CVE-2021-44228')['id'] == 'CVE-2021-44228'
+        assert get_cve_by_id('CVE-2099-99999') is None
+        mock_get.assert_not_called()
+
+    @patch('services.cve_service.requests.Session.get')
+    def test_search_from_store(self, mock_get):
+        """Test vendor and product searches from the store"""
+        assert len(search_cves_by_vendor('apache')) == 2
+        assert [r['id'] for r in search_cves_by_vendor('apache', product='tomcat')] == ['CVE-2022-22965']
+        mock_get.assert_not_called()
+
+
+class TestOfflineStoreSetup:
+    """Test cases for opening the configured offline store"""
+
+    def test_open_failure_falls_back_to_api(self, tmp_path):
+        """Test that a store that cannot be opened is logged once and lookups use the API"""
+        with patch('services.cve_service.CVE_OFFLINE_DB', str(tmp_path / 'store.sqlite')), \
+                patch('services.cve_service.CveStore', side_effect=sqlite3.OperationalError('unable to open')) as opener, \
+                patch('services.cve_service._offline_store_opened', False):
+            try:
+                assert get_offline_store() is None
+                assert get_offline_store() is None
+            finally:
+                set_offline_store(None)
+
+        opener.assert_called_once()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
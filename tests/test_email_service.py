@@ -1,12 +1,95 @@
 """
 Unit tests for email_service module.
-Tests email sending functionality with mocked SMTP connections.
+Tests email sending functionality with mocked SMTP connections and a local stub server.
 """
 import pytest
 from unittest.mock import Mock, patch, MagicMock, mock_open
 from pathlib import Path
 import smtplib
-from services.email_service import send_email
+import email
+import email.policy
+import io
+import os
+import socketserver
+import threading
+from services.email_service import SmtpClient, build_message, send_email, send_emails, write_message
+
+
+class StubSmtpServer(socketserver.ThreadingTCPServer):
+    """Minimal local SMTP server (EHLO, AUTH, MAIL, RCPT, DATA, RSET, NOOP, QUIT)"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, messages_per_connection=0, refuse=None):
+        super().__init__(('127.0.0.1', 0), StubSmtpHandler)
+        self.messages_per_connection = messages_per_connection
+        # {address: reply line} for RCPT TO commands to refuse
+        self.refuse = refuse or {}
+        self.messages = []
+        self.recipients = []
+        self.connections = 0
+        self.logins = 0
+        self.port = self.server_address[1]
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StubSmtpHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        sent = 0
+        self.reply('220 stub ESMTP')
+        for raw in self.rfile:
+            command = raw.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250-stub')
+                self.reply('250 AUTH PLAIN LOGIN')
+            elif command.startswith('AUTH'):
+                server.logins += 1
+                self.reply('235 Authentication successful')
+            elif command.startswith('DATA'):
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                for data in self.rfile:
+                    if data == b'.\r\n':
+                        break
+                    lines.append(data[1:] if data.startswith(b'..') else data)
+                server.messages.append(b''.join(lines))
+                self.reply('250 OK')
+                sent += 1
+                if server.messages_per_connection and sent >= server.messages_per_connection:
+                    # Drop the connection without warning, like an idle timeout
+                    return
+            elif command.startswith('RCPT'):
+                address = raw.decode().strip().split(':', 1)[1].strip('<>')
+                if address in server.refuse:
+                    self.reply(server.refuse[address])
+                    continue
+                server.recipients.append(address)
+                self.reply('250 OK')
+            elif command.startswith('QUIT'):
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+@pytest.fixture
+def smtp_server():
+    server = StubSmtpServer()
+    yield server
+    server.stop()
+
+
+def stub_client(server, **kwargs):
+    return SmtpClient('127.0.0.1', server.port, 'user', 'secret', timeout=5, starttls=False, **kwargs)
 
 
 class TestSendEmail:
@@ -30,7 +113,7 @@ class TestSendEmail:
         mock_server.ehlo.assert_called()
         mock_server.starttls.assert_called_once()
         mock_server.login.assert_called_once()
-        mock_server.send_message.assert_called_once()
+        mock_server.sendmail.assert_called_once()
     
     @patch('services.email_service.smtplib.SMTP')
     def test_email_with_html_body(self, mock_smtp):
@@ -46,8 +129,8 @@ class TestSendEmail:
         )
         
         assert result is True
-        # Verify send_message was called
-        assert mock_server.send_message.called
+        # Verify sendmail was called
+        assert mock_server.sendmail.called
     
     @patch('services.email_service.smtplib.SMTP')
     def test_email_with_multiple_recipients(self, mock_smtp):
@@ -64,7 +147,7 @@ class TestSendEmail:
         )
         
         assert result is True
-        mock_server.send_message.assert_called_once()
+        mock_server.sendmail.assert_called_once()
     
     @patch('services.email_service.smtplib.SMTP')
     def test_email_with_cc_and_bcc(self, mock_smtp):
@@ -106,7 +189,7 @@ class TestSendEmail:
             )
         
         assert result is True
-        mock_server.send_message.assert_called_once()
+        mock_server.sendmail.assert_called_once()
     
     @patch('services.email_service.smtplib.SMTP')
     @patch('services.email_service.Path')
@@ -157,7 +240,7 @@ class TestSendEmail:
     def test_smtp_exception_handling(self, mock_smtp):
         """Test handling of SMTP exceptions"""
         mock_server = MagicMock()
-        mock_server.send_message.side_effect = smtplib.SMTPException("SMTP Error")
+        mock_server.sendmail.side_effect = smtplib.SMTPException("SMTP Error")
         mock_smtp.return_value.__enter__.return_value = mock_server
         
         result = send_email(
@@ -173,7 +256,7 @@ class TestSendEmail:
     def test_smtp_exception_raised_when_configured(self, mock_smtp):
         """Test that SMTP exception is raised when raise_on_error=True"""
         mock_server = MagicMock()
-        mock_server.send_message.side_effect = smtplib.SMTPException("SMTP Error")
+        mock_server.sendmail.side_effect = smtplib.SMTPException("SMTP Error")
         mock_smtp.return_value.__enter__.return_value = mock_server
         
         with pytest.raises(smtplib.SMTPException):
@@ -256,5 +339,200 @@ class TestSendEmail:
             assert call_args[0][1] == 587
 
 
+class TestSmtpClient:
+    """Test cases for SmtpClient and send_emails against a local stub server"""
+
+    def test_batch_uses_one_session(self, smtp_server):
+        """Test that a batch is sent over one connection with a single login"""
+        messages = [{'to_address': f'user{i}@example.com', 'subject': f'Alert {i}', 'body': 'Body'}
+                    for i in range(5)]
+
+        results = send_emails(messages, client=stub_client(smtp_server))
+
+        assert results == [True] * 5
+        assert len(smtp_server.messages) == 5
+        assert smtp_server.connections == 1
+        assert smtp_server.logins == 1
+        assert b'Subject: Alert 3' in smtp_server.messages[3]
+
+    def test_reconnects_when_server_disconnects(self):
+        """Test that a dropped connection is reopened and the message still delivered"""
+        server = StubSmtpServer(messages_per_connection=2)
+        try:
+            with stub_client(server) as client:
+                results = send_emails(
+                    [build_message('ops@example.com', f'Alert {i}', 'Body') for i in range(5)],
+                    client=client
+                )
+                assert client.connections == 3
+        finally:
+            server.stop()
+
+        assert results == [True] * 5
+        assert len(server.messages) == 5
+
+    def test_send_serializes_once_without_bcc(self, smtp_server):
+        """Test that send returns the size of the bytes sent and keeps Bcc out of the headers"""
+        msg = build_message('ops@example.com', 'Alert', 'Body', bcc='hidden@example.com')
+
+        with stub_client(smtp_server) as client:
+            size = client.send(msg)
+
+        assert size == len(smtp_server.messages[0])
+        assert b'hidden@example.com' not in smtp_server.messages[0]
+        assert smtp_server.recipients == ['ops@example.com', 'hidden@example.com']
+        assert msg['Bcc'] == 'hidden@example.com'
+
+    def test_send_stream_returns_refused_recipients(self):
+        """Test that a partly refused message is delivered and the refusals are returned"""
+        server = StubSmtpServer(refuse={'busy@example.com': '450 Mailbox busy'})
+        try:
+            stream = io.BytesIO(build_message('ops@example.com', 'Alert', 'Body').as_bytes())
+            with stub_client(server) as client:
+                refused = client.send_stream(stream, 'monitor@example.com', ['ops@example.com', 'busy@example.com'])
+        finally:
+            server.stop()
+
+        assert refused == {'busy@example.com': (450, b'Mailbox busy')}
+        assert server.recipients == ['ops@example.com']
+        assert len(server.messages) == 1
+
+    def test_refused_recipients_logged(self, caplog):
+        """Test that recipients refused while others accept the message are reported"""
+        server = StubSmtpServer(refuse={'gone@example.com': '550 No such user'})
+        try:
+            with caplog.at_level('WARNING', logger='services.email_service'):
+                results = send_emails([{'to_address': ['ops@example.com', 'gone@example.com'],
+                                        'subject': 'Alert', 'body': 'Body'}], client=stub_client(server))
+        finally:
+            server.stop()
+
+        assert results == [True]
+        assert server.recipients == ['ops@example.com']
+        assert 'gone@example.com (550 No such user)' in caplog.text
+
+    def test_session_renewed_after_max_messages(self, smtp_server):
+        """Test that the session is replaced after max_messages messages"""
+        with stub_client(smtp_server, max_messages=2) as client:
+            for i in range(5):
+                client.send(build_message('ops@example.com', f'Alert {i}', 'Body'))
+
+        assert len(smtp_server.messages) == 5
+        assert smtp_server.connections == 3
+
+    @patch('services.email_service.smtplib.SMTP')
+    def test_failed_message_does_not_stop_batch(self, mock_smtp):
+        """Test that one rejected message is reported False and the rest are sent"""
+        mock_server = MagicMock()
+        mock_server.sendmail.side_effect = [None, smtplib.SMTPRecipientsRefused({}), None]
+        mock_smtp.return_value.__enter__.return_value = mock_server
+
+        results = send_emails([{'to_address': 'a@example.com', 'subject': 'S', 'body': 'B'}] * 3)
+
+        assert results == [True, False, True]
+        mock_server.login.assert_called_once()
+
+    @patch('services.email_service.smtplib.SMTP')
+    def test_batch_raises_when_configured(self, mock_smtp):
+        """Test that raise_on_error stops the batch at the first error"""
+        mock_server = MagicMock()
+        mock_server.sendmail.side_effect = smtplib.SMTPException("SMTP Error")
+        mock_smtp.return_value.__enter__.return_value = mock_server
+
+        with pytest.raises(smtplib.SMTPException):
+            send_emails([{'to_address': 'a@example.com', 'subject': 'S', 'body': 'B'}] * 2,
+                        raise_on_error=True)
+
+        mock_server.sendmail.assert_called_once()
+
+
+def parse(data):
+    return email.message_from_bytes(data, policy=email.policy.default)
+
+
+def attachment_payloads(msg):
+    return {part.get_filename(): part.get_content() for part in msg.iter_attachments()}
+
+
+class TestAttachmentHandling:
+    """Test cases for streamed messages and the attachment size budget"""
+
+    def test_write_message_streams_attachments(self, tmp_path):
+        """Test that streamed messages carry the exact attachment bytes and hide Bcc"""
+        data = os.urandom(300 * 1024)
+        (tmp_path / 'screen.png').write_bytes(data)
+        out = io.BytesIO()
+
+        envelope = write_message(out, 'to@example.com', 'Report', '.leading dot', html_body='<p>Hi</p>',
+                                 attachments=[tmp_path / 'screen.png'], bcc='hidden@example.com')
+
+        raw = out.getvalue()
+        msg = parse(raw)
+        assert envelope['size'] == len(raw)
+        assert envelope['recipients'] == ['to@example.com', 'hidden@example.com']
+        assert b'hidden@example.com' not in raw
+        assert all(len(line) <= 78 for line in raw.split(b'\r\n'))
+        assert attachment_payloads(msg) == {'screen.png': data}
+        assert msg.get_body(('plain',)).get_content().strip() == '.leading dot'
+
+    def test_large_message_sent_as_stream(self, smtp_server, tmp_path):
+        """Test that attachments above the stream threshold are sent from a temporary file"""
+        data = os.urandom(200 * 1024)
+        (tmp_path / 'big.bin').write_bytes(data)
+        message = {'to_address': 'to@example.com', 'subject': 'Big', 'body': '.dot\nbody',
+                   'attachments': [tmp_path / 'big.bin']}
+
+        with patch('services.email_service.EMAIL_STREAM_THRESHOLD', 1024), \
+                patch('services.email_service.build_message') as mock_build:
+            results = send_emails([message], client=stub_client(smtp_server))
+
+        assert results == [True]
+        mock_build.assert_not_called()
+        msg = parse(smtp_server.messages[0])
+        assert attachment_payloads(msg) == {'big.bin': data}
+        assert msg.get_body(('plain',)).get_content().splitlines()[:2] == ['.dot', 'body']
+
+    def test_over_budget_attachments_zipped(self, tmp_path):
+        """Test that compressible attachments over the budget are sent as one zip"""
+        paths = []
+        for name in ('a.log', 'b.log'):
+            paths.append(tmp_path / name)
+            paths[-1].write_text('same line\n' * 2000)
+
+        with patch('services.email_service.EMAIL_ATTACHMENT_BUDGET', 20000), \
+                patch('services.email_service.EMAIL_OVERSIZE_STRATEGIES', 'zip'):
+            msg = build_message('to@example.com', 'Logs', 'Body', attachments=paths)
+
+        assert list(attachment_payloads(msg)) == ['attachments.zip']
+
+    def test_over_budget_images_downscaled(self, tmp_path):
+        """Test that large images are re-encoded as smaller JPEGs"""
+        Image = pytest.importorskip('PIL.Image')
+        Image.effect_noise((800, 600), 64).convert('RGB').save(tmp_path / 'screen.png')
+
+        with patch('services.email_service.EMAIL_ATTACHMENT_BUDGET', 100 * 1024), \
+                patch('services.email_service.EMAIL_DOWNSCALE_MAX_DIMENSION', 200), \
+                patch('services.email_service.EMAIL_OVERSIZE_STRATEGIES', 'downscale'):
+            msg = build_message('to@example.com', 'Screens', 'Body', attachments=[tmp_path / 'screen.png'])
+
+        payloads = attachment_payloads(msg)
+        assert list(payloads) == ['screen.jpg']
+        assert len(payloads['screen.jpg']) < 100 * 1024
+
+    def test_attachments_still_over_budget_referenced(self, tmp_path):
+        """Test that files that do not fit are listed in the body, smallest files attached first"""
+        (tmp_path / 'small.bin').write_bytes(os.urandom(1000))
+        (tmp_path / 'large.bin').write_bytes(os.urandom(5000))
+
+        with patch('services.email_service.EMAIL_ATTACHMENT_BUDGET', 3000), \
+                patch('services.email_service.EMAIL_OVERSIZE_STRATEGIES', ''):
+            msg = build_message('to@example.com', 'Files', 'Body', html_body='<p>Body</p>',
+                                attachments=[tmp_path / 'large.bin', tmp_path / 'small.bin'])
+
+        assert list(attachment_payloads(msg)) == ['small.bin']
+        assert str(tmp_path / 'large.bin') in msg.get_body(('plain',)).get_content()
+        assert str(tmp_path / 'large.bin') in msg.get_body(('html',)).get_content()
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
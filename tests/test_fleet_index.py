@@ -0,0 +1,128 @@
+"""
+Unit tests for fleet_index module.
+Tests incremental ingestion of host reports and index queries.
+"""
+import os
+import pytest
+from unittest.mock import patch
+from services.fleet_index import FleetIndex, find_host_reports
+from utils.report_formats import write_report
+
+
+def write_host_report(data_dir, hostname, software, fmt='json'):
+    ext = {'json': '.json', 'jsonl.gz': '.jsonl.gz', 'columnar': '.columnar.json.gz'}[fmt]
+    reports_dir = data_dir / hostname / 'reports'
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    return write_report(software, reports_dir / f'software{ext}', fmt)
+
+
+def app(name, version, publisher='Corp'):
+    return {'DisplayName': name, 'DisplayVersion': version, 'Publisher': publisher}
+
+
+@pytest.fixture
+def index(tmp_path):
+    fleet_index = FleetIndex(tmp_path / 'fleet' / 'fleet_index.sqlite')
+    yield fleet_index
+    fleet_index.close()
+
+
+class TestFindHostReports:
+    """Test cases for locating host reports"""
+
+    def test_latest_report_per_host(self, tmp_path):
+        """Test that each host's newest latest-report is found, whatever its format"""
+        old = write_host_report(tmp_path, 'host-a', [app('A', '1')])
+        new = write_host_report(tmp_path, 'host-a', [app('A', '2')], fmt='jsonl.gz')
+        os.utime(old, ns=(1, 1))
+        write_host_report(tmp_path, 'host-b', [app('B', '1')], fmt='columnar')
+        (tmp_path / 'no-reports').mkdir()
+
+        found = sorted(find_host_reports(tmp_path))
+
+        assert [(host, str(path), fmt) for host, path, fmt in found] == [
+            ('host-a', new, 'jsonl.gz'),
+            ('host-b', str(tmp_path / 'host-b' / 'reports' / 'software.columnar.json.gz'), 'columnar'),
+        ]
+
+    def test_missing_data_dir(self, tmp_path):
+        """Test that a missing data directory yields no hosts"""
+        assert list(find_host_reports(tmp_path / 'missing')) == []
+
+
+class TestFleetIndex:
+    """Test cases for FleetIndex"""
+
+    def test_hosts_by_product_and_version(self, tmp_path, index):
+        """Test inverted lookups across hosts and report formats"""
+        write_host_report(tmp_path, 'host-a', [app('7-Zip', '23.01', 'Igor Pavlov'), app('Git', '2.44')])
+        write_host_report(tmp_path, 'host-b', [app('7-Zip', '22.00', 'Igor Pavlov')], fmt='columnar')
+        write_host_report(tmp_path, 'host-c', [app('7-zip', '23.01', 'Igor Pavlov')], fmt='jsonl.gz')
+
+        stats = index.ingest(tmp_path)
+
+        assert stats == {'indexed': 3, 'unchanged': 0, 'failed': 0, 'removed': 0}
+        assert [h['hostname'] for h in index.hosts_with('7-Zip', version='23.01')] == ['host-a', 'host-c']
+        assert [h['hostname'] for h in index.hosts_with('7-ZIP')] == ['host-a', 'host-b', 'host-c']
+        assert index.versions('7-Zip') == [{'version': '22.00', 'hosts': 1}, {'version': '23.01', 'hosts': 2}]
+        assert index.hosts_with('Missing') == []
+
+    def test_unchanged_reports_not_reread(self, tmp_path, index):
+        """Test that reports with the same mtime and size are skipped without being opened"""
+        write_host_report(tmp_path, 'host-a', [app('A', '1')])
+        index.ingest(tmp_path)
+
+        with patch('services.fleet_index.deserialize_report') as mock_deserialize:
+            stats = index.ingest(tmp_path)
+
+        assert stats['unchanged'] == 1
+        mock_deserialize.assert_not_called()
+
+    def test_rewritten_same_content_not_reindexed(self, tmp_path, index):
+        """Test that a report rewritten with identical content is recognised by its hash"""
+        path = write_host_report(tmp_path, 'host-a', [app('A', '1')])
+        index.ingest(tmp_path)
+        os.utime(path, ns=(10 ** 18, 10 ** 18))
+
+        with patch('services.fleet_index.deserialize_report') as mock_deserialize:
+            assert index.ingest(tmp_path)['unchanged'] == 1
+            assert index.ingest(tmp_path)['unchanged'] == 1
+
+        mock_deserialize.assert_not_called()
+
+    def test_changed_report_updates_index(self, tmp_path, index):
+        """Test that upgrades and uninstalls are reflected, and unused products dropped"""
+        write_host_report(tmp_path, 'host-a', [app('A', '1'), app('B', '1')])
+        index.ingest(tmp_path)
+
+        write_host_report(tmp_path, 'host-a', [app('A', '2'), app('C', '1')])
+        stats = index.ingest(tmp_path)
+
+        assert stats['indexed'] == 1
+        assert index.host_software('host-a') == [app('A', '2'), app('C', '1')]
+        assert index.hosts_with('B') == []
+        assert index.counts() == {'hosts': 1, 'products': 2}
+
+    def test_removed_hosts_pruned(self, tmp_path, index):
+        """Test that hosts whose report disappeared are dropped unless kept explicitly"""
+        write_host_report(tmp_path, 'host-a', [app('A', '1')])
+        path = write_host_report(tmp_path, 'host-b', [app('A', '1')])
+        index.ingest(tmp_path)
+        os.remove(path)
+
+        assert index.ingest(tmp_path, prune=False)['removed'] == 0
+        assert index.counts()['hosts'] == 2
+        assert index.ingest(tmp_path)['removed'] == 1
+        assert [h['hostname'] for h in index.hosts_with('A')] == ['host-a']
+
+    def test_unreadable_report_keeps_previous_data(self, tmp_path, index):
+        """Test that a corrupt report is counted as failed and the host's indexed software kept"""
+        path = write_host_report(tmp_path, 'host-a', [app('A', '1')])
+        index.ingest(tmp_path)
+        with open(path, 'w') as f:
+            f.write('{not json')
+
+        stats = index.ingest(tmp_path, batch_size=1)
+
+        assert stats['failed'] == 1
+        assert index.host_software('host-a') == [app('A', '1')]
@@ -8,9 +8,11 @@ from unittest.mock import patch, MagicMock
 from pathlib import Path
 import tempfile
 import os
+from utils.report_formats import deserialize_report, from_columnar, read_report, serialize_report
 from services.installed_software_service import (
     list_installed_software,
     save_software_list_to_file,
+    record_software_inventory,
     check_blacklisted_software
 )
 
@@ -27,6 +29,13 @@ class TestListInstalledSoftware:
 
         assert result == []
 
+    def test_list_installed_software_backend_error(self):
+        """Test that a failing backend yields an empty list"""
+        backend = MagicMock()
+        backend.list_software.side_effect = OSError("database locked")
+
+        assert list_installed_software(backend=backend) == []
+
     def test_list_installed_software_returns_list(self):
         """Test that function returns a list"""
         result = list_installed_software()
@@ -78,6 +87,78 @@ class TestSaveSoftwareListToFile:
         dated_files = list(reports_dir.glob('software_*.json'))
         assert len(dated_files) >= 1  # Should have at least one dated file
 
+    @pytest.mark.parametrize('fmt, name', [
+        ('jsonl.gz', 'software.jsonl.gz'),
+        ('columnar', 'software.columnar.json.gz')
+    ])
+    def test_save_software_list_compact_formats(self, tmp_path, monkeypatch, fmt, name):
+        """Test that compact formats round-trip through read_report"""
+        monkeypatch.setattr('services.installed_software_service.DATA_DIR', str(tmp_path))
+
+        software_list = [
+            {'DisplayName': 'Test Software', 'DisplayVersion': '1.0', 'Publisher': 'Test Corp'},
+            {'DisplayName': 'Another Software', 'Publisher': 'Test Corp'},
+            {'DisplayName': 'Ünïcode Tool', 'DisplayVersion': '2.0', 'Publisher': ''}
+        ]
+
+        result = save_software_list_to_file(software_list, fmt=fmt)
+
+        assert Path(result).name == name
+        assert read_report(result) == software_list
+        assert len(list(Path(result).parent.glob('software_*'))) == 1
+
+    @pytest.mark.parametrize('fmt', ['json', 'jsonl.gz', 'columnar'])
+    def test_explicit_nones_round_trip(self, fmt):
+        """Test that None values are kept and told apart from missing fields"""
+        software_list = [
+            {'DisplayName': 'Test Software', 'DisplayVersion': None, 'Publisher': None},
+            {'DisplayName': 'Another Software', 'Publisher': 'Test Corp'},
+            {'DisplayName': None, 'InstallDate': '20240101'},
+            {}
+        ]
+
+        assert deserialize_report(serialize_report(software_list, fmt), fmt) == software_list
+
+    def test_columnar_version_1_drops_nulls(self):
+        """Test that columnar files without absent-field rows still load"""
+        data = {'format': 'columnar', 'version': 1, 'rows': 2,
+                'columns': {'DisplayName': ['A', 'B'], 'Publisher': [0, 1]},
+                'dictionaries': {'Publisher': ['Test Corp', None]}}
+
+        assert from_columnar(data) == [{'DisplayName': 'A', 'Publisher': 'Test Corp'}, {'DisplayName': 'B'}]
+
+    def test_latest_is_hard_link_to_dated(self, tmp_path, monkeypatch):
+        """Test that the list is written once and published as a link"""
+        monkeypatch.setattr('services.installed_software_service.DATA_DIR', str(tmp_path))
+
+        result = save_software_list_to_file([{'DisplayName': 'Test Software'}])
+
+        latest = Path(result)
+        dated = next(latest.parent.glob('software_*.json'))
+        assert os.path.samefile(latest, dated)
+
+    def test_latest_copied_without_hard_links(self, tmp_path, monkeypatch):
+        """Test the fallback for filesystems without hard link support"""
+        monkeypatch.setattr('services.installed_software_service.DATA_DIR', str(tmp_path))
+
+        with patch('utils.file_utils.os.link', side_effect=OSError("not supported")):
+            result = save_software_list_to_file([{'DisplayName': 'Test Software'}])
+
+        with open(result, 'r', encoding='utf-8') as f:
+            assert json.load(f) == [{'DisplayName': 'Test Software'}]
+
+    def test_failed_write_keeps_previous_file(self, tmp_path, monkeypatch):
+        """Test that an interrupted write leaves the old report intact and no temp files"""
+        monkeypatch.setattr('services.installed_software_service.DATA_DIR', str(tmp_path))
+        result = save_software_list_to_file([{'DisplayName': 'Old'}], 'custom_software.json')
+
+        with patch('utils.file_utils.os.replace', side_effect=OSError("Disk full")):
+            assert save_software_list_to_file([{'DisplayName': 'New'}], 'custom_software.json') is None
+
+        with open(result, 'r', encoding='utf-8') as f:
+            assert json.load(f) == [{'DisplayName': 'Old'}]
+        assert [p.name for p in Path(result).parent.iterdir()] == ['custom_software.json']
+
     def test_save_software_list_empty(self, tmp_path, monkeypatch):
         """Test saving empty software list"""
         monkeypatch.setattr('services.installed_software_service.DATA_DIR', str(tmp_path))
@@ -118,6 +199,26 @@ class TestSaveSoftwareListToFile:
         assert file_path.parent.parent.name.startswith(tmp_path.name) or file_path.parent.parent.parent == tmp_path  # hostname directory
 
 
+class TestRecordSoftwareInventory:
+    """Test cases for record_software_inventory function"""
+
+    def test_record_only_writes_changes(self, tmp_path, monkeypatch):
+        """Test that software.json is kept current without dated full copies"""
+        monkeypatch.setattr('services.installed_software_service.DATA_DIR', str(tmp_path))
+        software_list = [{'DisplayName': 'Test Software', 'DisplayVersion': '1.0', 'Publisher': 'Test'}]
+
+        first = record_software_inventory(software_list)
+        latest = Path(first['saved_file'])
+        mtime = latest.stat().st_mtime_ns
+        second = record_software_inventory(software_list)
+
+        assert first['added'] == 1
+        assert second['saved_file'] == str(latest)
+        assert latest.stat().st_mtime_ns == mtime
+        assert list(latest.parent.glob('software_*.json')) == []
+        assert list((latest.parent / 'inventory').iterdir())
+
+
 class TestCheckBlacklistedSoftware:
     """Test cases for check_blacklisted_software function"""
 
@@ -164,6 +265,24 @@ class TestCheckBlacklistedSoftware:
         result = check_blacklisted_software([], [{'product': 'Product'}])
         assert result == []
 
+    def test_check_blacklisted_software_version_ranges(self):
+        """Test that installed versions outside the affected range are not flagged"""
+        software_list = [
+            {'DisplayName': 'Apache Tomcat 9.0', 'DisplayVersion': '9.0.30'},
+            {'DisplayName': 'Apache Tomcat 9.0', 'DisplayVersion': '9.0.80'}
+        ]
+        cve_list = [{
+            'product': 'Apache Tomcat',
+            'id': 'CVE-2020-1938',
+            'vulnerable_product': ['cpe:2.3:a:apache:tomcat:9.0.30:*:*:*:*:*:*:*']
+        }]
+
+        result = check_blacklisted_software(software_list, cve_list)
+        assert [m['software']['DisplayVersion'] for m in result] == ['9.0.30']
+
+        result = check_blacklisted_software(software_list, cve_list, match_versions=False)
+        assert len(result) == 2
+
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
\ No newline at end of file
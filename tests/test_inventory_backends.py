@@ -0,0 +1,305 @@
+"""
+Unit tests for inventory_backends module.
+Tests the registry, dpkg and rpm inventory backends.
+"""
+import pytest
+import sqlite3
+import struct
+import os
+from unittest.mock import MagicMock, patch
+from services.inventory_cache import InventoryCache
+from services.inventory_backends import (
+    SOFTWARE_FIELDS,
+    InventoryBackend,
+    REGISTRY_UNINSTALL_KEYS,
+    WindowsRegistryBackend,
+    DpkgBackend,
+    RpmBackend,
+    parse_rpm_header,
+    detect_backend
+)
+
+
+DPKG_STATUS = """Package: adduser
+Status: install ok installed
+Priority: important
+Maintainer: Debian Adduser Developers <adduser@packages.debian.org>
+Architecture: all
+Version: 3.134
+Conffiles:
+ /etc/adduser.conf cc3493ecd2d09837ffdcc3e25fdfff18
+Description: add and remove users and groups
+ This package includes the 'adduser' and 'deluser' commands.
+ Version: not a field
+
+Package: libssl3
+Status: install ok installed
+Maintainer: Debian OpenSSL Team <pkg-openssl-devel@alioth-lists.debian.net>
+Architecture: amd64
+Multi-Arch: same
+Version: 3.0.11-1~deb12u2
+
+Package: oldtool
+Status: deinstall ok config-files
+Architecture: amd64
+Version: 1.0
+"""
+
+
+def rpm_header(tags):
+    """Build an rpmdb.sqlite header blob from {tag: (type, value)}"""
+    index = b''
+    data = b''
+    for tag, (tag_type, value) in tags.items():
+        if tag_type == 4:
+            while len(data) % 4:
+                data += b'\0'
+            payload = struct.pack('>I', value)
+        else:
+            payload = value.encode() + b'\0'
+        index += struct.pack('>iIiI', tag, tag_type, len(data), 1)
+        data += payload
+    return struct.pack('>II', len(tags), len(data)) + index + data
+
+
+def rpm_package(name, version, release, vendor, install_time=1700000000, epoch=None):
+    tags = {1000: (6, name), 1001: (6, version), 1002: (6, release), 1008: (4, install_time), 1011: (6, vendor)}
+    if epoch is not None:
+        tags[1003] = (4, epoch)
+    return rpm_header(tags)
+
+
+class TestWindowsRegistryBackend:
+    """Test cases for WindowsRegistryBackend"""
+    
+    def test_reads_uninstall_keys(self):
+        """Test that registry values become software entries"""
+        registry = MagicMock()
+        registry.QueryInfoKey.return_value = (1, 0, 0)
+        registry.EnumKey.return_value = 'App'
+        values = {'DisplayName': 'Test App', 'DisplayVersion': '1.0', 'Publisher': 'Test Corp'}
+        
+        def query_value(subkey, field):
+            if field not in values:
+                raise FileNotFoundError()
+            return values[field], 1
+        
+        registry.QueryValueEx.side_effect = query_value
+        
+        result = WindowsRegistryBackend(registry).list_software()
+        
+        assert result[0]['DisplayName'] == 'Test App'
+        assert set(result[0]) == set(SOFTWARE_FIELDS)
+        assert result[0]['InstallLocation'] == ''
+
+    
+    def test_unchanged_subkeys_served_from_cache(self):
+        """Test that values are only queried again for subkeys with a new last-write time"""
+        registry = MagicMock()
+        last_write = {'App1': 100, 'App2': 200}
+        registry.QueryInfoKey.side_effect = lambda key: (2, 0, last_write.get(key, 0))
+        registry.EnumKey.side_effect = lambda key, i: ['App1', 'App2'][i]
+        registry.OpenKey.side_effect = lambda key, name: MagicMock(__enter__=lambda self: name)
+        registry.QueryValueEx.side_effect = lambda subkey, field: (f'{subkey} {field}', 1)
+        backend = WindowsRegistryBackend(registry, cache=InventoryCache())
+        
+        first = backend.list_software()
+        calls = registry.QueryValueEx.call_count
+        assert backend.list_software() == first
+        assert registry.QueryValueEx.call_count == calls
+        
+        last_write['App2'] = 201
+        backend.list_software()
+        # App2 is read again under each Uninstall key
+        assert registry.QueryValueEx.call_count == calls + 6 * len(REGISTRY_UNINSTALL_KEYS)
+    
+    def _hive_registry(self, hives):
+        """Fake winreg exposing {(root, path): {subkey: values}}; missing keys raise FileNotFoundError"""
+        registry = MagicMock()
+        registry.HKEY_LOCAL_MACHINE = 'HKLM'
+        registry.HKEY_CURRENT_USER = 'HKCU'
+        
+        def open_key(key, name):
+            if isinstance(key, str):
+                if (key, name) not in hives:
+                    raise FileNotFoundError()
+                return MagicMock(__enter__=lambda self: hives[(key, name)])
+            return MagicMock(__enter__=lambda self: key[name])
+        
+        def query_value(subkey, field):
+            if field not in subkey:
+                raise FileNotFoundError()
+            return subkey[field], 1
+        
+        registry.OpenKey.side_effect = open_key
+        registry.QueryInfoKey.side_effect = lambda key: (len(key), 0, 0)
+        registry.EnumKey.side_effect = lambda key, i: list(key)[i]
+        registry.QueryValueEx.side_effect = query_value
+        return registry
+    
+    def test_scans_each_key_under_its_root(self):
+        """Test that HKLM, WOW6432Node and HKCU are all scanned, per-user software included"""
+        hklm, wow, hkcu = (path for _, _, path in REGISTRY_UNINSTALL_KEYS)
+        registry = self._hive_registry({
+            ('HKLM', hklm): {'A': {'DisplayName': 'Machine App'}},
+            ('HKLM', wow): {'B': {'DisplayName': '32-bit App'}},
+            ('HKCU', hkcu): {'C': {'DisplayName': 'User App'}},
+        })
+        backend = WindowsRegistryBackend(registry)
+        
+        result = backend.list_software()
+        
+        assert [s['DisplayName'] for s in result] == ['Machine App', '32-bit App', 'User App']
+        assert set(backend.hive_stats) == {hive for hive, _, _ in REGISTRY_UNINSTALL_KEYS}
+        assert all(stats['entries'] == 1 for stats in backend.hive_stats.values())
+    
+    def test_deduplicates_across_hives(self):
+        """Test that software registered under several keys is reported once"""
+        hklm, wow, hkcu = (path for _, _, path in REGISTRY_UNINSTALL_KEYS)
+        app = {'DisplayName': 'Shared', 'DisplayVersion': '1.0', 'Publisher': 'Corp'}
+        registry = self._hive_registry({
+            ('HKLM', hklm): {'A': app},
+            ('HKCU', hkcu): {'A': app, 'B': dict(app, DisplayVersion='2.0')},
+        })
+        
+        result = WindowsRegistryBackend(registry, max_workers=1).list_software()
+        
+        assert [s['DisplayVersion'] for s in result] == ['1.0', '2.0']
+    
+    def test_unreadable_subkey_skipped(self):
+        """Test that a subkey that cannot be opened does not abort its hive"""
+        hklm = REGISTRY_UNINSTALL_KEYS[0][2]
+        registry = self._hive_registry({('HKLM', hklm): {'A': {'DisplayName': 'Readable'}, 'B': {}}})
+        open_key = registry.OpenKey.side_effect
+        
+        def deny_b(key, name):
+            if name == 'B':
+                raise PermissionError()
+            return open_key(key, name)
+        
+        registry.OpenKey.side_effect = deny_b
+        
+        result = WindowsRegistryBackend(registry).list_software()
+        
+        assert [s['DisplayName'] for s in result] == ['Readable']
+
+
+class TestDpkgBackend:
+    """Test cases for DpkgBackend"""
+    
+    def test_parses_installed_packages(self, tmp_path):
+        """Test that only installed packages are listed, in the common record shape"""
+        status = tmp_path / 'status'
+        status.write_text(DPKG_STATUS, encoding='utf-8')
+        info_dir = tmp_path / 'info'
+        info_dir.mkdir()
+        (info_dir / 'libssl3:amd64.list').write_text('')
+        
+        result = DpkgBackend(status, info_dir).list_software()
+        
+        assert [entry['DisplayName'] for entry in result] == ['adduser', 'libssl3']
+        assert result[0]['DisplayVersion'] == '3.134'
+        assert result[0]['Publisher'] == 'Debian Adduser Developers'
+        assert result[0]['InstallDate'] == ''
+        assert len(result[1]['InstallDate']) == 8
+        assert all(set(entry) == set(SOFTWARE_FIELDS) for entry in result)
+    
+    def test_cached_until_status_changes(self, tmp_path):
+        """Test that the status file is only parsed again after dpkg rewrites it"""
+        status = tmp_path / 'status'
+        status.write_text(DPKG_STATUS, encoding='utf-8')
+        backend = DpkgBackend(status, tmp_path, cache=InventoryCache())
+        backend.list_software()
+        
+        with patch.object(DpkgBackend, 'iter_packages') as mock_iter:
+            assert len(backend.list_software()) == 2
+            mock_iter.assert_not_called()
+        
+        status.write_text('Package: a\nStatus: install ok installed\nVersion: 1\n', encoding='utf-8')
+        os.utime(status, ns=(0, 10**9))
+        assert [entry['DisplayName'] for entry in backend.list_software()] == ['a']
+    
+    def test_missing_trailing_newline(self, tmp_path):
+        """Test that the last stanza is read without a blank line after it"""
+        status = tmp_path / 'status'
+        status.write_text('Package: a\nStatus: install ok installed\nVersion: 1', encoding='utf-8')
+        
+        assert DpkgBackend(status, tmp_path).list_software()[0]['DisplayVersion'] == '1'
+
+
+class TestRpmBackend:
+    """Test cases for RpmBackend"""
+    
+    def test_parse_rpm_header(self):
+        """Test reading string and integer tags from a header blob"""
+        tags = parse_rpm_header(rpm_package('bash', '5.2.15', '3.el9', 'Red Hat, Inc.', epoch=1))
+        
+        assert tags[1000] == 'bash'
+        assert tags[1003] == 1
+        assert tags[1008] == 1700000000
+    
+    def test_reads_sqlite_rpmdb(self, tmp_path):
+        """Test listing packages from rpmdb.sqlite without the rpm command"""
+        db_path = tmp_path / 'rpmdb.sqlite'
+        connection = sqlite3.connect(db_path)
+        connection.execute('CREATE TABLE Packages (hnum INTEGER PRIMARY KEY AUTOINCREMENT, blob BLOB NOT NULL)')
+        for blob in (rpm_package('bash', '5.2.15', '3.el9', 'Red Hat, Inc.'),
+                     rpm_package('openssl', '3.0.7', '24.el9', 'Red Hat, Inc.', epoch=1),
+                     rpm_package('gpg-pubkey', 'fd431d51', '4ae0493b', '')):
+            connection.execute('INSERT INTO Packages (blob) VALUES (?)', (blob,))
+        connection.commit()
+        connection.close()
+        
+        result = RpmBackend(db_paths=[db_path], rpm_command='no-such-rpm').list_software()
+        
+        assert [(entry['DisplayName'], entry['DisplayVersion']) for entry in result] == [
+            ('bash', '5.2.15-3.el9'),
+            ('openssl', '1:3.0.7-24.el9')
+        ]
+        assert result[0]['Publisher'] == 'Red Hat, Inc.'
+        assert result[0]['UninstallString'] == 'rpm -e bash'
+    
+    def test_falls_back_to_rpm_command(self, tmp_path):
+        """Test streaming rpm -qa output when there is no SQLite database"""
+        process = MagicMock()
+        process.__enter__.return_value = process
+        process.stdout = iter(['zlib\t1.2.11\t40.el9\t(none)\t1700000000\tRed Hat, Inc.\n'])
+        process.returncode = 0
+        
+        with patch('services.inventory_backends.subprocess.Popen', return_value=process):
+            result = RpmBackend(db_paths=[tmp_path / 'missing.sqlite']).list_software()
+        
+        assert result[0]['DisplayName'] == 'zlib'
+        assert result[0]['DisplayVersion'] == '1.2.11-40.el9'
+
+
+class TestDetectBackend:
+    """Test cases for detect_backend function"""
+    
+    def test_registry_preferred(self):
+        """Test that the registry backend is used whenever winreg is available"""
+        assert isinstance(detect_backend(MagicMock()), WindowsRegistryBackend)
+    
+    def test_nothing_available(self):
+        """Test that hosts without any package database get no backend"""
+        with patch.object(DpkgBackend, 'is_available', return_value=False), \
+                patch.object(RpmBackend, 'is_available', return_value=False):
+            assert detect_backend(None) is None
+
+
+
+class TestInventoryBackend:
+    """Test cases for the InventoryBackend base class"""
+
+    def test_incomplete_backend_rejected(self):
+        """Test that a backend missing list_software fails when it is constructed"""
+        class Incomplete(InventoryBackend):
+            def is_available(self):
+                return True
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
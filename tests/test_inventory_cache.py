@@ -0,0 +1,74 @@
+"""
+Unit tests for inventory_cache module.
+Tests signature-based lookups, pruning and persistence.
+"""
+import pytest
+from services.inventory_cache import InventoryCache
+
+
+class TestInventoryCache:
+    """Test cases for the InventoryCache class"""
+    
+    def test_hit_requires_same_signature(self):
+        """Test that a changed signature is a miss"""
+        cache = InventoryCache()
+        cache.set('dpkg:status', (100, 2048), [{'DisplayName': 'bash'}])
+        
+        assert cache.get('dpkg:status', (100, 2048)) == (True, [{'DisplayName': 'bash'}])
+        assert cache.get('dpkg:status', (101, 2048)) == (False, None)
+        assert (cache.hits, cache.misses) == (1, 1)
+    
+    def test_save_prunes_unused_entries(self):
+        """Test that entries not used during a completed scan are dropped"""
+        cache = InventoryCache()
+        scan = cache.begin_scan()
+        cache.set('registry:App1', 1, {'DisplayName': 'App1'})
+        cache.set('registry:App2', 1, {'DisplayName': 'App2'})
+        cache.save(scan)
+        
+        scan = cache.begin_scan()
+        cache.get('registry:App1', 1)
+        cache.save(scan)
+        
+        assert cache.get('registry:App1', 1)[0]
+        assert not cache.get('registry:App2', 1)[0]
+    
+    def test_overlapping_scans_keep_entries(self):
+        """Test that a scan finishing mid-way through another does not prune its entries"""
+        cache = InventoryCache()
+        setup = cache.begin_scan()
+        for name in ('App1', 'App2'):
+            cache.set(f'registry:{name}', 1, {'DisplayName': name})
+        cache.save(setup)
+        
+        inventory = cache.begin_scan()
+        cache.get('registry:App1', 1)
+        cve_scan = cache.begin_scan()
+        cache.get('registry:App1', 1)
+        cache.get('registry:App2', 1)
+        cache.save(inventory)
+        cache.get('registry:App2', 1)
+        cache.save(cve_scan)
+        
+        assert cache.get('registry:App1', 1)[0]
+        assert cache.get('registry:App2', 1)[0]
+    
+    def test_persistence(self, tmp_path):
+        """Test that a saved cache is loaded by a new instance"""
+        path = tmp_path / 'cache' / 'inventory_cache.json'
+        cache = InventoryCache(path)
+        cache.set('rpm:rpmdb.sqlite', [[1, 2], None], [{'DisplayName': 'zlib'}])
+        cache.save()
+        
+        assert InventoryCache(path).get('rpm:rpmdb.sqlite', [[1, 2], None]) == (True, [{'DisplayName': 'zlib'}])
+    
+    def test_corrupt_file_ignored(self, tmp_path):
+        """Test that an unreadable cache file starts an empty cache"""
+        path = tmp_path / 'inventory_cache.json'
+        path.write_text('{not json')
+        
+        assert InventoryCache(path).get('any', 1) == (False, None)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
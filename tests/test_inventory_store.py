@@ -0,0 +1,120 @@
+"""
+Unit tests for inventory_store module.
+Tests inventory diffing, delta persistence and rebuilding past dates.
+"""
+import pytest
+from datetime import date
+from services.inventory_store import InventoryStore, diff_inventories, apply_diff
+
+
+def software(name, version, publisher='Vendor'):
+    return {'DisplayName': name, 'DisplayVersion': version, 'Publisher': publisher}
+
+
+def by_key(software_list):
+    return sorted(software_list, key=lambda entry: (entry['DisplayName'], entry['Publisher'], entry['DisplayVersion']))
+
+
+DAY1 = [software('Git', '2.40'), software('Python', '3.11'), software('Zoom', '5.0')]
+DAY2 = [software('Git', '2.41'), software('Python', '3.11'), software('VLC', '3.0')]
+
+
+class TestDiffInventories:
+    """Test cases for diff_inventories and apply_diff functions"""
+    
+    def test_diff(self):
+        """Test added, removed and version-changed entries"""
+        delta = diff_inventories(DAY1, DAY2)
+        
+        assert delta['added'] == [[['VLC', 'Vendor', 0], software('VLC', '3.0')]]
+        assert delta['removed'] == [['Zoom', 'Vendor', 0]]
+        assert delta['changed'] == [[['Git', 'Vendor', 0], software('Git', '2.41')]]
+    
+    def test_publisher_is_part_of_key(self):
+        """Test that the same name from another publisher is a different entry"""
+        delta = diff_inventories([software('Tool', '1', 'A')], [software('Tool', '1', 'B')])
+        
+        assert len(delta['added']) == 1 and len(delta['removed']) == 1
+        assert delta['changed'] == []
+    
+    def test_apply_roundtrip_with_duplicates(self):
+        """Test that applying a diff reproduces the new list, including same-name entries"""
+        old = [software('Runtime', '1.0'), software('Runtime', '2.0')]
+        new = [software('Runtime', '1.0'), software('Runtime', '2.1'), software('Runtime', '3.0')]
+        
+        assert by_key(apply_diff(old, diff_inventories(old, new))) == by_key(new)
+
+
+class TestInventoryStore:
+    """Test cases for the InventoryStore class"""
+    
+    def test_unchanged_day_writes_nothing(self, tmp_path):
+        """Test that only the first day writes a snapshot and unchanged days write no files"""
+        store = InventoryStore(tmp_path)
+        first = store.record(DAY1, '2025-01-01')
+        files = sorted(p.name for p in tmp_path.iterdir())
+        second = store.record(list(DAY1), '2025-01-02')
+        
+        assert first['snapshot'] and first['added'] == 3
+        assert not second['snapshot'] and second['added'] == second['removed'] == second['changed'] == 0
+        assert sorted(p.name for p in tmp_path.iterdir()) == files == ['snapshot_2025-01-01.json.gz']
+    
+    def test_rebuild_past_dates(self, tmp_path):
+        """Test rebuilding any recorded date from snapshot plus deltas"""
+        store = InventoryStore(tmp_path)
+        store.record(DAY1, '2025-01-01')
+        summary = store.record(DAY2, '2025-01-03')
+        
+        assert (summary['added'], summary['removed'], summary['changed'], summary['version_changed']) == (1, 1, 1, 1)
+        assert store.rebuild('2024-12-31') == []
+        assert by_key(store.rebuild('2025-01-02')) == by_key(DAY1)
+        assert by_key(store.rebuild(date(2025, 1, 3))) == by_key(DAY2)
+        assert by_key(store.rebuild()) == by_key(DAY2)
+        assert [delta['date'] for delta in store.iter_deltas()] == ['2025-01-03']
+    
+    def test_periodic_snapshot(self, tmp_path):
+        """Test that a compacted snapshot is written once the interval has passed"""
+        store = InventoryStore(tmp_path, snapshot_interval=7)
+        store.record(DAY1, '2025-01-01')
+        assert not store.record(DAY2, '2025-01-05')['snapshot']
+        assert store.record(DAY1, '2025-01-09')['snapshot']
+        
+        assert store.snapshot_dates() == [date(2025, 1, 1), date(2025, 1, 9)]
+        assert by_key(store.rebuild('2025-01-09')) == by_key(DAY1)
+        assert by_key(store.rebuild('2025-01-06')) == by_key(DAY2)
+    
+    def test_snapshot_day_writes_no_delta(self, tmp_path):
+        """Test that a snapshot day stores only the snapshot, and its changes are still listed"""
+        store = InventoryStore(tmp_path, snapshot_interval=7)
+        store.record(DAY1, '2025-01-01')
+        store.record(DAY2, '2025-01-05')
+        summary = store.record(DAY1, '2025-01-09')
+        
+        assert summary['snapshot'] and (summary['added'], summary['removed']) == (1, 1)
+        assert store.delta_dates() == [date(2025, 1, 5)]
+        deltas = list(store.iter_deltas())
+        assert [delta['date'] for delta in deltas] == ['2025-01-05', '2025-01-09']
+        assert deltas[1] == dict(diff_inventories(DAY2, DAY1), date='2025-01-09')
+        assert [delta['date'] for delta in store.iter_deltas(start='2025-01-06')] == ['2025-01-09']
+    
+    def test_same_day_rerun(self, tmp_path):
+        """Test that recording a day again replaces that day's changes"""
+        store = InventoryStore(tmp_path)
+        store.record(DAY1, '2025-01-01')
+        store.record(DAY2, '2025-01-02')
+        store.record(DAY1, '2025-01-02')
+        
+        assert store.delta_dates() == []
+        assert by_key(store.rebuild('2025-01-02')) == by_key(DAY1)
+    
+    def test_out_of_order_record_rejected(self, tmp_path):
+        """Test that history cannot be rewritten before the latest date"""
+        store = InventoryStore(tmp_path)
+        store.record(DAY1, '2025-01-05')
+        
+        with pytest.raises(ValueError):
+            store.record(DAY2, '2025-01-01')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
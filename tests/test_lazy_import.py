@@ -0,0 +1,70 @@
+"""
+Unit tests for lazy_import module.
+Tests deferred imports and that main.py starts without heavy dependencies.
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+import pytest
+from utils.lazy_import import lazy_import
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestLazyImport:
+    """Test cases for lazy_import"""
+
+    def test_imports_on_first_attribute_access(self, monkeypatch):
+        """Test that the module is imported only when an attribute is used"""
+        monkeypatch.delitem(sys.modules, 'colorsys', raising=False)
+        colorsys = lazy_import('colorsys')
+
+        assert 'colorsys' not in sys.modules
+        assert 'not loaded' in repr(colorsys)
+        assert colorsys.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+        assert 'colorsys' in sys.modules
+
+    def test_missing_module_raises_on_use(self):
+        """Test that a missing module fails where it is used, not where it is declared"""
+        missing = lazy_import('no_such_module_for_tests')
+
+        with pytest.raises(ImportError):
+            missing.anything
+
+    def test_concurrent_first_use(self, monkeypatch):
+        """Test that threads using the module at the same time all see the loaded module"""
+        monkeypatch.delitem(sys.modules, 'colorsys', raising=False)
+        colorsys = lazy_import('colorsys')
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(colorsys.hsv_to_rgb(0, 0, 1)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [(1, 1, 1)] * 8
+
+
+class TestStartup:
+    """Test cases for main.py startup cost"""
+
+    def test_main_import_defers_heavy_modules(self, tmp_path):
+        """Test that importing main loads no service, SMTP, HTTP or screenshot code and writes no files"""
+        code = (
+            "import json, sys, main; "
+            "print(json.dumps([m for m in ('mss', 'requests', 'smtplib', 'config.settings', "
+            "'services.cve_service', 'services.email_service') if m in sys.modules]))"
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path, capture_output=True, text=True,
+                                env=dict(os.environ, PYTHONPATH=str(ROOT)), check=True)
+
+        assert json.loads(result.stdout) == []
+        assert list(tmp_path.iterdir()) == []
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
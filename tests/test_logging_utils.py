@@ -0,0 +1,119 @@
+"""
+Unit tests for logging_utils module.
+Tests queued log delivery, JSON Lines output and rotation.
+"""
+import json
+import logging
+import logging.handlers
+import threading
+import pytest
+from utils.logging_utils import setup_logging, shutdown_logging
+
+
+@pytest.fixture
+def root_logger():
+    """Restore the root logger's handlers and level after setup_logging replaced them"""
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield root
+    shutdown_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+
+    def emit(self, record):
+        self.threads.append(threading.current_thread().name)
+
+
+class TestSetupLogging:
+    """Test cases for setup_logging"""
+
+    def test_records_written_by_listener_thread(self, tmp_path, root_logger):
+        """Test that the caller only enqueues records and the listener writes them"""
+        listener = setup_logging(log_file=tmp_path / 'app.log', console=False)
+        recorder = RecordingHandler()
+        listener.handlers += (recorder,)
+
+        logging.getLogger('services.test').info('Fetched %d CVEs for %s', 3, 'apache')
+        shutdown_logging()
+
+        assert 'services.test - INFO - Fetched 3 CVEs for apache' in (tmp_path / 'app.log').read_text()
+        assert recorder.threads and threading.current_thread().name not in recorder.threads
+
+    def test_arguments_rendered_when_logged(self, tmp_path, root_logger):
+        """Test that later changes to a mutable argument do not alter the queued message"""
+        setup_logging(log_file=tmp_path / 'app.log', console=False)
+        pending = ['CVE-1']
+
+        logging.getLogger('services.test').warning('Pending: %s', pending)
+        pending.append('CVE-2')
+        shutdown_logging()
+
+        assert "Pending: ['CVE-1']\n" in (tmp_path / 'app.log').read_text()
+
+    def test_debug_arguments_not_formatted_below_level(self, tmp_path, root_logger):
+        """Test that %-style arguments of disabled levels are never converted to text"""
+        setup_logging(level='INFO', log_file=tmp_path / 'app.log', console=False)
+
+        class Expensive:
+            def __str__(self):
+                raise AssertionError('formatted a disabled debug message')
+
+        logging.getLogger('services.test').debug('Fetching %s', Expensive())
+        shutdown_logging()
+
+    def test_json_lines(self, tmp_path, root_logger):
+        """Test that JSON output has one object per record with exception and extra fields"""
+        setup_logging(log_file=tmp_path / 'app.jsonl', fmt='json', console=False)
+        logger = logging.getLogger('services.cve_service')
+
+        logger.info('Found %d CVEs', 2, extra={'vendor': 'apache'})
+        try:
+            raise ValueError('bad response')
+        except ValueError:
+            logger.exception('Lookup failed')
+        shutdown_logging()
+
+        first, second = [json.loads(line) for line in (tmp_path / 'app.jsonl').read_text().splitlines()]
+        assert first['message'] == 'Found 2 CVEs'
+        assert first['level'] == 'INFO'
+        assert first['logger'] == 'services.cve_service'
+        assert first['vendor'] == 'apache'
+        assert second['level'] == 'ERROR'
+        assert 'ValueError: bad response' in second['exception']
+
+    def test_size_rotation(self, tmp_path, root_logger):
+        """Test that the log file is rotated at max_bytes, keeping backup_count files"""
+        setup_logging(log_file=tmp_path / 'app.log', max_bytes=200, backup_count=2, console=False)
+
+        for i in range(50):
+            logging.getLogger('services.test').info('Line %d', i)
+        shutdown_logging()
+
+        assert sorted(path.name for path in tmp_path.iterdir()) == ['app.log', 'app.log.1', 'app.log.2']
+
+    @pytest.mark.parametrize('rotation, handler_type', [
+        ('time', logging.handlers.TimedRotatingFileHandler),
+        ('none', logging.FileHandler),
+    ])
+    def test_rotation_handler(self, tmp_path, root_logger, rotation, handler_type):
+        """Test that the rotation setting picks the file handler"""
+        listener = setup_logging(log_file=tmp_path / 'app.log', rotation=rotation, console=False)
+
+        assert type(listener.handlers[0]) is handler_type
+
+    def test_invalid_options(self, tmp_path, root_logger):
+        """Test that unknown formats and rotations are rejected"""
+        with pytest.raises(ValueError):
+            setup_logging(log_file=tmp_path / 'app.log', fmt='xml')
+        with pytest.raises(ValueError):
+            setup_logging(log_file=tmp_path / 'app.log', rotation='weekly')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,118 @@
+"""
+Unit tests for orchestrator_service module.
+Tests concurrent job execution, timeouts and dependencies.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+import pytest
+import time
+from pathlib import Path
+from services.orchestrator_service import OrchestratedJob, run_jobs
+
+
+def sleeper(seconds, result=None):
+    def job():
+        time.sleep(seconds)
+        return result
+    return job
+
+
+class TestRunJobs:
+    """Test cases for run_jobs function"""
+    
+    def test_jobs_run_concurrently(self):
+        """Test that the run takes about as long as the slowest job"""
+        result = run_jobs([
+            OrchestratedJob('a', sleeper(0.2, 'A')),
+            OrchestratedJob('b', sleeper(0.2, 'B')),
+            OrchestratedJob('c', sleeper(0.2, 'C'))
+        ])
+        
+        assert result.ok
+        assert [job.result for job in result.jobs.values()] == ['A', 'B', 'C']
+        assert result.duration < 0.5
+        assert all(job.duration >= 0.2 for job in result.jobs.values())
+    
+    def test_timeout(self):
+        """Test that a slow job is reported as timed out without holding up the run"""
+        result = run_jobs([
+            OrchestratedJob('slow', sleeper(1.0), timeout=0.05),
+            OrchestratedJob('fast', sleeper(0, 'done'), timeout=1)
+        ])
+        
+        assert not result.ok
+        assert result.jobs['slow'].timed_out
+        assert result.jobs['fast'].result == 'done'
+        assert result.duration < 0.5
+    
+    def test_hung_job_does_not_block_exit(self):
+        """Test that the process exits after the run even though a timed-out job is still running"""
+        script = textwrap.dedent("""
+            import time
+            from services.orchestrator_service import OrchestratedJob, run_jobs
+            result = run_jobs([OrchestratedJob('hung', lambda: time.sleep(60), timeout=0.1)])
+            print(result.jobs['hung'].timed_out)
+        """)
+        env = dict(os.environ, PYTHONPATH=str(Path(__file__).resolve().parent.parent))
+        started = time.perf_counter()
+        
+        result = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True, timeout=30)
+        
+        assert result.stdout.strip() == 'True'
+        assert time.perf_counter() - started < 10
+    
+    def test_max_workers_limits_concurrency(self):
+        """Test that max_workers bounds how many jobs run at once"""
+        result = run_jobs([OrchestratedJob(name, sleeper(0.1)) for name in 'abcd'], max_workers=2)
+        
+        assert result.ok
+        assert result.duration >= 0.2
+    
+    def test_failure_is_captured(self):
+        """Test that exceptions become failed job results"""
+        def fail():
+            raise OSError("disk full")
+        
+        result = run_jobs([OrchestratedJob('fail', fail), OrchestratedJob('ok', sleeper(0, 1))])
+        
+        assert result.jobs['fail'].error == 'disk full'
+        assert result.jobs['ok'].ok
+        assert result.to_dict()['jobs']['fail']['ok'] is False
+    
+    def test_dependencies(self):
+        """Test that dependent jobs wait for, and are skipped after failure of, their dependencies"""
+        order = []
+        
+        def step(name):
+            def job():
+                time.sleep(0.05)
+                order.append(name)
+            return job
+        
+        def fail():
+            raise RuntimeError("boom")
+        
+        result = run_jobs([
+            OrchestratedJob('inventory', step('inventory')),
+            OrchestratedJob('scan', step('scan'), depends_on=('inventory',)),
+            OrchestratedJob('broken', fail),
+            OrchestratedJob('after_broken', step('after_broken'), depends_on=('broken',))
+        ])
+        
+        assert order == ['inventory', 'scan']
+        assert result.jobs['scan'].ok
+        assert not result.jobs['after_broken'].ok
+        assert 'broken' in result.jobs['after_broken'].error
+    
+    def test_invalid_plan(self):
+        """Test that unknown dependencies and duplicate names are rejected"""
+        with pytest.raises(ValueError):
+            run_jobs([OrchestratedJob('scan', sleeper(0), depends_on=('inventory',))])
+        with pytest.raises(ValueError):
+            run_jobs([OrchestratedJob('a', sleeper(0)), OrchestratedJob('a', sleeper(0))])
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
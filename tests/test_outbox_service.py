@@ -0,0 +1,280 @@
+"""
+Unit tests for outbox_service module.
+Tests spooling, background delivery, retry backoff and dead-lettering.
+"""
+import email
+import email.policy
+import smtplib
+import threading
+import time
+import pytest
+from services.outbox_service import Outbox, queue_email, set_outbox
+from tests.test_email_service import StubSmtpServer, stub_client
+
+
+class FakeClient:
+    """SmtpClient stand-in; ``failures`` holds exceptions raised by successive sends"""
+
+    def __init__(self, sent, failures, active=None):
+        self.sent = sent
+        self.failures = failures
+        self.active = active
+        self.envelopes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def send_stream(self, stream, from_addr, to_addrs):
+        msg = email.message_from_binary_file(stream, policy=email.policy.default)
+        self.send(msg)
+        self.envelopes.append((from_addr, to_addrs))
+
+    def send(self, msg):
+        if self.active is not None:
+            self.active.enter()
+        try:
+            if self.failures:
+                raise self.failures.pop(0)
+            self.sent.append(msg)
+        finally:
+            if self.active is not None:
+                self.active.leave()
+
+
+class ActiveCounter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def enter(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        time.sleep(0.02)
+
+    def leave(self):
+        with self.lock:
+            self.current -= 1
+
+
+def make_outbox(tmp_path, failures=None, **kwargs):
+    sent = []
+    failures = failures if failures is not None else []
+    kwargs.setdefault('backoff', 10)
+    kwargs.setdefault('backoff_max', 100)
+    outbox = Outbox(tmp_path / 'outbox', client_factory=lambda: FakeClient(sent, failures), **kwargs)
+    return outbox, sent
+
+
+def alert(i=0):
+    return {'to_address': 'ops@example.com', 'subject': f'Alert {i}', 'body': 'Body'}
+
+
+class TestOutbox:
+    """Test cases for Outbox"""
+
+    def test_enqueue_spools_and_delivery_removes(self, tmp_path):
+        """Test that a queued message is persisted until it is sent"""
+        outbox, sent = make_outbox(tmp_path)
+        message_id = outbox.enqueue(alert())
+
+        assert (outbox.pending_dir / f'{message_id}.eml').exists()
+        assert [state['subject'] for state in outbox.pending()] == ['Alert 0']
+
+        stats = outbox.process_due()
+
+        assert stats == {'sent': 1, 'retried': 0, 'dead': 0, 'pending': 0}
+        assert sent[0]['Subject'] == 'Alert 0'
+        assert list(outbox.pending_dir.iterdir()) == []
+
+    def test_spooled_with_envelope(self, tmp_path):
+        """Test that attachments are spooled with the message and Bcc is kept only in the envelope"""
+        outbox, sent = make_outbox(tmp_path)
+        (tmp_path / 'report.txt').write_text('report')
+        message_id = outbox.enqueue(dict(alert(), bcc='hidden@example.com', attachments=[tmp_path / 'report.txt']))
+        (tmp_path / 'report.txt').unlink()
+
+        assert b'hidden@example.com' not in (outbox.pending_dir / f'{message_id}.eml').read_bytes()
+        assert outbox.pending()[0]['recipients'] == ['ops@example.com', 'hidden@example.com']
+        outbox.process_due()
+        assert [part.get_filename() for part in sent[0].iter_attachments()] == ['report.txt']
+
+    def test_spool_survives_restart(self, tmp_path):
+        """Test that messages queued by one instance are delivered by another"""
+        first, _ = make_outbox(tmp_path)
+        first.enqueue(alert(1))
+        first.enqueue(alert(2))
+
+        second, sent = make_outbox(tmp_path)
+        second.process_due()
+
+        assert sorted(msg['Subject'] for msg in sent) == ['Alert 1', 'Alert 2']
+
+    def test_transient_failure_retried_with_backoff(self, tmp_path):
+        """Test that failed attempts are rescheduled with exponentially growing delays"""
+        failures = [smtplib.SMTPServerDisconnected('down')] * 3
+        outbox, sent = make_outbox(tmp_path, failures=list(failures))
+        outbox.enqueue(alert())
+
+        delays = []
+        now = time.time()
+        for _ in range(3):
+            stats = outbox.process_due(now=now)
+            assert stats['retried'] == 1
+            state = outbox.pending()[0]
+            delays.append(state['next_attempt'] - time.time())
+            assert outbox.process_due(now=time.time())['sent'] == 0
+            now = state['next_attempt']
+
+        assert 9 <= delays[0] <= 11
+        assert 18 <= delays[1] <= 22
+        assert 36 <= delays[2] <= 44
+        assert outbox.pending()[0]['attempts'] == 3
+        assert outbox.process_due(now=now)['sent'] == 1
+
+    def test_dead_letter_after_max_attempts(self, tmp_path):
+        """Test that a message is dead-lettered after max_attempts and can be requeued"""
+        outbox, sent = make_outbox(tmp_path, failures=[TimeoutError('timed out')] * 2, max_attempts=2)
+        message_id = outbox.enqueue(alert())
+
+        outbox.process_due()
+        stats = outbox.process_due(now=time.time() + 1000)
+
+        assert stats['dead'] == 1
+        assert outbox.pending() == []
+        dead = outbox.dead_letters()
+        assert dead[0]['id'] == message_id
+        assert dead[0]['attempts'] == 2
+        assert 'timed out' in dead[0]['last_error']
+
+        assert outbox.requeue(message_id) is True
+        assert outbox.process_due()['sent'] == 1
+        assert outbox.dead_letters() == []
+
+    def test_permanent_rejection_dead_lettered_immediately(self, tmp_path):
+        """Test that a 5xx rejection is not retried"""
+        outbox, _ = make_outbox(tmp_path, failures=[smtplib.SMTPDataError(550, b'Message rejected')])
+        outbox.enqueue(alert())
+
+        stats = outbox.process_due()
+
+        assert stats['dead'] == 1
+        assert outbox.dead_letters()[0]['attempts'] == 1
+
+    def test_recipient_refusals(self, tmp_path):
+        """Test that refused recipients are dead-lettered only if every refusal is a 5xx"""
+        greylisted = smtplib.SMTPRecipientsRefused({
+            'ops@example.com': (450, b'Greylisted'), 'old@example.com': (550, b'No such user'),
+        })
+        unknown = smtplib.SMTPRecipientsRefused({'ops@example.com': (550, b'No such user')})
+        outbox, _ = make_outbox(tmp_path, failures=[greylisted, unknown])
+        outbox.enqueue(alert())
+
+        assert outbox.process_due()['retried'] == 1
+        assert outbox.process_due(now=time.time() + 1000)['dead'] == 1
+
+    def test_partial_refusal_retries_temporary_recipients(self, tmp_path):
+        """Test that only recipients refused with a 4xx are retried, against a stub SMTP server"""
+        server = StubSmtpServer(refuse={'busy@example.com': '450 Mailbox busy'})
+        outbox = Outbox(tmp_path / 'outbox', backoff=10, client_factory=lambda: stub_client(server))
+        try:
+            message_id = outbox.enqueue(dict(alert(), to_address=['ops@example.com', 'busy@example.com']))
+
+            assert outbox.process_due() == {'sent': 1, 'retried': 1, 'dead': 0, 'pending': 1}
+            state = outbox.pending()[0]
+            assert state['recipients'] == ['busy@example.com']
+            assert state['attempts'] == 1
+            assert 9 <= state['next_attempt'] - time.time() <= 11
+            assert (outbox.pending_dir / f'{message_id}.eml').exists()
+
+            server.refuse.clear()
+            assert outbox.process_due(now=state['next_attempt'])['sent'] == 1
+        finally:
+            server.stop()
+
+        assert server.recipients == ['ops@example.com', 'busy@example.com']
+        assert len(server.messages) == 2
+        assert outbox.pending() == [] and outbox.dead_letters() == []
+
+    def test_partial_refusal_dead_letters_permanent_recipients(self, tmp_path):
+        """Test that 5xx-refused recipients are dead-lettered while 4xx ones stay queued"""
+        refused = {'busy@example.com': (450, b'Mailbox busy'), 'gone@example.com': (550, b'No such user')}
+        outbox, _ = make_outbox(tmp_path, failures=[smtplib.SMTPRecipientsRefused(refused)])
+        message_id = outbox.enqueue(dict(alert(), to_address=['busy@example.com', 'gone@example.com']))
+
+        assert outbox.process_due() == {'sent': 0, 'retried': 1, 'dead': 1, 'pending': 1}
+        assert outbox.pending()[0]['recipients'] == ['busy@example.com']
+        dead = outbox.dead_letters()[0]
+        assert dead['id'] == f'{message_id}-refused'
+        assert dead['recipients'] == ['gone@example.com']
+        assert 'No such user' in dead['last_error']
+        assert (outbox.dead_dir / f'{message_id}-refused.eml').exists()
+
+    def test_bounded_concurrency(self, tmp_path):
+        """Test that no more than ``concurrency`` messages are sent at once, one session per worker"""
+        sent = []
+        active = ActiveCounter()
+        sessions = []
+
+        def client_factory():
+            sessions.append(1)
+            return FakeClient(sent, [], active)
+
+        outbox = Outbox(tmp_path / 'outbox', concurrency=2, client_factory=client_factory)
+        for i in range(6):
+            outbox.enqueue(alert(i))
+
+        outbox.process_due()
+
+        assert len(sent) == 6
+        assert len(sessions) == 2
+        assert active.peak == 2
+
+    def test_worker_delivers_in_background(self, tmp_path):
+        """Test that the worker sends queued messages without the caller waiting"""
+        outbox, sent = make_outbox(tmp_path)
+        outbox.start(poll_interval=5)
+        try:
+            outbox.enqueue(alert())
+            deadline = time.time() + 5
+            while not sent and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            outbox.stop(timeout=5)
+
+        assert len(sent) == 1
+
+
+class TestQueueEmail:
+    """Test cases for queue_email"""
+
+    def test_queues_in_shared_outbox(self, tmp_path):
+        """Test that queue_email spools to the shared outbox and returns the id"""
+        outbox, _ = make_outbox(tmp_path)
+        set_outbox(outbox)
+        try:
+            message_id = queue_email('ops@example.com', 'Alert', 'Body', cc='cc@example.com')
+        finally:
+            set_outbox(None)
+
+        assert [state['id'] for state in outbox.pending()] == [message_id]
+
+    def test_spool_error_returns_none(self, tmp_path):
+        """Test that a spooling failure is logged and reported as None"""
+        blocker = tmp_path / 'file'
+        blocker.write_text('not a directory')
+        set_outbox(Outbox(blocker / 'outbox'))
+        try:
+            assert queue_email('ops@example.com', 'Alert', 'Body') is None
+            with pytest.raises(OSError):
+                queue_email('ops@example.com', 'Alert', 'Body', raise_on_error=True)
+        finally:
+            set_outbox(None)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
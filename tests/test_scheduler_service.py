@@ -0,0 +1,109 @@
+"""
+Unit tests for scheduler_service module.
+Tests periodic job execution, overrun handling and shutdown.
+"""
+import pytest
+import threading
+import time
+from services.scheduler_service import Scheduler
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+class TestScheduler:
+    """Test cases for the Scheduler class"""
+    
+    def test_job_runs_repeatedly(self):
+        """Test that a job runs once per interval until stopped"""
+        scheduler = Scheduler()
+        job = scheduler.add_job('tick', lambda: None, interval=0.02)
+        scheduler.start()
+        try:
+            assert wait_for(lambda: job.runs >= 3)
+        finally:
+            scheduler.stop(timeout=1)
+        
+        runs = job.runs
+        time.sleep(0.05)
+        assert job.runs == runs
+    
+    def test_failing_job_keeps_running(self):
+        """Test that an exception is counted and does not stop the job"""
+        scheduler = Scheduler()
+        
+        def fail():
+            raise RuntimeError("boom")
+        
+        job = scheduler.add_job('fail', fail, interval=0.01)
+        scheduler.start()
+        try:
+            assert wait_for(lambda: job.failures >= 2)
+        finally:
+            scheduler.stop(timeout=1)
+    
+    def test_overrun_skips_missed_ticks(self):
+        """Test that a slow run neither overlaps itself nor queues up missed ticks"""
+        scheduler = Scheduler()
+        active = []
+        overlapped = []
+        
+        def slow():
+            overlapped.append(bool(active))
+            active.append(1)
+            time.sleep(0.06)
+            active.pop()
+        
+        job = scheduler.add_job('slow', slow, interval=0.02)
+        scheduler.start()
+        try:
+            assert wait_for(lambda: job.runs >= 2)
+        finally:
+            scheduler.stop(timeout=1)
+        
+        assert job.skipped >= 2
+        assert not any(overlapped)
+    
+    def test_stop_interrupts_wait(self):
+        """Test that stopping does not wait for the next tick"""
+        scheduler = Scheduler()
+        job = scheduler.add_job('hourly', lambda: None, interval=3600, run_immediately=False)
+        scheduler.start()
+        
+        started = time.monotonic()
+        scheduler.stop(timeout=1)
+        
+        assert time.monotonic() - started < 1
+        assert job.runs == 0
+    
+    def test_run_forever_returns_after_stop(self):
+        """Test that run_forever blocks until stop() is called"""
+        scheduler = Scheduler()
+        job = scheduler.add_job('tick', lambda: None, interval=0.01)
+        
+        stopper = threading.Timer(0.1, scheduler.stop)
+        stopper.start()
+        scheduler.run_forever(handle_signals=False)
+        
+        assert scheduler.stopped
+        assert job.runs >= 1
+    
+    def test_invalid_jobs(self):
+        """Test that bad intervals and duplicate names are rejected"""
+        scheduler = Scheduler()
+        with pytest.raises(ValueError):
+            scheduler.add_job('zero', lambda: None, interval=0)
+        
+        scheduler.add_job('job', lambda: None, interval=1)
+        with pytest.raises(ValueError):
+            scheduler.add_job('job', lambda: None, interval=1)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -6,7 +6,21 @@ import pytest
 from unittest.mock import Mock, patch, MagicMock, call
 from pathlib import Path
 import os
-from services.screenshot_service import take_screenshot
+from mss.screenshot import ScreenShot
+from services.screenshot_service import (
+    take_screenshot,
+    encode_frame,
+    EncodingProfile,
+    frame_fingerprint,
+    fingerprint_difference,
+    reset_change_detection
+)
+
+
+def solid_frame(width=64, height=48, bgra=(10, 120, 200, 255)):
+    """Real mss ScreenShot filled with one color"""
+    data = bytearray(bytes(bgra) * (width * height))
+    return ScreenShot(data, {'left': 0, 'top': 0, 'width': width, 'height': height})
 
 
 class TestTakeScreenshot:
@@ -178,6 +192,232 @@ class TestTakeScreenshot:
                 assert len(parts) >= 3
                 assert parts[1].isdigit() and len(parts[1]) == 8  # Date part YYYYMMDD
 
+    
+    def test_capture_before_encode(self, tmp_path, monkeypatch):
+        """Test that all monitors are grabbed before any frame is encoded"""
+        monkeypatch.setattr('services.screenshot_service.SCREENSHOT_DIR', str(tmp_path))
+        events = []
+        
+        with patch('services.screenshot_service.mss.mss') as mock_mss:
+            mock_sct = MagicMock()
+            mock_sct.monitors = [None] + [{'left': i * 1920, 'top': 0, 'width': 1920, 'height': 1080} for i in range(4)]
+            
+            def grab(monitor):
+                events.append('grab')
+                screenshot = MagicMock()
+                screenshot.rgb = b'data'
+                screenshot.size = (1920, 1080)
+                return screenshot
+            
+            mock_sct.grab.side_effect = grab
+            mock_mss.return_value.__enter__.return_value = mock_sct
+            
+            with patch('services.screenshot_service.mss.tools.to_png', side_effect=lambda *a, **k: events.append('encode')):
+                result = take_screenshot(max_workers=4)
+        
+        assert len(result) == 4
+        assert events == ['grab'] * 4 + ['encode'] * 4
+        # Frames of one capture share a timestamp and keep monitor order
+        stamps = {os.path.basename(path).rsplit('_', 1)[0] for path in result}
+        assert len(stamps) == 1
+        for i, path in enumerate(result, start=1):
+            assert path.endswith(f'_{i}.png')
+    
+    def test_with_stats(self, tmp_path, monkeypatch):
+        """Test that per-stage timings are reported"""
+        monkeypatch.setattr('services.screenshot_service.SCREENSHOT_DIR', str(tmp_path))
+        
+        with patch('services.screenshot_service.mss.mss') as mock_mss:
+            mock_sct = MagicMock()
+            mock_sct.monitors = [None, {'left': 0, 'top': 0, 'width': 1920, 'height': 1080}]
+            mock_screenshot = MagicMock()
+            mock_screenshot.rgb = b'data'
+            mock_screenshot.size = (1920, 1080)
+            mock_sct.grab.return_value = mock_screenshot
+            mock_mss.return_value.__enter__.return_value = mock_sct
+            
+            with patch('services.screenshot_service.mss.tools.to_png'):
+                result, stats = take_screenshot(with_stats=True)
+        
+        assert len(result) == 1
+        assert stats['monitors'] == 1
+        for stage in ('capture_seconds', 'encode_seconds', 'total_seconds'):
+            assert stats[stage] >= 0
+        assert stats['total_seconds'] >= stats['encode_seconds']
+    
+    def test_encode_failure(self, tmp_path, monkeypatch):
+        """Test that an encoding error in a worker is handled"""
+        monkeypatch.setattr('services.screenshot_service.SCREENSHOT_DIR', str(tmp_path))
+        
+        with patch('services.screenshot_service.mss.mss') as mock_mss:
+            mock_sct = MagicMock()
+            mock_sct.monitors = [None, {'left': 0}, {'left': 1920}]
+            mock_sct.grab.return_value = MagicMock(rgb=b'data', size=(1920, 1080))
+            mock_mss.return_value.__enter__.return_value = mock_sct
+            
+            with patch('services.screenshot_service.mss.tools.to_png', side_effect=OSError("Disk full")):
+                result, stats = take_screenshot(with_stats=True)
+        
+        assert result == []
+        assert stats['monitors'] == 0
+
+
+
+class TestEncodingProfiles:
+    """Test cases for screenshot encoding profiles"""
+    
+    def test_profile_validation(self):
+        """Test that invalid profiles are rejected"""
+        with pytest.raises(ValueError):
+            EncodingProfile(format='gif')
+        with pytest.raises(ValueError):
+            EncodingProfile(png_level=10)
+        with pytest.raises(ValueError):
+            EncodingProfile(format='jpeg', quality=0)
+    
+    def test_png_level_passed_to_encoder(self, tmp_path):
+        """Test plain PNG profiles use mss with the configured level"""
+        frame = solid_frame()
+        
+        with patch('services.screenshot_service.mss.tools.to_png') as mock_to_png:
+            encode_frame(frame, tmp_path / 'shot.png', EncodingProfile(png_level=1))
+        
+        assert mock_to_png.call_args.kwargs['level'] == 1
+    
+    def test_png_roundtrip(self, tmp_path):
+        """Test that a real PNG is written without Pillow"""
+        path = encode_frame(solid_frame(), tmp_path / 'shot.png', 'fast')
+        
+        with open(path, 'rb') as f:
+            assert f.read(8) == b'\x89PNG\r\n\x1a\n'
+    
+    @pytest.mark.parametrize('profile, magic', [
+        (EncodingProfile(format='webp', quality=60), b'RIFF'),
+        (EncodingProfile(format='jpeg', quality=60), b'\xff\xd8'),
+        (EncodingProfile(grayscale=True), b'\x89PNG')
+    ])
+    def test_pillow_formats(self, tmp_path, profile, magic):
+        """Test lossy and grayscale profiles"""
+        pytest.importorskip('PIL')
+        path = encode_frame(solid_frame(), tmp_path / f'shot.{profile.extension}', profile)
+        
+        with open(path, 'rb') as f:
+            assert f.read(len(magic)) == magic
+    
+    def test_downscale(self, tmp_path):
+        """Test max_dimension keeps the aspect ratio"""
+        Image = pytest.importorskip('PIL.Image')
+        path = encode_frame(solid_frame(400, 200), tmp_path / 'shot.png', EncodingProfile(max_dimension=100))
+        
+        with Image.open(path) as image:
+            assert image.size == (100, 50)
+    
+    def test_take_screenshot_with_profile(self, tmp_path, monkeypatch):
+        """Test that the file extension follows the profile format"""
+        pytest.importorskip('PIL')
+        monkeypatch.setattr('services.screenshot_service.SCREENSHOT_DIR', str(tmp_path))
+        
+        with patch('services.screenshot_service.mss.mss') as mock_mss:
+            mock_sct = MagicMock()
+            mock_sct.monitors = [None, {'left': 0}, {'left': 64}]
+            mock_sct.grab.return_value = solid_frame()
+            mock_mss.return_value.__enter__.return_value = mock_sct
+            
+            result = take_screenshot(profile='webp')
+        
+        assert len(result) == 2
+        assert all(path.endswith('.webp') and Path(path).exists() for path in result)
+    
+    def test_unknown_profile_name(self, tmp_path, monkeypatch):
+        """Test that an unknown preset name fails like any capture error"""
+        monkeypatch.setattr('services.screenshot_service.SCREENSHOT_DIR', str(tmp_path))
+        
+        with patch('services.screenshot_service.mss.mss'):
+            assert take_screenshot(profile='no-such-profile') == []
+
+
+class TestChangeDetection:
+    """Test cases for skipping unchanged screenshots"""
+    
+    @pytest.fixture(autouse=True)
+    def fresh_state(self):
+        reset_change_detection()
+        yield
+        reset_change_detection()
+    
+    def capture(self, frames, **kwargs):
+        with patch('services.screenshot_service.mss.mss') as mock_mss:
+            mock_sct = MagicMock()
+            mock_sct.monitors = [None] + [{'left': i} for i in range(len(frames))]
+            mock_sct.grab.side_effect = frames
+            mock_mss.return_value.__enter__.return_value = mock_sct
+            return take_screenshot(with_stats=True, skip_unchanged=True, **kwargs)
+    
+    def test_fingerprint_difference(self):
+        """Test identical frames differ by 0 and a recolored frame by 1"""
+        base = frame_fingerprint(solid_frame())
+        
+        assert fingerprint_difference(base, frame_fingerprint(solid_frame())) == 0.0
+        assert fingerprint_difference(base, frame_fingerprint(solid_frame(bgra=(10, 250, 200, 255)))) == 1.0
+        assert fingerprint_difference(None, base) == 1.0
+    
+    def test_unchanged_frames_skipped(self, tmp_path, monkeypatch):
+        """Test that only monitors whose content changed are saved"""
+        monkeypatch.setattr('services.screenshot_service.SCREENSHOT_DIR', str(tmp_path))
+        
+        result, stats = self.capture([solid_frame(), solid_frame()])
+        assert len(result) == 2
+        assert (stats['frames_saved'], stats['frames_skipped']) == (2, 0)
+        
+        changed = solid_frame(bgra=(0, 0, 0, 255))
+        result, stats = self.capture([solid_frame(), changed])
+        assert len(result) == 1 and result[0].endswith('_2.png')
+        assert (stats['monitors'], stats['frames_saved'], stats['frames_skipped']) == (2, 1, 1)
+    
+    def test_fingerprints_persist_between_runs(self, tmp_path, monkeypatch):
+        """Test that a new process (e.g. the next cron run) still skips unchanged frames"""
+        monkeypatch.setattr('services.screenshot_service.SCREENSHOT_DIR', str(tmp_path))
+        self.capture([solid_frame()])
+        
+        monkeypatch.setattr('services.screenshot_service._last_fingerprints', {})
+        monkeypatch.setattr('services.screenshot_service._fingerprints_loaded', False)
+        result, stats = self.capture([solid_frame()])
+        
+        assert result == []
+        assert stats['frames_skipped'] == 1
+    
+    def test_failed_encode_not_remembered(self, tmp_path, monkeypatch):
+        """Test that a frame that failed to save is saved by the next capture"""
+        monkeypatch.setattr('services.screenshot_service.SCREENSHOT_DIR', str(tmp_path))
+        with patch('services.screenshot_service.encode_frame', side_effect=OSError('disk full')):
+            result, _ = self.capture([solid_frame()])
+        assert result == []
+        
+        result, stats = self.capture([solid_frame()])
+        
+        assert len(result) == 1
+        assert stats['frames_skipped'] == 0
+    
+    def test_fingerprints_written_only_on_change(self, tmp_path, monkeypatch):
+        """Test that a capture with every frame unchanged leaves the fingerprint file alone"""
+        monkeypatch.setattr('services.screenshot_service.SCREENSHOT_DIR', str(tmp_path))
+        self.capture([solid_frame()])
+        
+        with patch('services.screenshot_service.atomic_write') as mock_write:
+            self.capture([solid_frame()])
+        
+        mock_write.assert_not_called()
+    
+    def test_resolution_change_saves_frame(self, tmp_path, monkeypatch):
+        """Test that a monitor changing size is always treated as changed"""
+        monkeypatch.setattr('services.screenshot_service.SCREENSHOT_DIR', str(tmp_path))
+        self.capture([solid_frame()])
+        
+        result, stats = self.capture([solid_frame(width=80)])
+        
+        assert len(result) == 1
+        assert stats['frames_skipped'] == 0
+
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -0,0 +1,135 @@
+from typing import Dict, Iterator, List, Optional
+
+RANGE_FIELDS = (
+    "version_start_including",
+    "version_start_excluding",
+    "version_end_including",
+    "version_end_excluding",
+)
+
+# NVD camelCase range keys -> our snake_case keys
+_NVD_RANGE_KEYS = {
+    "versionStartIncluding": "version_start_including",
+    "versionStartExcluding": "version_start_excluding",
+    "versionEndIncluding": "version_end_including",
+    "versionEndExcluding": "version_end_excluding",
+}
+
+_ANY = ("*", "-", "")
+
+
+def parse_cpe(cpe: str) -> Optional[Dict[str, str]]:
+    """
+    Split a CPE 2.3 formatted string or CPE 2.2 URI into its main parts.
+
+    Returns:
+        Dict with part, vendor, product and version ('' when unspecified),
+        or None if the string is not a CPE.
+
+    Example:
+        >>> parse_cpe('cpe:2.3:a:apache:log4j:2.14.1:*:*:*:*:*:*:*')
+        {'part': 'a', 'vendor': 'apache', 'product': 'log4j', 'version': '2.14.1'}
+    """
+    if not isinstance(cpe, str):
+        return None
+    if cpe.startswith("cpe:2.3:"):
+        fields = cpe[8:].split(":")
+    elif cpe.startswith("cpe:/"):
+        fields = cpe[5:].split(":")
+    else:
+        return None
+    fields += [""] * (4 - len(fields))
+    part, vendor, product, version = fields[:4]
+    if not vendor or not product:
+        return None
+    return {
+        "part": part,
+        "vendor": vendor.replace("\\", "").lower(),
+        "product": product.replace("\\", "").lower(),
+        "version": "" if version in _ANY else version.replace("\\", ""),
+    }
+
+
+def _match(cpe: str, **ranges) -> Optional[Dict[str, str]]:
+    parsed = parse_cpe(cpe)
+    if parsed is None:
+        return None
+    match = {"cpe": cpe, "vendor": parsed["vendor"], "product": parsed["product"], "version": parsed["version"]}
+    for field in RANGE_FIELDS:
+        if ranges.get(field):
+            match[field] = ranges[field]
+    return match
+
+
+def _nvd_node_matches(nodes: List[Dict]) -> Iterator[Dict[str, str]]:
+    for node in nodes or []:
+        # NVD 2.0 uses cpeMatch/criteria, NVD 1.1 cpe_match/cpe23Uri
+        for entry in node.get("cpeMatch", node.get("cpe_match", [])):
+            if not entry.get("vulnerable", True):
+                continue
+            ranges = {_NVD_RANGE_KEYS[k]: v for k, v in entry.items() if k in _NVD_RANGE_KEYS}
+            match = _match(entry.get("criteria") or entry.get("cpe23Uri", ""), **ranges)
+            if match:
+                yield match
+        yield from _nvd_node_matches(node.get("children", []))
+
+
+def _cve5_matches(affected: List[Dict]) -> Iterator[Dict[str, str]]:
+    for product in affected or []:
+        vendor = str(product.get("vendor", "")).lower()
+        name = str(product.get("product", "")).lower()
+        if not vendor or not name or vendor == "n/a":
+            continue
+        versions = product.get("versions") or [{"version": "*", "status": "affected"}]
+        for version in versions:
+            if version.get("status", product.get("defaultStatus")) != "affected":
+                continue
+            match = {"cpe": "", "vendor": vendor, "product": name, "version": ""}
+            start = version.get("version", "")
+            if version.get("lessThan"):
+                match["version_end_excluding"] = version["lessThan"]
+                if start not in _ANY and start != "0":
+                    match["version_start_including"] = start
+            elif version.get("lessThanOrEqual"):
+                match["version_end_including"] = version["lessThanOrEqual"]
+                if start not in _ANY and start != "0":
+                    match["version_start_including"] = start
+            elif start not in _ANY:
+                match["version"] = start
+            yield match
+
+
+def extract_cpe_matches(record: Dict) -> List[Dict[str, str]]:
+    """
+    Collect the affected products of a CVE record as flat match dicts.
+
+    Understands records normalized by the offline CVE store (``cpe_matches``),
+    NVD 2.0 and 1.1 items, CVE JSON 5 records and CIRCL API records
+    (``vulnerable_product``). Each match has cpe, vendor, product, version
+    and any of the RANGE_FIELDS bounds.
+    """
+    if not isinstance(record, dict):
+        return []
+    if "cpe_matches" in record:
+        return list(record["cpe_matches"])
+
+    cve = record.get("cve") if isinstance(record.get("cve"), dict) else None
+    if cve is not None and "configurations" in cve:
+        # NVD 2.0: list of configurations, each with nodes
+        matches = []
+        for config in cve.get("configurations") or []:
+            matches.extend(_nvd_node_matches(config.get("nodes", [])))
+        return matches
+    if isinstance(record.get("configurations"), dict):
+        # NVD 1.1
+        return list(_nvd_node_matches(record["configurations"].get("nodes", [])))
+    if "containers" in record:
+        # CVE JSON 5
+        return list(_cve5_matches(record["containers"].get("cna", {}).get("affected", [])))
+
+    matches = []
+    for cpe in record.get("vulnerable_product") or []:
+        match = _match(cpe)
+        if match:
+            matches.append(match)
+    return matches
@@ -1,4 +1,8 @@
+import os
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
+from typing import BinaryIO, Iterator
 
 
 def safe_delete(path):
@@ -15,3 +19,91 @@ def safe_delete(path):
 
 def file_exists(path) -> bool:
     return Path(path).exists()
+
+
+def _temp_path(path: Path) -> Path:
+    # Same directory, so the final rename never crosses filesystems
+    return path.parent / f".{path.name}.{uuid.uuid4().hex}.tmp"
+
+
+def _fsync_dir(directory: Path):
+    """Persist a rename in ``directory`` (not possible, nor needed, on Windows)."""
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_open(path, fsync: bool = True) -> Iterator[BinaryIO]:
+    """
+    Binary file for writing ``path`` incrementally with atomic_write's guarantees.
+
+    The file is renamed over ``path`` when the block exits normally and
+    discarded if it raises.
+
+    Example:
+        >>> with atomic_open('data/outbox/pending/message.eml') as f:
+        ...     write_message(f, ...)
+    """
+    path = Path(path)
+    tmp = _temp_path(path)
+    # os.open honours the umask, unlike mkstemp's private 0600 files
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+    if fsync:
+        _fsync_dir(path.parent)
+
+
+def atomic_write(path, data: bytes, fsync: bool = True) -> str:
+    """
+    Write ``data`` to ``path`` so readers see either the old or the new file, never a partial one.
+
+    The data goes to a temporary file in the same directory, is flushed to
+    disk, and is then renamed over ``path``.
+
+    Returns:
+        str: The written path
+    """
+    with atomic_open(path, fsync=fsync) as f:
+        f.write(data)
+    return str(Path(path))
+
+
+def publish_link(target, link_path) -> bool:
+    """
+    Atomically make ``link_path`` a hard link to ``target``.
+
+    Returns:
+        False if the filesystem does not support hard links (link_path is
+        left untouched), True otherwise
+    """
+    link_path = Path(link_path)
+    tmp = _temp_path(link_path)
+    try:
+        os.link(target, tmp)
+    except OSError:
+        return False
+    try:
+        os.replace(tmp, link_path)
+    except BaseException:
+        tmp.unlink()
+        raise
+    return True
@@ -0,0 +1,152 @@
+import codecs
+import gzip
+import json
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Sequence, Union
+
+# Keys under which known CVE feeds keep their record array
+# (NVD 1.1 feeds, NVD 2.0 API/feeds)
+DEFAULT_ARRAY_KEYS = ("CVE_Items", "vulnerabilities")
+
+_WHITESPACE = " \t\r\n"
+_COMPACT_AT = 1 << 16
+
+
+class _ChunkReader:
+    """Buffered cursor over text decoded incrementally from an iterable of chunks."""
+
+    def __init__(self, chunks: Iterable[Union[str, bytes]]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk to the buffer. Returns False once input is exhausted."""
+        while not self.eof:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self.eof = True
+                tail = self._decoder.decode(b"", final=True)
+                if tail:
+                    self._append(tail)
+                    return True
+                return False
+            if isinstance(chunk, bytes):
+                chunk = self._decoder.decode(chunk)
+            if chunk:
+                self._append(chunk)
+                return True
+        return False
+
+    def _append(self, text: str) -> None:
+        if self.pos >= _COMPACT_AT:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        self.buf += text
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ('' at end of input)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def value(self) -> Any:
+        """Decode one complete JSON value at the cursor, reading more input as needed."""
+        self.peek()
+        while True:
+            try:
+                obj, end = self._json.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buf) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return obj
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed JSON stream: expected {char!r}, found {found!r}")
+        self.pos += 1
+
+
+def _iter_array(reader: _ChunkReader) -> Iterator[Any]:
+    reader.expect("[")
+    while True:
+        char = reader.peek()
+        if char == "]":
+            reader.pos += 1
+            return
+        if char == ",":
+            reader.pos += 1
+            continue
+        if char == "":
+            raise ValueError("Malformed JSON stream: unterminated array")
+        yield reader.value()
+
+
+def iter_json_array(
+    chunks: Iterable[Union[str, bytes]],
+    array_keys: Sequence[str] = DEFAULT_ARRAY_KEYS
+) -> Iterator[Any]:
+    """
+    Incrementally yield the items of a JSON array without loading the document.
+
+    The array can be the top-level value, or the value of one of
+    ``array_keys`` in a top-level object (other members are skipped).
+    Only one item is held in memory at a time.
+
+    Args:
+        chunks: Iterable of str or UTF-8 bytes chunks (file reads, HTTP body chunks)
+        array_keys: Top-level object keys whose arrays should be streamed
+
+    Example:
+        >>> with open('nvdcve-1.1-2021.json', 'rb') as f:
+        ...     for item in iter_json_array(iter(lambda: f.read(65536), b'')):
+        ...         print(item['cve']['CVE_data_meta']['ID'])
+    """
+    reader = _ChunkReader(chunks)
+    char = reader.peek()
+    if char == "[":
+        yield from _iter_array(reader)
+        return
+    if char != "{":
+        raise ValueError(f"Expected a JSON array or object, found {char!r}")
+
+    reader.pos += 1
+    while True:
+        char = reader.peek()
+        if char == "}":
+            return
+        if char == ",":
+            reader.pos += 1
+            continue
+        key = reader.value()
+        reader.expect(":")
+        if key in array_keys and reader.peek() == "[":
+            yield from _iter_array(reader)
+        else:
+            reader.value()
+
+
+def iter_json_file(
+    path: Union[str, Path],
+    array_keys: Sequence[str] = DEFAULT_ARRAY_KEYS,
+    chunk_size: int = 1 << 16
+) -> Iterator[Any]:
+    """Stream array items from a JSON file (gzip-compressed if it ends in .gz)."""
+    path = Path(path)
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        yield from iter_json_array(iter(lambda: f.read(chunk_size), b""), array_keys)
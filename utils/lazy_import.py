@@ -0,0 +1,36 @@
+import importlib
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Unlike importlib.util.LazyLoader, the module is imported through the
+    normal import machinery (and its per-module lock), so jobs running in
+    several threads can trigger the import concurrently.
+    """
+
+    def __init__(self, name: str):
+        self.__name = name
+        self.__module = None
+
+    def __getattr__(self, attr):
+        module = self.__module
+        if module is None:
+            module = self.__module = importlib.import_module(self.__name)
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__module is not None else "not loaded"
+        return f"<lazy module {self.__name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Defer importing module ``name`` until one of its attributes is used.
+
+    Example:
+        >>> cve_service = lazy_import('services.cve_service')   # requests is not imported yet
+        >>> cve_service.fetch_watchlist_cves(watchlist)          # imported here
+    """
+    return LazyModule(name)
@@ -0,0 +1,148 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from typing import Optional
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_FORMATS = ("text", "json")
+ROTATIONS = ("size", "time", "none")
+
+# Attributes every LogRecord has; anything else was passed with extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each record as one JSON object per line.
+
+    Keys: time, level, logger, message, thread, plus exception (formatted
+    traceback) when there is one and any fields passed with ``extra``.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the message is rendered in the logging thread (its arguments may change later).
+        # Timestamps, layout and tracebacks are formatted by the listener's handlers.
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        return record
+
+
+def _file_handler(log_file, rotation: str, max_bytes: int, backup_count: int, when: str) -> logging.Handler:
+    if rotation == "size":
+        return logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+    if rotation == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file, when=when, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+    return logging.FileHandler(log_file, encoding="utf-8", delay=True)
+
+
+def setup_logging(
+    level="INFO",
+    log_file="logs/system_monitor.log",
+    fmt: str = "text",
+    rotation: str = "size",
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    when: str = "midnight",
+    console: bool = True
+) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue so writing log files never blocks the caller.
+
+    The root logger gets a single QueueHandler; a QueueListener thread
+    writes the records to the log file (and the console). Calling it again
+    replaces the previous configuration. The listener is stopped, and
+    queued records flushed, at exit or by shutdown_logging().
+
+    Args:
+        level: Root log level (name or number)
+        log_file: Log file path, or None for console only
+        fmt: "text" (the classic one-line format) or "json" (JSON Lines); the console is always text
+        rotation: "size" (at max_bytes), "time" (at ``when``, see TimedRotatingFileHandler) or "none"
+        max_bytes: File size that triggers a size rotation
+        backup_count: Rotated files kept
+        when: Time rotation interval, e.g. "midnight", "H", "W0"
+        console: Also log to stderr
+
+    Returns:
+        The running QueueListener
+
+    Example:
+        >>> setup_logging(level="INFO", log_file="logs/system_monitor.log", fmt="json", rotation="time")
+    """
+    global _listener
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format {fmt!r}, expected one of: {', '.join(LOG_FORMATS)}")
+    if rotation not in ROTATIONS:
+        raise ValueError(f"Unknown log rotation {rotation!r}, expected one of: {', '.join(ROTATIONS)}")
+
+    handlers = []
+    if log_file:
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_handler = _file_handler(log_file, rotation, max_bytes, backup_count, when)
+        file_handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(console_handler)
+
+    shutdown_logging()
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and close the log handlers."""
+    global _listener
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, _QueueHandler):
+            root.removeHandler(handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,159 @@
+import gzip
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from utils.file_utils import atomic_write
+
+# Format name -> file extension:
+#   json      pretty-printed list (indent=4), the historical format
+#   jsonl.gz  gzipped JSON Lines, one compact entry per line
+#   columnar  gzipped JSON with one array per field, Publisher dictionary-encoded
+#   msgpack   MessagePack list of entries (requires the msgpack package)
+FORMATS = {
+    "json": ".json",
+    "jsonl.gz": ".jsonl.gz",
+    "columnar": ".columnar.json.gz",
+    "msgpack": ".msgpack",
+}
+
+# Columns stored as an index into a list of distinct values
+DICTIONARY_COLUMNS = ("Publisher",)
+
+# zlib default; level 9 is much slower for a few percent smaller reports
+GZIP_LEVEL = 6
+
+
+def extension_for(fmt: str) -> str:
+    try:
+        return FORMATS[fmt]
+    except KeyError:
+        raise ValueError(f"Unknown report format: {fmt}. Expected one of {sorted(FORMATS)}")
+
+
+def detect_format(path) -> str:
+    """Report format of a file, from its name (longest matching extension wins)."""
+    name = Path(path).name
+    for fmt, ext in sorted(FORMATS.items(), key=lambda item: -len(item[1])):
+        if name.endswith(ext):
+            return fmt
+    raise ValueError(f"Cannot tell report format of {path}")
+
+
+def _import_msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise RuntimeError("The msgpack report format requires msgpack: pip install msgpack")
+    return msgpack
+
+
+def to_columnar(records: List[Dict]) -> Dict:
+    """
+    Convert a list of dicts to columns. A field missing from an entry is
+    stored as null and its row listed under "absent", so from_columnar
+    leaves it out again while keeping explicit None values.
+    """
+    fields: Dict[str, None] = {}
+    for record in records:
+        fields.update(dict.fromkeys(record))
+
+    columns = {}
+    dictionaries = {}
+    absent = {}
+    for field in fields:
+        values = [record.get(field) for record in records]
+        missing = [row for row, record in enumerate(records) if field not in record]
+        if missing:
+            absent[field] = missing
+        if field in DICTIONARY_COLUMNS:
+            index: Dict = {}
+            columns[field] = [index.setdefault(value, len(index)) for value in values]
+            dictionaries[field] = list(index)
+        else:
+            columns[field] = values
+    return {"format": "columnar", "version": 2, "rows": len(records),
+            "columns": columns, "dictionaries": dictionaries, "absent": absent}
+
+
+def from_columnar(data: Dict) -> List[Dict]:
+    columns = {}
+    for field, values in data["columns"].items():
+        dictionary = data.get("dictionaries", {}).get(field)
+        columns[field] = [dictionary[i] for i in values] if dictionary is not None else values
+
+    records = []
+    fields = list(columns)
+    for row in zip(*(columns[field] for field in fields)):
+        records.append(dict(zip(fields, row)))
+    # zip() yields nothing for an entry without columns
+    records.extend({} for _ in range(data["rows"] - len(records)))
+
+    if "absent" in data:
+        for field, rows in data["absent"].items():
+            for row in rows:
+                del records[row][field]
+    else:
+        # Version 1 files did not record absent fields; every null was one
+        records = [{field: value for field, value in record.items() if value is not None} for record in records]
+    return records
+
+
+def serialize_report(records: List[Dict], fmt: str = "json") -> bytes:
+    """Encode records in a report format (gzip included where the format has it)."""
+    extension_for(fmt)
+    if fmt == "json":
+        return json.dumps(records, indent=4, ensure_ascii=False).encode("utf-8")
+    if fmt == "jsonl.gz":
+        lines = "".join(json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n" for record in records)
+        return gzip.compress(lines.encode("utf-8"), compresslevel=GZIP_LEVEL, mtime=0)
+    if fmt == "columnar":
+        payload = json.dumps(to_columnar(records), separators=(",", ":"), ensure_ascii=False)
+        return gzip.compress(payload.encode("utf-8"), compresslevel=GZIP_LEVEL, mtime=0)
+    return _import_msgpack().packb(records, use_bin_type=True)
+
+
+def deserialize_report(data: bytes, fmt: str = "json") -> List[Dict]:
+    extension_for(fmt)
+    if fmt == "json":
+        return json.loads(data.decode("utf-8"))
+    if fmt == "jsonl.gz":
+        return [json.loads(line) for line in gzip.decompress(data).decode("utf-8").splitlines() if line]
+    if fmt == "columnar":
+        return from_columnar(json.loads(gzip.decompress(data).decode("utf-8")))
+    return _import_msgpack().unpackb(data, raw=False)
+
+
+def write_report(records: List[Dict], path, fmt: Optional[str] = None) -> str:
+    """
+    Atomically write records to ``path`` in ``fmt`` (default: detected from the file name).
+
+    Returns:
+        str: The written path
+    """
+    fmt = fmt or detect_format(path)
+    return atomic_write(path, serialize_report(records, fmt))
+
+
+def read_report(path, fmt: Optional[str] = None) -> List[Dict]:
+    """
+    Load a report written in any supported format.
+
+    Example:
+        >>> software_list = read_report('reports/software.columnar.json.gz')
+    """
+    fmt = fmt or detect_format(path)
+    with open(path, "rb") as f:
+        return deserialize_report(f.read(), fmt)
+
+
+def iter_report(path, fmt: Optional[str] = None) -> Iterator[Dict]:
+    """Iterate over report entries; JSON Lines files are streamed line by line."""
+    fmt = fmt or detect_format(path)
+    if fmt == "jsonl.gz":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from read_report(path, fmt)
@@ -0,0 +1,119 @@
+import re
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+VersionKey = Tuple[Tuple, ...]
+
+# Sentinels that sort below / above every parsed version key
+MIN_VERSION: VersionKey = ()
+MAX_VERSION: VersionKey = ((3,),)
+
+# Components sort as: pre-release text < end of version < numbers
+_END = (1, "")
+_COMPONENT = re.compile(r"\d+|[a-z]+")
+
+
+def parse_version(version: Optional[str]) -> Optional[VersionKey]:
+    """
+    Turn a version string into a key that compares like the version.
+
+    Numeric parts compare numerically, trailing zeros of the release are
+    ignored ("2.0" == "2.0.0") and text after the release (beta, rc, ...)
+    sorts before the plain release ("2.15.0-rc1" < "2.15.0").
+
+    Returns:
+        Comparable tuple, or None if the string has no version components.
+
+    Example:
+        >>> parse_version('9.0.41') < parse_version('9.0.100')
+        True
+    """
+    if not version or not isinstance(version, str):
+        return None
+    parts = _COMPONENT.findall(version.lower())
+    if not parts:
+        return None
+
+    release = []
+    rest = []
+    for part in parts:
+        if rest or not part.isdigit():
+            rest.append((2, int(part)) if part.isdigit() else (0, part))
+        else:
+            release.append((2, int(part)))
+    while release and release[-1] == (2, 0):
+        release.pop()
+    return tuple(release + rest + [_END])
+
+
+class VersionIntervals:
+    """
+    Precompiled set of version intervals supporting O(log n) membership.
+
+    Intervals are merged into sorted, disjoint ranges at build time so a
+    lookup is one bisect plus two comparisons.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[VersionKey, bool, VersionKey, bool]]):
+        merged: List[List] = []
+        for lo, lo_inc, hi, hi_inc in sorted(intervals, key=lambda iv: (iv[0], not iv[1])):
+            if merged:
+                last = merged[-1]
+                if lo < last[2] or (lo == last[2] and (last[3] or lo_inc)):
+                    if hi > last[2]:
+                        last[2], last[3] = hi, hi_inc
+                    elif hi == last[2]:
+                        last[3] = last[3] or hi_inc
+                    continue
+            merged.append([lo, lo_inc, hi, hi_inc])
+        self._intervals = merged
+        self._starts = [iv[0] for iv in merged]
+
+    def __bool__(self) -> bool:
+        return bool(self._intervals)
+
+    def contains(self, key: VersionKey) -> bool:
+        index = bisect_right(self._starts, key) - 1
+        if index < 0:
+            return False
+        lo, lo_inc, hi, hi_inc = self._intervals[index]
+        if key == lo and not lo_inc:
+            return False
+        return key < hi or (key == hi and hi_inc)
+
+    @property
+    def unbounded(self) -> bool:
+        """True if every version is contained."""
+        return (len(self._intervals) == 1 and self._intervals[0][0] == MIN_VERSION
+                and self._intervals[0][2] == MAX_VERSION)
+
+
+def match_to_interval(match: Dict[str, str]) -> Optional[Tuple[VersionKey, bool, VersionKey, bool]]:
+    """
+    Convert one affected-product match (see utils.cpe_utils) to an interval.
+
+    Returns None if the match names a version that cannot be parsed.
+    """
+    lo, lo_inc, hi, hi_inc = MIN_VERSION, True, MAX_VERSION, True
+    bounded = False
+    for field, is_lower, inclusive in (
+        ("version_start_including", True, True),
+        ("version_start_excluding", True, False),
+        ("version_end_including", False, True),
+        ("version_end_excluding", False, False),
+    ):
+        key = parse_version(match.get(field))
+        if key is None:
+            continue
+        bounded = True
+        if is_lower:
+            lo, lo_inc = key, inclusive
+        else:
+            hi, hi_inc = key, inclusive
+
+    if not bounded and match.get("version"):
+        key = parse_version(match["version"])
+        if key is None:
+            return None
+        return key, True, key, True
+    return lo, lo_inc, hi, hi_inc